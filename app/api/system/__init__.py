@@ -0,0 +1,7 @@
+from fastapi import APIRouter
+from app.api.system import health, metrics, pool
+
+router = APIRouter()
+router.include_router(health.router)
+router.include_router(pool.router)
+router.include_router(metrics.router)
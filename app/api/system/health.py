@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.health import get_liveness, get_readiness
+from app.core.utils import create_response
+from app.schemas.base import BaseResponse
+
+router = APIRouter()
+
+
+@router.get("/healthz", response_model=BaseResponse[dict])
+async def get_health():
+    """Проверка живости процесса: не обращается к БД и отвечает, пока работает event loop"""
+    return create_response(data=get_liveness(), message="Работает")
+
+
+@router.get("/readyz", response_model=BaseResponse[dict])
+async def get_ready():
+    """
+    Готовность принимать запросы: прогрев завершен, БД отвечает за
+    READINESS_DB_TIMEOUT, очередь пула и задержка event loop в пределах порогов.
+    При неготовности - 503 с результатами проверок.
+    """
+    ready, checks = await get_readiness()
+    response = BaseResponse(ok=ready, message="Готов" if ready else "Не готов", data=checks)
+    return JSONResponse(status_code=200 if ready else 503, content=response.model_dump())
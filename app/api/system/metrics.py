@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.config import DB_CONNECTIONS
+from app.core.db import get_pool_stats
+from app.core.metrics import DB_POOL_CONNECTIONS, REGISTRY
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def collect_runtime_metrics():
+    """Обновляет метрики, значения которых снимаются в момент запроса"""
+    for connection_name in DB_CONNECTIONS:
+        stats = get_pool_stats(connection_name)
+        if not stats["initialized"]:
+            continue
+        for state in ("size", "in_use", "idle", "waiters", "max_size"):
+            DB_POOL_CONNECTIONS.set(stats[state], connection=connection_name, state=state)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Метрики в текстовом формате Prometheus"""
+    collect_runtime_metrics()
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
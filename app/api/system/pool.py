@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Query
+from app.core.utils import create_response
+from app.core.db import get_pool_stats
+from app.schemas.base import BaseResponse
+from app.schemas.system import PoolStatsModel
+
+router = APIRouter()
+
+
+@router.get("/system/pool", response_model=BaseResponse[PoolStatsModel])
+async def get_pool_state(
+    connection: str = Query("default", description="Имя соединения (default, replica)"),
+):
+    """Текущая загрузка пула соединений: занятые, свободные, ожидающие, время получения"""
+    return create_response(data=PoolStatsModel(**get_pool_stats(connection)))
@@ -12,6 +12,7 @@ from app.api.v1.endpoints.gazification import (
     export_excel,
     export_csv,
     export_activity,
+    export_bundle,
     auth,
 )
 
@@ -28,4 +29,5 @@ router.include_router(type_values.router)
 router.include_router(export_excel.router)
 router.include_router(export_csv.router)
 router.include_router(export_activity.router)
+router.include_router(export_bundle.router)
 router.include_router(auth.router, prefix="/auth", tags=["authentication"])
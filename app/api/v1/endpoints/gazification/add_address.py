@@ -4,7 +4,8 @@ from app.core.utils import create_response, log_db_operation, record_activity
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import AddressCreateRequest
 from app.models.models import AddressV2, GazificationData, TypeValue
-from app.core.exceptions import DatabaseError
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.invalidation import TOPIC_ADDRESS, publish
 from tortoise.expressions import Q
 
 router = APIRouter()
@@ -16,6 +17,8 @@ async def add_address(request: AddressCreateRequest):
     try:
         try:
             type_value = await TypeValue.get(id=1)
+        except StatementTimeoutError:
+            raise
         except Exception as e:
             raise DatabaseError(f"Не найден тип значения с id=1: {str(e)}")
         # Проверяем, не существует ли уже такой адрес
@@ -75,6 +78,9 @@ async def add_address(request: AddressCreateRequest):
             },
         )
         await record_activity(request.from_login or "unknown", request.session_id)
+        await publish(TOPIC_ADDRESS, mo_id=request.mo_id, address_id=address.id)
         return create_response(data=None, message="Адрес успешно добавлен")
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при добавлении адреса: {str(e)}")
@@ -1,22 +1,33 @@
 from fastapi import APIRouter, Path
 from app.core.utils import create_response, log_db_operation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import TOPIC_ADDRESS
+from app.core.singleflight import single_flight
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import DistrictListResponse
 from app.models.models import AddressV2, GazificationData
-from app.core.exceptions import DatabaseError
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.db import get_read_connection
 from tortoise.expressions import Q, Case, When, F
 from tortoise.functions import Coalesce
 
 router = APIRouter()
+districts_cache = Cache(
+    "hints.districts", settings.CACHE_HINTS_TTL, topics=(TOPIC_ADDRESS,), scope="mo_id"
+)
 
 
 @router.get("/mo/{mo_id}/district", response_model=BaseResponse[DistrictListResponse])
+@districts_cache.cached
+@single_flight
 async def get_districts(mo_id: int = Path()):
     """Получение списка районов по ID муниципалитета"""
     try:
+        connection = await get_read_connection()
         gazified_addresses = await GazificationData.filter(
             (Q(id_type_address=3) | Q(id_type_address=6) | Q(id_type_address=8)) & Q(deleted=False)
-        ).values_list("id_address", flat=True)
+        ).using_db(connection).values_list("id_address", flat=True)
         district_addresses = (
             await AddressV2.filter(
                 Q(id_mo=mo_id)
@@ -26,6 +37,7 @@ async def get_districts(mo_id: int = Path()):
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("district", flat=True)
         )
@@ -39,6 +51,7 @@ async def get_districts(mo_id: int = Path()):
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("city", flat=True)
         )
@@ -52,5 +65,7 @@ async def get_districts(mo_id: int = Path()):
         return create_response(
             data=DistrictListResponse(districts=sorted(list(districts)))
         )
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка районов: {str(e)}")
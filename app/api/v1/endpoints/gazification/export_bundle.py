@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.db import get_read_connection
+from app.core.exceptions import DatabaseError, ValidationError, StatementTimeoutError
+from app.core.export_bundle import BundleEntry, stream_bundle
+from app.core.export_engine import load_sink
+from app.core.export_utils import (
+    ExportFilters,
+    get_bundle_municipalities,
+    get_export_questions,
+    get_gazification_rows,
+    parse_date,
+)
+from app.core.utils import log_db_operation
+from typing import Any, AsyncIterator, Dict, List, Optional
+from datetime import datetime
+
+router = APIRouter()
+
+BUNDLE_FORMATS = ("csv", "xlsx")
+
+
+async def gazification_entries(
+    municipalities: List[Dict[str, Any]],
+    questions: List[Dict[str, Any]],
+    filters: ExportFilters,
+) -> AsyncIterator[BundleEntry]:
+    """Выгрузка /export по каждому муниципалитету; запрос к базе - когда до него дошла очередь"""
+    for municipality in municipalities:
+        source = await get_gazification_rows(
+            filters._replace(mo_id=municipality["id_mo"]), questions
+        )
+        yield f"{municipality['name']}_{municipality['id_mo']}", source
+
+
+@router.get("/export-bundle")
+async def export_bundle(
+    mo_ids: Optional[List[int]] = Query(
+        None, description="ID муниципалитетов (по умолчанию все, где есть адреса)"
+    ),
+    date_from: Optional[str] = Query(
+        None,
+        description="Начальная дата для фильтрации (YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS)",
+    ),
+    date_to: Optional[str] = Query(
+        None,
+        description="Конечная дата для фильтрации (YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS)",
+    ),
+    format: str = Query("xlsx", description="Формат файлов в архиве: xlsx или csv"),
+    client_source: Optional[str] = Query("web", description="Источник запроса (web, bot, api)"),
+):
+    """
+    ZIP-архив с выгрузкой /export по каждому муниципалитету.
+
+    Файлы архива строятся по одному и сжимаются во время отправки: первые
+    байты уходят клиенту сразу, не дожидаясь остальных муниципалитетов.
+    Ошибка после начала отправки обрывает архив (статус уже отправлен).
+    """
+    try:
+        if format not in BUNDLE_FORMATS:
+            raise ValidationError(
+                f"Неизвестный формат архива: {format}, доступны: {', '.join(BUNDLE_FORMATS)}"
+            )
+        sink_class = await load_sink(format)
+        filters = ExportFilters(
+            date_from=parse_date(date_from, is_start=True),
+            date_to=parse_date(date_to, is_start=False),
+        )
+        municipalities = await get_bundle_municipalities(mo_ids)
+        if not municipalities:
+            raise HTTPException(
+                status_code=404,
+                detail="Не найдено муниципалитетов для экспорта с указанными параметрами",
+            )
+        questions = await get_export_questions(await get_read_connection())
+    except (HTTPException, StatementTimeoutError):
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Ошибка при подготовке архива выгрузок: {str(e)}")
+
+    log_db_operation(
+        "export",
+        "bundle",
+        {
+            **filters.to_log(),
+            "mo_ids": [municipality["id_mo"] for municipality in municipalities],
+            "format": format,
+            "client_source": client_source,
+        },
+    )
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return StreamingResponse(
+        stream_bundle(
+            "gazification",
+            gazification_entries(municipalities, questions, filters),
+            sink_class,
+        ),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=gazification_bundle_{timestamp}.zip"
+        },
+    )
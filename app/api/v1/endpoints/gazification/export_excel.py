@@ -1,165 +1,65 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from fastapi.responses import FileResponse
-from app.core.utils import create_response, log_db_operation
-from app.schemas.base import BaseResponse
-from app.core.exceptions import DatabaseError
-from app.core.export_utils import get_gazification_data, parse_date
-from typing import Optional
-from datetime import datetime, timedelta
-import pandas as pd
-import tempfile
-import os
+from app.core.artifacts import Artifact, get_artifact_store
+from app.core.utils import cancel_on_disconnect, log_db_operation, log_export_sent
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.export_engine import ExportSink, export_to_artifact, load_sink
+from app.core.export_utils import ExportFilters, export_filters, get_gazification_rows
+from app.core.singleflight import single_flight
+from typing import Optional, Type
 
 router = APIRouter()
 
 
+@single_flight
+async def build_excel_export(
+    filters: ExportFilters,
+    sink_class: Type[ExportSink],
+) -> Artifact:
+    """
+    Строит файл выгрузки в хранилище файлов выгрузок.
+
+    Одинаковые выгрузки, запрошенные одновременно (например, двойное нажатие
+    кнопки), строятся один раз: остальные запросы ждут тот же файл. Файл
+    удаляется после отправки последнему из них.
+    """
+    source = await get_gazification_rows(filters)
+    artifact, rows = await export_to_artifact(source, sink_class)
+    log_db_operation(
+        "export",
+        "Excel" if sink_class.format == "xlsx" else sink_class.format,
+        {
+            **filters.to_log(),
+            "rows": rows,
+            "columns": len(source.columns),
+            "file": artifact.path,
+        },
+    )
+    return artifact
+
+
 @router.get("/export", response_class=FileResponse)
 async def export_to_excel(
-    mo_id: Optional[int] = Query(None, description="ID муниципалитета"),
-    district: Optional[str] = Query(None, description="Название района"),
-    street: Optional[str] = Query(None, description="Название улицы"),
-    date_from: Optional[str] = Query(
-        None,
-        description="Начальная дата для фильтрации (YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS)",
-    ),
-    date_to: Optional[str] = Query(
-        None,
-        description="Конечная дата для фильтрации (YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS)",
-    ),
+    request: Request,
+    filters: ExportFilters = Depends(export_filters),
+    format: str = Query("xlsx", description="Формат файла: xlsx, csv, ndjson, parquet"),
     client_source: Optional[str] = Query("web", description="Источник запроса (web, bot, api)"),
 ):
     """
     Экспорт данных в Excel файл
     Принимает фильтры (муниципалитет, район, улица, даты) и создает Excel-файл с данными.
     Если параметры не указаны, выгружаются все данные.
+    Параметр format выбирает другой формат файла с теми же колонками.
     """
     try:
-        dt_from = parse_date(date_from, is_start=True)
-        dt_to = parse_date(date_to, is_start=False)
-        addresses, questions, answers = await get_gazification_data(
-            mo_id, district, street, dt_from, dt_to
-        )
-
-        if not addresses:
-            raise HTTPException(
-                status_code=404,
-                detail="Не найдено данных для экспорта с указанными параметрами",
-            )
-
-        data = []
-
-        for address in addresses:
-            gas_status = "Нет"
-
-            if address.get("gas_type") == 3:
-                gas_status = "Да"
-            elif address.get("gas_type") == 6:
-                gas_status = "Адрес не существует"
-            elif address.get("gas_type") == 7:
-                gas_status = "Собственника нет дома"
-
-            date_create_formatted = None
-
-            if address.get("date_create"):
-                date_with_offset = address["date_create"] + timedelta(hours=7)
-                date_create_formatted = date_with_offset.strftime("%d.%m.%Y %H:%M")
-
-            row = {
-                "Дата создания": date_create_formatted,
-                "Создатель адреса": address.get("from_login") or "Отсутствует",
-                "Отправитель": address.get("gas_from_login") or "Отсутствует",
-                "Муниципалитет": address.get("mo_name", "Не указан"),
-                "Район": address.get("district") or address.get("city") or "Не указан",
-                "Улица": address.get("street", "Не указана"),
-                "Дом": address.get("house", "Не указан"),
-                "Квартира": address.get("flat", ""),
-                "Газифицирован?": gas_status,
-            }
-
-            for question in questions:
-                question_id = question.get("id")
-                column_name = question.get("type_value", f"Вопрос {question_id}")
-                address_id = address.get("id")
-                answer_value = ""
-                if address_id in answers and question_id in answers[address_id]:
-                    answer_value = answers[address_id][question_id]
-                row[column_name] = answer_value
-            data.append(row)
-
-        df = pd.DataFrame(data)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        temp_dir = tempfile.gettempdir()
-        file_path = os.path.join(temp_dir, f"gazification_export_{timestamp}.xlsx")
-
-        with pd.ExcelWriter(file_path, engine="xlsxwriter") as writer:
-            df.to_excel(writer, sheet_name="Газификация", index=False)
-            workbook = writer.book
-            worksheet = writer.sheets["Газификация"]
-            header_format = workbook.add_format(
-                {
-                    "bold": True,
-                    "text_wrap": True,
-                    "valign": "top",
-                    "align": "center",
-                    "border": 1,
-                    "bg_color": "#D7E4BC",
-                }
-            )
-            cell_format = workbook.add_format({"border": 1, "text_wrap": True})
-            date_format = workbook.add_format(
-                {"border": 1, "num_format": "dd.mm.yyyy hh:mm"}
-            )
-
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-                worksheet.set_column(col_num, col_num, max(len(str(value)) + 2, 15))
-
-            for row_num in range(1, len(df) + 1):
-                for col_num in range(len(df.columns)):
-                    column_name = df.columns[col_num]
-                    cell_value = df.iloc[row_num - 1, col_num]
-                    if column_name == "Дата создания" and cell_value:
-                        try:
-                            if isinstance(cell_value, str) and cell_value:
-                                date_obj = datetime.strptime(
-                                    cell_value, "%d.%m.%Y %H:%M"
-                                )
-                                worksheet.write(row_num, col_num, date_obj, date_format)
-                            else:
-                                worksheet.write(
-                                    row_num, col_num, cell_value, cell_format
-                                )
-                        except:
-                            worksheet.write(row_num, col_num, cell_value, cell_format)
-                    else:
-                        worksheet.write(row_num, col_num, cell_value, cell_format)
-
-            for col_num, column in enumerate(df.columns):
-                column_width = max(
-                    df[column].astype(str).map(len).max(), len(column) + 2
-                )
-                worksheet.set_column(col_num, col_num, min(column_width, 50))
-
-            log_db_operation(
-                "export",
-                f"Excel ({client_source})",
-                {
-                    "mo_id": mo_id,
-                    "district": district,
-                    "street": street,
-                    "date_from": dt_from.isoformat() if dt_from else None,
-                    "date_to": dt_to.isoformat() if dt_to else None,
-                    "client_source": client_source,
-                    "rows": len(data),
-                    "questions": len(questions),
-                    "file": file_path,
-                },
-            )
-
-        return FileResponse(
-            path=file_path,
-            filename=f"gazification_export_{timestamp}.xlsx",
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        sink_class = await load_sink(format)
+        artifact = await cancel_on_disconnect(
+            request, build_excel_export(filters, sink_class)
         )
+        log_export_sent(f"/export {sink_class.format}", client_source, artifact.filename)
+        return get_artifact_store().response(artifact, sink_class.media_type)
+    # 404, 507, отключение клиента и неизвестный формат - уже HTTPException
+    except (HTTPException, StatementTimeoutError):
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при экспорте данных в Excel: {str(e)}")
@@ -1,18 +1,28 @@
 from fastapi import APIRouter, Path
 from app.core.utils import create_response, log_db_operation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import TOPIC_ADDRESS
+from app.core.singleflight import single_flight
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import FlatListResponse
 from app.models.models import AddressV2, GazificationData
-from app.core.exceptions import DatabaseError
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.db import get_read_connection
 from tortoise.expressions import Q
 
 router = APIRouter()
+flats_cache = Cache(
+    "hints.flats", settings.CACHE_HINTS_TTL, topics=(TOPIC_ADDRESS,), scope="mo_id"
+)
 
 
 @router.get(
     "/mo/{mo_id}/district/{district}/street/{street}/house/{house}/flat",
     response_model=BaseResponse[FlatListResponse],
 )
+@flats_cache.cached
+@single_flight
 async def get_flats(
     mo_id: int = Path(),
     district: str = Path(),
@@ -21,9 +31,10 @@ async def get_flats(
 ):
     """Получение списка квартир по ID муниципалитета, району, улице и дому"""
     try:
+        connection = await get_read_connection()
         gazified_addresses = await GazificationData.filter(
             (Q(id_type_address=3) | Q(id_type_address=6) | Q(id_type_address=8)) & Q(deleted=False)
-        ).values_list("id_address", flat=True)
+        ).using_db(connection).values_list("id_address", flat=True)
         district_flats = (
             await AddressV2.filter(
                 Q(id_mo=mo_id)
@@ -36,6 +47,7 @@ async def get_flats(
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("flat", "district", flat=False)
         )
@@ -52,6 +64,7 @@ async def get_flats(
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("flat", "city", flat=False)
         )
@@ -80,5 +93,7 @@ async def get_flats(
             },
         )
         return create_response(data=FlatListResponse(flats=sorted(all_flats)))
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка квартир: {str(e)}")
@@ -1,24 +1,35 @@
 from fastapi import APIRouter, Path
 from app.core.utils import create_response, log_db_operation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import TOPIC_ADDRESS
+from app.core.singleflight import single_flight
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import HouseListResponse
 from app.models.models import AddressV2, GazificationData
-from app.core.exceptions import DatabaseError
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.db import get_read_connection
 from tortoise.expressions import Q
 
 router = APIRouter()
+houses_cache = Cache(
+    "hints.houses", settings.CACHE_HINTS_TTL, topics=(TOPIC_ADDRESS,), scope="mo_id"
+)
 
 
 @router.get(
     "/mo/{mo_id}/district/{district}/street/{street}/house",
     response_model=BaseResponse[HouseListResponse],
 )
+@houses_cache.cached
+@single_flight
 async def get_houses(mo_id: int = Path(), district: str = Path(), street: str = Path()):
     """Получение списка домов по ID муниципалитета, району и улице"""
     try:
+        connection = await get_read_connection()
         gazified_addresses = await GazificationData.filter(
             (Q(id_type_address=3) | Q(id_type_address=6) | Q(id_type_address=8)) & Q(deleted=False)
-        ).values_list("id_address", flat=True)
+        ).using_db(connection).values_list("id_address", flat=True)
         street_condition = Q(street=street)
         if street == "" or street == "Нет улиц":
             street_condition = Q(street="") | Q(street__isnull=True)
@@ -33,6 +44,7 @@ async def get_houses(mo_id: int = Path(), district: str = Path(), street: str =
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("house", "district", flat=False)
         )
@@ -48,6 +60,7 @@ async def get_houses(mo_id: int = Path(), district: str = Path(), street: str =
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("house", "city", flat=False)
         )
@@ -75,5 +88,7 @@ async def get_houses(mo_id: int = Path(), district: str = Path(), street: str =
             },
         )
         return create_response(data=HouseListResponse(houses=sorted(all_houses)))
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка домов: {str(e)}")
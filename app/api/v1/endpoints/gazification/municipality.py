@@ -1,21 +1,33 @@
 from fastapi import APIRouter
 from app.core.utils import create_response, log_db_operation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import TOPIC_ADDRESS
+from app.core.singleflight import single_flight
+from app.core.warmup import register_warmup
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import MOListResponse, MunicipalityModel
 from app.models.models import AddressV2, Municipality, GazificationData
-from app.core.exceptions import DatabaseError
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.db import get_read_connection
 from tortoise.expressions import Q
 
 router = APIRouter()
+municipalities_cache = Cache(
+    "hints.municipalities", settings.CACHE_HINTS_TTL, topics=(TOPIC_ADDRESS,)
+)
 
 
 @router.get("/mo", response_model=BaseResponse[MOListResponse])
+@municipalities_cache.cached
+@single_flight
 async def get_municipalities():
     """Получение списка муниципалитетов"""
     try:
+        connection = await get_read_connection()
         gazified_addresses = await GazificationData.filter(
             id_type_address=3, deleted=False
-        ).values_list("id_address", flat=True)
+        ).using_db(connection).values_list("id_address", flat=True)
         valid_mo_ids = (
             await AddressV2.filter(
                 Q(house__isnull=False)
@@ -23,17 +35,23 @@ async def get_municipalities():
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("id_mo", flat=True)
         )
         municipalities = await Municipality.filter(
             Q(tip=2) & Q(down_parent_id__in=valid_mo_ids)
-        ).all()
+        ).using_db(connection)
         log_db_operation("read", "Municipality", {"count": len(municipalities)})
         mo_list = [
             MunicipalityModel(id=mo.down_parent_id, name=mo.name)
             for mo in municipalities
         ]
         return create_response(data=MOListResponse(mos=mo_list))
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка муниципалитетов: {str(e)}")
+
+
+register_warmup("hints.municipalities", get_municipalities)
@@ -1,25 +1,36 @@
 from fastapi import APIRouter, Path
 from app.core.utils import create_response, log_db_operation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.invalidation import TOPIC_ADDRESS
+from app.core.singleflight import single_flight
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import StreetListResponse
 from app.models.models import AddressV2, GazificationData
-from app.core.exceptions import DatabaseError
+from app.core.exceptions import DatabaseError, StatementTimeoutError
+from app.core.db import get_read_connection
 from tortoise.expressions import Q
 
 router = APIRouter()
+streets_cache = Cache(
+    "hints.streets", settings.CACHE_HINTS_TTL, topics=(TOPIC_ADDRESS,), scope="mo_id"
+)
 
 
 @router.get(
     "/mo/{mo_id}/district/{district}/street",
     response_model=BaseResponse[StreetListResponse],
 )
+@streets_cache.cached
+@single_flight
 async def get_streets(mo_id: int = Path(), district: str = Path()):
     """Получение списка улиц по ID муниципалитета и ID района"""
     try:
+        connection = await get_read_connection()
         normalized_district = district.strip().lower()
         gazified_addresses = await GazificationData.filter(
             (Q(id_type_address=3) | Q(id_type_address=6) | Q(id_type_address=8)) & Q(deleted=False)
-        ).values_list("id_address", flat=True)
+        ).using_db(connection).values_list("id_address", flat=True)
         district_streets = (
             await AddressV2.filter(
                 Q(id_mo=mo_id)
@@ -31,6 +42,7 @@ async def get_streets(mo_id: int = Path(), district: str = Path()):
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("street", "district", flat=False)
         )
@@ -46,6 +58,7 @@ async def get_streets(mo_id: int = Path(), district: str = Path()):
                 & ~Q(id__in=gazified_addresses)
                 & Q(deleted=False)
             )
+            .using_db(connection)
             .distinct()
             .values_list("street", "city", flat=False)
         )
@@ -80,5 +93,7 @@ async def get_streets(mo_id: int = Path(), district: str = Path()):
             },
         )
         return create_response(data=StreetListResponse(streets=sorted(all_streets)))
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при получении списка улиц: {str(e)}")
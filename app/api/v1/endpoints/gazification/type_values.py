@@ -1,5 +1,11 @@
 from fastapi import APIRouter
 from app.core.utils import create_response, log_db_operation
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.export_utils import get_field_type_mapping
+from app.core.invalidation import TOPIC_QUESTIONNAIRE
+from app.core.singleflight import single_flight
+from app.core.warmup import register_warmup
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import (
     TypeValueModel,
@@ -7,15 +13,20 @@ from app.schemas.gazification import (
     RelatedFieldModel,
     ValueDependencyModel,
 )
-from app.models.models import FieldAnswer, TypeValue, FieldType, FieldReference
-from app.core.exceptions import DatabaseError
+from app.models.models import FieldAnswer, TypeValue, FieldReference
+from app.core.exceptions import DatabaseError, StatementTimeoutError
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
+type_values_cache = Cache(
+    "type_values", settings.CACHE_REFERENCE_TTL, topics=(TOPIC_QUESTIONNAIRE,)
+)
 
 
 @router.get("/type-values", response_model=BaseResponse[TypeValuesResponse])
+@type_values_cache.cached
+@single_flight
 async def get_type_values():
     """Получение списка типов значений"""
     try:
@@ -23,13 +34,17 @@ async def get_type_values():
             await TypeValue.filter(for_mobile=True).order_by("order").prefetch_related()
         )
         log_db_operation("read", "TypeValue", {"count": len(type_values)})
-        field_types = await FieldType.all()
-        field_type_mapping = {
-            ft.field_type_id: ft.field_type_name for ft in field_types
-        }
-        log_db_operation("read", "FieldType", {"count": len(field_types)})
+        field_type_mapping = await get_field_type_mapping()
         references = await FieldReference.all()
         log_db_operation("read", "FieldReference", {"count": len(references)})
+        # Варианты ответов всех вопросов одним запросом вместо запроса на каждый вопрос
+        all_answers = await FieldAnswer.filter(
+            type_value_id__in=[type_value.id for type_value in type_values]
+        ).order_by("order")
+        log_db_operation("read", "FieldAnswer", {"count": len(all_answers)})
+        answers_by_type_value = {}
+        for answer in all_answers:
+            answers_by_type_value.setdefault(answer.type_value_id, []).append(answer)
         field_references = {}
         for ref in references:
             normalized_value = str(ref.field_origin_value).lower().strip("\"'")
@@ -62,11 +77,7 @@ async def get_type_values():
                                 related_field_id=related_field.field_id,
                             )
                         )
-            answers = (
-                await FieldAnswer.filter(type_value_id=type_value.id)
-                .order_by("order")
-                .all()
-            )
+            answers = answers_by_type_value.get(type_value.id, [])
             answers_size = []
             if answers:
                 answers_values = [answer.field_answer_value for answer in answers]
@@ -92,8 +103,13 @@ async def get_type_values():
                 )
             )
         return create_response(data=TypeValuesResponse(type_values=values_list))
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         logger.error(
             f"Ошибка при получении списка типов значений: {str(e)}", exc_info=True
         )
         raise DatabaseError(f"Ошибка при получении списка типов значений: {str(e)}")
+
+
+register_warmup("type_values", get_type_values)
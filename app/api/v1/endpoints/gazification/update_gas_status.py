@@ -5,6 +5,7 @@ from app.schemas.base import BaseResponse
 from app.schemas.gazification import UpdateGasStatusRequest
 from app.models.models import AddressV2, GazificationData
 from app.core.exceptions import DatabaseError, NotFoundError
+from app.core.invalidation import TOPIC_ADDRESS, publish
 from tortoise.transactions import in_transaction
 from tortoise.expressions import Q
 
@@ -34,41 +35,53 @@ async def update_gas_status(request: UpdateGasStatusRequest):
         if not addresses:
             address_details = f"{request.mo_id}/{request.district or 'none'}/{request.street}/{request.house}/{request.flat or 'none'}"
             raise NotFoundError("Адрес не найден", address_details)
-        for address in addresses:
-            async with in_transaction() as conn:
-                id_type_address = 4
-                if request.has_gas == "true":
-                    id_type_address = 3
-                elif request.has_gas == "not_exist":
-                    id_type_address = 6
-                elif request.has_gas == "not_at_home":
-                    id_type_address = 7
-                # Помечаем все существующие записи как удаленные
-                await GazificationData.filter(
-                    id_address=address.id,
-                    deleted=False
-                ).update(deleted=True)
-                
-                # Создаем новую запись со статусом газификации
-                await GazificationData.create(
-                    id_address=address.id,
-                    id_type_address=id_type_address,
-                    is_mobile=True,
-                    from_login=request.from_login,
-                    date_create=datetime.now(timezone.utc),
-                )
-                log_db_operation(
-                    "update",
-                    "GazificationData",
-                    {
-                        "mo_id": request.mo_id,
-                        "district": request.district,
-                        "street": request.street,
-                        "house": request.house,
-                        "has_gas": request.has_gas,
-                    },
-                )
+        id_type_address = 4
+        if request.has_gas == "true":
+            id_type_address = 3
+        elif request.has_gas == "not_exist":
+            id_type_address = 6
+        elif request.has_gas == "not_at_home":
+            id_type_address = 7
+        address_ids = [address.id for address in addresses]
+        async with in_transaction() as conn:
+            # Помечаем все существующие записи как удаленные
+            await GazificationData.filter(
+                id_address__in=address_ids,
+                deleted=False
+            ).update(deleted=True)
+
+            # Создаем новые записи со статусом газификации
+            created_at = datetime.now(timezone.utc)
+            await GazificationData.bulk_create(
+                [
+                    GazificationData(
+                        id_address=address_id,
+                        id_type_address=id_type_address,
+                        is_mobile=True,
+                        from_login=request.from_login,
+                        date_create=created_at,
+                    )
+                    for address_id in address_ids
+                ]
+            )
+            log_db_operation(
+                "update",
+                "GazificationData",
+                {
+                    "mo_id": request.mo_id,
+                    "district": request.district,
+                    "street": request.street,
+                    "house": request.house,
+                    "has_gas": request.has_gas,
+                    "addresses_count": len(address_ids),
+                },
+            )
         await record_activity(request.from_login or "unknown", request.session_id)
+        await publish(
+            TOPIC_ADDRESS,
+            mo_id=request.mo_id,
+            address_id=address_ids[0] if len(address_ids) == 1 else None,
+        )
         return create_response(data=None, message="Статус газификации успешно обновлен")
     except Exception as e:
         raise
@@ -4,7 +4,8 @@ from app.core.utils import create_response, log_db_operation, record_activity
 from app.schemas.base import BaseResponse
 from app.schemas.gazification import GazificationUploadRequest
 from app.models.models import AddressV2, GazificationData, TypeValue
-from app.core.exceptions import DatabaseError, ValidationError
+from app.core.exceptions import DatabaseError, ValidationError, StatementTimeoutError
+from app.core.invalidation import TOPIC_ADDRESS, publish
 from tortoise.transactions import in_transaction
 from tortoise.expressions import Q
 
@@ -15,10 +16,12 @@ router = APIRouter()
 async def upload_gazification_data(request: GazificationUploadRequest):
     """Отправка записи о газификации"""
     try:
+        field_ids = {field.id for field in request.fields}
+        existing_ids = set(
+            await TypeValue.filter(id__in=field_ids).values_list("id", flat=True)
+        )
         for field in request.fields:
-            try:
-                await TypeValue.get(id=field.id)
-            except Exception as e:
+            if field.id not in existing_ids:
                 raise ValidationError(f"Тип значения с id={field.id} не найден")
         address_query = AddressV2.filter(
             id_mo=request.address.mo_id,
@@ -69,23 +72,30 @@ async def upload_gazification_data(request: GazificationUploadRequest):
                 deleted=False
             ).update(deleted=True)
             
-            for field in request.fields:
-                type_value = await TypeValue.get(id=field.id)
-                await GazificationData.create(
-                    id_address=address.id,
-                    id_type_address=4,
-                    id_type_value=type_value.id,
-                    value=field.value,
-                    is_mobile=True,
-                    from_login=request.from_login,
-                    date_create=datetime.now(timezone.utc),
-                )
+            created_at = datetime.now(timezone.utc)
+            await GazificationData.bulk_create(
+                [
+                    GazificationData(
+                        id_address=address.id,
+                        id_type_address=4,
+                        id_type_value=field.id,
+                        value=field.value,
+                        is_mobile=True,
+                        from_login=request.from_login,
+                        date_create=created_at,
+                    )
+                    for field in request.fields
+                ]
+            )
             log_db_operation(
                 "create",
                 "GazificationData",
                 {"address_id": address.id, "fields_count": len(request.fields)},
             )
             await record_activity(request.from_login or "unknown", request.session_id)
+        await publish(TOPIC_ADDRESS, mo_id=request.address.mo_id, address_id=address.id)
         return create_response(data=None, message="Данные успешно сохранены")
+    except StatementTimeoutError:
+        raise
     except Exception as e:
         raise DatabaseError(f"Ошибка при сохранении данных: {str(e)}")
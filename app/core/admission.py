@@ -0,0 +1,208 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_REJECTED,
+)
+from app.core.route_classes import EXPORTS, HINTS, WRITES, classify_request
+from app.core.shutdown import is_draining, track_export
+from app.schemas.base import BaseResponse
+
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+SHUTTING_DOWN = "shutting_down"
+SHUTTING_DOWN_RETRY_AFTER = 5
+REJECT_MESSAGES = {
+    QUEUE_FULL: "Слишком много одновременных запросов, повторите позже",
+    QUEUE_TIMEOUT: "Сервис перегружен, повторите позже",
+    SHUTTING_DOWN: "Сервис перезапускается, повторите позже",
+}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteClassLimiter:
+    """
+    Concurrency limit with a bounded FIFO queue for one route class.
+
+    A released slot is handed directly to the oldest waiter, so queued
+    requests are not overtaken by new arrivals. A full queue fails fast
+    with 429, a request that waited longer than `queue_timeout` gets 503.
+    """
+
+    def __init__(self, route_class: str, concurrency: int, queue_size: int, queue_timeout: float):
+        self.route_class = route_class
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.avg_hold_seconds = 0.0
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain."""
+        backlog = len(self.waiters) + 1
+        return max(1, math.ceil(self.avg_hold_seconds * backlog / self.concurrency))
+
+    async def acquire(self) -> None:
+        if self.active < self.concurrency and not self.waiters:
+            self.active += 1
+            self._update_gauges()
+            return
+        if len(self.waiters) >= self.queue_size:
+            raise AdmissionRejected(429, QUEUE_FULL, self.retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self._update_gauges()
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise AdmissionRejected(503, QUEUE_TIMEOUT, self.retry_after())
+        except BaseException:
+            # The slot may have been handed over just before cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            self._update_gauges()
+            ADMISSION_QUEUE_WAIT.observe(
+                time.perf_counter() - start_time, route_class=self.route_class
+            )
+
+    def release(self, held_seconds: float) -> None:
+        if held_seconds:
+            self.avg_hold_seconds = (
+                held_seconds
+                if not self.avg_hold_seconds
+                else 0.9 * self.avg_hold_seconds + 0.1 * held_seconds
+            )
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self.active -= 1
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        ADMISSION_ACTIVE.set(self.active, route_class=self.route_class)
+        ADMISSION_QUEUE_DEPTH.set(len(self.waiters), route_class=self.route_class)
+
+
+_limiters: Dict[str, RouteClassLimiter] = {}
+
+
+def get_limiter(route_class: str) -> Optional[RouteClassLimiter]:
+    """Returns the limiter for a route class, None if the class is not limited."""
+    limits = {
+        HINTS: (
+            settings.ADMISSION_HINTS_CONCURRENCY,
+            settings.ADMISSION_HINTS_QUEUE,
+            settings.ADMISSION_HINTS_QUEUE_TIMEOUT,
+        ),
+        WRITES: (
+            settings.ADMISSION_WRITES_CONCURRENCY,
+            settings.ADMISSION_WRITES_QUEUE,
+            settings.ADMISSION_WRITES_QUEUE_TIMEOUT,
+        ),
+        EXPORTS: (
+            settings.ADMISSION_EXPORTS_CONCURRENCY,
+            settings.ADMISSION_EXPORTS_QUEUE,
+            settings.ADMISSION_EXPORTS_QUEUE_TIMEOUT,
+        ),
+    }.get(route_class)
+    if limits is None or limits[0] <= 0:
+        return None
+    limiter = _limiters.get(route_class)
+    if limiter is None:
+        limiter = _limiters[route_class] = RouteClassLimiter(route_class, *limits)
+    return limiter
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware that limits concurrent requests per route class.
+
+    Exports, writes and address hints have separate limits, so a burst of
+    heavy exports queues up behind its own limit instead of taking every
+    pool connection from field workers. Rejected requests get 429/503 with
+    Retry-After; unclassified routes (system, login) are never limited.
+    Once the worker is draining for shutdown, exports get 503 regardless of
+    the limits.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route_class = scope.get("state", {}).get("route_class") or classify_request(
+            scope["method"], scope["path"]
+        )
+        if route_class != EXPORTS:
+            await self._admit(route_class, scope, receive, send)
+            return
+        # Exports are counted from arrival, so shutdown also waits for queued ones
+        async with track_export():
+            await self._admit(route_class, scope, receive, send)
+
+    async def _admit(self, route_class: str, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = get_limiter(route_class) if settings.ADMISSION_CONTROL_ENABLED else None
+        try:
+            self._check_draining(route_class)
+            if limiter is not None:
+                await limiter.acquire()
+                start_time = time.perf_counter()
+                try:
+                    # A queued export may be admitted after draining has started
+                    self._check_draining(route_class)
+                except AdmissionRejected:
+                    limiter.release(0.0)
+                    raise
+        except AdmissionRejected as e:
+            await self._reject(route_class, e, scope, receive, send)
+            return
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start_time)
+
+    @staticmethod
+    def _check_draining(route_class: str) -> None:
+        if route_class == EXPORTS and is_draining():
+            raise AdmissionRejected(503, SHUTTING_DOWN, SHUTTING_DOWN_RETRY_AFTER)
+
+    @staticmethod
+    async def _reject(
+        route_class: str, error: AdmissionRejected, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        ADMISSION_REJECTED.inc(route_class=route_class, reason=error.reason)
+        response = JSONResponse(
+            status_code=error.status_code,
+            content=BaseResponse(ok=False, message=REJECT_MESSAGES[error.reason]).model_dump(),
+            headers={"Retry-After": str(error.retry_after)},
+        )
+        await response(scope, receive, send)
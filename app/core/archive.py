@@ -0,0 +1,157 @@
+import asyncio
+import contextlib
+import time
+from datetime import datetime
+from typing import AsyncIterator, List
+import asyncpg
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+from app.core.config import settings
+from app.core.db import get_pool_stats
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import ARCHIVE_BATCH_DURATION, ARCHIVE_ROWS
+
+logger = get_logger("archive")
+
+SCHEMA = "s_gazifikacia"
+LIVE_TABLE = "t_gazifikacia_data"
+ARCHIVE_TABLE = "t_gazifikacia_data_archive"
+# Session advisory lock held by the worker that currently archives
+ARCHIVE_LOCK_KEY = 720_038_001
+COLUMNS = (
+    '"id", "id_address", "id_type_address", "id_type_value", "value", "date_doc", '
+    '"date", "date_create", "is_mobile", "from_login", "deleted"'
+)
+
+SELECT_BATCH_QUERY = f"""
+    SELECT "id", date_trunc('month', "date_create" AT TIME ZONE 'UTC') AS "month"
+    FROM "{SCHEMA}"."{LIVE_TABLE}"
+    WHERE "deleted" AND "date_create" < now() - make_interval(days => $1)
+    ORDER BY "id"
+    LIMIT $2
+"""
+
+MOVE_BATCH_QUERY = f"""
+    WITH "moved" AS (
+        DELETE FROM "{SCHEMA}"."{LIVE_TABLE}"
+        WHERE "id" = ANY($1::int[]) AND "deleted"
+        RETURNING {COLUMNS}
+    ), "inserted" AS (
+        INSERT INTO "{SCHEMA}"."{ARCHIVE_TABLE}" ({COLUMNS})
+        SELECT {COLUMNS} FROM "moved"
+        RETURNING 1
+    )
+    SELECT count(*) AS "moved" FROM "inserted"
+"""
+
+
+def partition_name(month: datetime) -> str:
+    return f"{ARCHIVE_TABLE}_p{month:%Y%m}"
+
+
+async def ensure_partitions(months: List[datetime]) -> None:
+    """Creates monthly archive partitions for the given month starts (UTC)."""
+    connection = Tortoise.get_connection("default")
+    for month in sorted(set(months)):
+        next_month = month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+        await connection.execute_script(
+            f'CREATE TABLE IF NOT EXISTS "{SCHEMA}"."{partition_name(month)}" '
+            f'PARTITION OF "{SCHEMA}"."{ARCHIVE_TABLE}" '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d} 00:00:00+00') "
+            f"TO ('{next_month:%Y-%m-%d} 00:00:00+00')"
+        )
+
+
+async def archive_batch(batch_size: int, min_age_days: int) -> int:
+    """
+    Moves one batch of soft-deleted history rows into the archive.
+
+    Rows are picked by id first, so partitions can be created outside of the
+    moving transaction; the move itself is a single DELETE ... RETURNING
+    feeding an INSERT. Returns the number of moved rows.
+    """
+    connection = Tortoise.get_connection("default")
+    rows = await connection.execute_query_dict(SELECT_BATCH_QUERY, [min_age_days, batch_size])
+    if not rows:
+        return 0
+    start_time = time.perf_counter()
+    await ensure_partitions([row["month"] for row in rows])
+    async with in_transaction("default") as conn:
+        result = await conn.execute_query_dict(MOVE_BATCH_QUERY, [[row["id"] for row in rows]])
+    moved = result[0]["moved"]
+    ARCHIVE_ROWS.inc(moved)
+    ARCHIVE_BATCH_DURATION.observe(time.perf_counter() - start_time)
+    return moved
+
+
+@contextlib.asynccontextmanager
+async def archive_lock() -> AsyncIterator[bool]:
+    """
+    Tries to take the archive advisory lock; yields whether it was taken.
+
+    The lock lives on a dedicated connection outside the pool, so it is not
+    handed to a request, and it is released when that connection closes,
+    even if the worker dies.
+    """
+    connection = await asyncpg.connect(settings.DATABASE_URL, timeout=10)
+    try:
+        yield await connection.fetchval("SELECT pg_try_advisory_lock($1)", ARCHIVE_LOCK_KEY)
+    finally:
+        await connection.close()
+
+
+async def archive_deleted_history() -> int:
+    """
+    Moves soft-deleted rows in batches until none are left.
+
+    Only one worker archives at a time: the others find the advisory lock
+    taken and skip the pass. Sleeps ARCHIVE_BATCH_PAUSE between batches and
+    waits while requests are queued for a pool connection, so the job does
+    not compete with traffic.
+    """
+    async with archive_lock() as locked:
+        if not locked:
+            logger.debug(
+                categorize_log(
+                    "History archival skipped: another worker holds the lock", LogCategory.DB
+                )
+            )
+            return 0
+        return await _archive_batches()
+
+
+async def _archive_batches() -> int:
+    total = 0
+    while True:
+        while get_pool_stats("default")["waiters"]:
+            await asyncio.sleep(settings.ARCHIVE_BATCH_PAUSE)
+        moved = await archive_batch(settings.ARCHIVE_BATCH_SIZE, settings.ARCHIVE_MIN_AGE_DAYS)
+        total += moved
+        if moved < settings.ARCHIVE_BATCH_SIZE:
+            return total
+        await asyncio.sleep(settings.ARCHIVE_BATCH_PAUSE)
+
+
+async def run_archiver() -> None:
+    """Background loop started from the application lifespan."""
+    while True:
+        start_time = time.perf_counter()
+        try:
+            moved = await archive_deleted_history()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                categorize_log(f"History archival failed: {e}", LogCategory.DB),
+                exc_info=True,
+            )
+        else:
+            if moved:
+                logger.info(
+                    categorize_log("Archived deleted history rows", LogCategory.DB),
+                    extra={
+                        "rows": moved,
+                        "duration_ms": round((time.perf_counter() - start_time) * 1000, 2),
+                    },
+                )
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL)
@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+from fastapi.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+from app.core.config import settings
+from app.core.exceptions import StorageQuotaExceededError
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import EXPORT_ARTIFACT_BYTES, EXPORT_ARTIFACT_DELETIONS, EXPORT_ARTIFACTS
+
+logger = get_logger("artifacts")
+
+# Kept in front of the name, so writers still see the file extension
+PARTIAL_PREFIX = ".partial-"
+# A finished file nobody has downloaded yet is only evicted for quota after this
+UNSENT_GRACE_SECONDS = 60.0
+
+
+class Artifact:
+    """One export file on disk; `filename` is the name offered for download."""
+
+    def __init__(self, path: str, filename: str):
+        self.path = path
+        self.filename = filename
+        self.size = 0
+        self.refs = 0
+        self.complete = False
+        self.sent = False
+        self.last_used = time.monotonic()
+
+    @property
+    def write_path(self) -> str:
+        """Path to write to; the file is moved to `path` once complete."""
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, PARTIAL_PREFIX + name)
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+
+class ArtifactStore:
+    """
+    Export files of this worker in one directory, bounded by a disk quota.
+
+    Files get unique names and are written under a temporary name, so a
+    half-written file is never served. A file is deleted after its last
+    download (EXPORT_DELETE_AFTER_SEND) or once idle for `retention`.
+    When a new export would not fit, idle files are evicted least recently
+    used first; if nothing can be evicted the export is refused with 507.
+    Files in use are never evicted. The quota applies per worker.
+    """
+
+    def __init__(self, directory: str, quota_bytes: int, retention: float, delete_after_send: bool):
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.retention = retention
+        self.delete_after_send = delete_after_send
+        self.used_bytes = 0
+        self._artifacts: Dict[str, Artifact] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @contextlib.asynccontextmanager
+    async def create(self, prefix: str, suffix: str) -> AsyncIterator[Artifact]:
+        """
+        Reserves a new artifact; the caller writes to `artifact.write_path`.
+
+        On error the partial file is removed. The artifact is returned
+        unreferenced: pass it to `response()` to serve it.
+        """
+        self._evict()
+        if self.used_bytes >= self.quota_bytes:
+            raise StorageQuotaExceededError()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"{prefix}_{timestamp}{suffix}"
+        artifact = Artifact(
+            os.path.join(self.directory, f"{prefix}_{timestamp}_{uuid.uuid4().hex[:12]}{suffix}"),
+            filename,
+        )
+        artifact.refs = 1
+        self._artifacts[artifact.path] = artifact
+        try:
+            yield artifact
+            os.replace(artifact.write_path, artifact.path)
+        except BaseException:
+            self._artifacts.pop(artifact.path, None)
+            _remove(artifact.write_path)
+            EXPORT_ARTIFACT_DELETIONS.inc(reason="failed")
+            self._update_gauges()
+            raise
+        finally:
+            artifact.refs -= 1
+        artifact.size = os.path.getsize(artifact.path)
+        artifact.complete = True
+        artifact.last_used = time.monotonic()
+        self.used_bytes += artifact.size
+        self._update_gauges()
+        self._evict()
+        if self.used_bytes > self.quota_bytes:
+            logger.warning(
+                categorize_log(
+                    f"Export files use {self.used_bytes} bytes, over the quota of {self.quota_bytes}",
+                    LogCategory.GENERAL,
+                )
+            )
+
+    def response(self, artifact: Artifact, media_type: str) -> "ArtifactResponse":
+        """FileResponse that holds the artifact until the file has been sent."""
+        return ArtifactResponse(self, artifact, media_type)
+
+    def acquire(self, artifact: Artifact) -> None:
+        artifact.refs += 1
+        artifact.last_used = time.monotonic()
+
+    def release(self, artifact: Artifact, sent: bool) -> None:
+        artifact.refs -= 1
+        artifact.last_used = time.monotonic()
+        artifact.sent = artifact.sent or sent
+        if artifact.refs <= 0 and artifact.sent and self.delete_after_send:
+            self.delete(artifact, "sent")
+
+    def delete(self, artifact: Artifact, reason: str) -> None:
+        if self._artifacts.pop(artifact.path, None) is None:
+            return
+        _remove(artifact.path)
+        if artifact.complete:
+            self.used_bytes -= artifact.size
+        EXPORT_ARTIFACT_DELETIONS.inc(reason=reason)
+        self._update_gauges()
+
+    def sweep(self) -> int:
+        """Deletes artifacts idle for longer than `retention`, including leftovers on disk."""
+        deleted = 0
+        for artifact in list(self._artifacts.values()):
+            # An abandoned download may never release its reference
+            if artifact.complete and artifact.idle_seconds() > self.retention:
+                self.delete(artifact, "expired")
+                deleted += 1
+        # Files of previous runs and other workers are recognised by their age
+        cutoff = time.time() - self.retention
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                path = os.path.join(self.directory, entry.name.removeprefix(PARTIAL_PREFIX))
+                if path in self._artifacts or not entry.is_file():
+                    continue
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        EXPORT_ARTIFACT_DELETIONS.inc(reason="expired")
+                        deleted += 1
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+    def close(self) -> None:
+        """Deletes every artifact of this worker; called on shutdown."""
+        for artifact in list(self._artifacts.values()):
+            if artifact.complete:
+                self.delete(artifact, "shutdown")
+
+    def _evict(self) -> None:
+        candidates = sorted(
+            (
+                artifact
+                for artifact in self._artifacts.values()
+                if artifact.complete
+                and artifact.refs <= 0
+                and (artifact.sent or artifact.idle_seconds() > UNSENT_GRACE_SECONDS)
+            ),
+            key=lambda artifact: artifact.last_used,
+        )
+        for artifact in candidates:
+            if self.used_bytes < self.quota_bytes:
+                break
+            self.delete(artifact, "evicted")
+
+    def _update_gauges(self) -> None:
+        EXPORT_ARTIFACT_BYTES.set(self.used_bytes)
+        EXPORT_ARTIFACTS.set(len(self._artifacts))
+
+
+class ArtifactResponse(FileResponse):
+    def __init__(self, store: ArtifactStore, artifact: Artifact, media_type: str):
+        super().__init__(path=artifact.path, filename=artifact.filename, media_type=media_type)
+        self.store = store
+        self.artifact = artifact
+        store.acquire(artifact)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        sent = False
+        try:
+            await super().__call__(scope, receive, send)
+            sent = True
+        finally:
+            self.store.release(self.artifact, sent)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    if _store is None:
+        _store = ArtifactStore(
+            settings.EXPORT_DIR or os.path.join(tempfile.gettempdir(), "rkc-exports"),
+            settings.EXPORT_DISK_QUOTA_MB * 1024 * 1024,
+            settings.EXPORT_RETENTION,
+            settings.EXPORT_DELETE_AFTER_SEND,
+        )
+    return _store
+
+
+async def run_artifact_sweeper() -> None:
+    """Background loop started from the application lifespan."""
+    store = get_artifact_store()
+    while True:
+        try:
+            deleted = store.sweep()
+        except OSError as e:
+            logger.error(categorize_log(f"Export file sweep failed: {e}", LogCategory.ERROR))
+        else:
+            if deleted:
+                logger.info(
+                    categorize_log(f"Deleted {deleted} expired export file(s)", LogCategory.GENERAL)
+                )
+        await asyncio.sleep(settings.EXPORT_SWEEP_INTERVAL)
+
+
+def close_artifacts() -> None:
+    if _store is not None:
+        _store.close()
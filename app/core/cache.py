@@ -0,0 +1,359 @@
+import asyncio
+import functools
+import inspect
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import unquote, urlparse
+from app.core.config import settings
+from app.core.db import primary_reads
+from app.core.invalidation import TOPIC_ALL, effective_ttl, subscribe
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import CACHE_ENTRIES, CACHE_ERRORS, CACHE_EVICTIONS, CACHE_REQUESTS
+from app.core.singleflight import make_key
+
+logger = get_logger("cache")
+
+T = TypeVar("T")
+MISSING = object()
+
+
+class CacheBackend:
+    """Storage for one cache namespace; keys are strings, values are opaque."""
+
+    async def get(self, key: str) -> Any:
+        """Returns the stored value or MISSING."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def invalidate(self, prefix: str = "") -> None:
+        """Drops keys starting with `prefix`; may complete in the background."""
+        raise NotImplementedError
+
+    async def flush(self, timeout: float) -> None:
+        """Waits up to `timeout` for background invalidations to complete."""
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU with per-entry TTL, bounded by `max_entries`."""
+
+    def __init__(self, namespace: str, max_entries: int):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._update_gauge()
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(namespace=self.namespace)
+        self._update_gauge()
+
+    def invalidate(self, prefix: str = "") -> None:
+        if not prefix:
+            self._entries.clear()
+        else:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+        self._update_gauge()
+
+    def _update_gauge(self) -> None:
+        CACHE_ENTRIES.set(len(self._entries), namespace=self.namespace)
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisConnection:
+    """Single connection speaking RESP2, enough for GET/SET/SCAN/UNLINK."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, url: str) -> "RedisConnection":
+        parsed = urlparse(url)
+        reader, writer = await asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 6379)
+        connection = cls(reader, writer)
+        if parsed.password:
+            credentials = [unquote(parsed.password)]
+            if parsed.username:
+                credentials.insert(0, unquote(parsed.username))
+            await connection.command("AUTH", *credentials)
+        database = parsed.path.strip("/")
+        if database and database != "0":
+            await connection.command("SELECT", database)
+        return connection
+
+    async def command(self, *args: Any) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.writer.write(b"".join(parts))
+        await self.writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self) -> Any:
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise RedisError(f"unexpected reply: {line[:50]!r}")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisClient:
+    """Small connection pool; a connection that failed mid-command is discarded."""
+
+    def __init__(self, url: str, pool_size: int, timeout: float):
+        self.url = url
+        self.timeout = timeout
+        self._idle: List[RedisConnection] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def command(self, *args: Any) -> Any:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(RedisConnection.open(self.url), self.timeout)
+                reply = await asyncio.wait_for(connection.command(*args), self.timeout)
+            except RedisError:
+                # The error reply was read completely, the connection stays usable
+                self._idle.append(connection)
+                raise
+            except BaseException as e:
+                if connection is not None:
+                    connection.close()
+                if isinstance(e, (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError)):
+                    raise ConnectionError(f"redis unavailable: {e!r}") from e
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Shared backend on a Redis-compatible server.
+
+    Values are pickled, so the server must be trusted like the database.
+    Size bounds are left to the server's maxmemory policy. Any server error
+    is logged and treated as a miss: the cache never fails a request.
+    """
+
+    def __init__(self, namespace: str, client: RedisClient, key_prefix: str):
+        self.namespace = namespace
+        self.client = client
+        self.key_prefix = f"{key_prefix}:{namespace}:"
+        self._pending: set = set()
+
+    async def get(self, key: str) -> Any:
+        try:
+            data = await self.client.command("GET", self.key_prefix + key)
+        except (ConnectionError, RedisError) as e:
+            self._error("get", e)
+            return MISSING
+        return MISSING if data is None else pickle.loads(data)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            await self.client.command("SET", self.key_prefix + key, data, "PX", max(1, int(ttl * 1000)))
+        except (ConnectionError, RedisError) as e:
+            self._error("set", e)
+
+    def invalidate(self, prefix: str = "") -> None:
+        task = asyncio.get_running_loop().create_task(self._delete_prefix(prefix))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def flush(self, timeout: float) -> None:
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+    async def _delete_prefix(self, prefix: str) -> None:
+        pattern = _escape_glob(self.key_prefix + prefix) + "*"
+        cursor = b"0"
+        try:
+            while True:
+                cursor, keys = await self.client.command("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+                if keys:
+                    await self.client.command("UNLINK", *keys)
+                if cursor in (b"0", "0"):
+                    break
+        except (ConnectionError, RedisError) as e:
+            self._error("invalidate", e)
+
+    def _error(self, operation: str, error: Exception) -> None:
+        CACHE_ERRORS.inc(namespace=self.namespace, operation=operation)
+        logger.warning(
+            categorize_log(f"Cache backend error on {operation}: {error}", LogCategory.ERROR),
+            extra={"namespace": self.namespace},
+        )
+
+
+def _escape_glob(value: str) -> str:
+    return "".join(f"\\{char}" if char in "*?[]\\" else char for char in value)
+
+
+_redis_client: Optional[RedisClient] = None
+
+
+def create_backend(namespace: str, max_entries: int) -> CacheBackend:
+    """Backend selected by CACHE_BACKEND ("memory" or "redis")."""
+    global _redis_client
+    if settings.CACHE_BACKEND == "redis":
+        if _redis_client is None:
+            _redis_client = RedisClient(
+                settings.CACHE_REDIS_URL, settings.CACHE_REDIS_POOL_SIZE, settings.CACHE_REDIS_TIMEOUT
+            )
+        return RedisBackend(namespace, _redis_client, settings.CACHE_KEY_PREFIX)
+    if settings.CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+    return MemoryBackend(namespace, max_entries)
+
+
+class Cache:
+    """
+    Namespaced cache with TTL, hit/miss counters and invalidation by topic.
+
+    Entries are dropped when an invalidation event with one of `topics`
+    arrives. With `scope` (an argument name such as "mo_id"), keys are
+    prefixed with that argument, and an event carrying the same field only
+    drops the entries of that scope. TTL is shortened while the invalidation
+    listener is disconnected. A value computed while an invalidation arrived
+    is returned but not stored, so stale reads do not outlive the event.
+    Values are loaded from the primary, never from a lagging replica.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        topics: Iterable[str] = (),
+        scope: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.topics = set(topics)
+        self.scope = scope
+        self.backend = backend or create_backend(
+            namespace, max_entries or settings.CACHE_MAX_ENTRIES
+        )
+        self._generation = 0
+        _caches.append(self)
+
+    async def get(self, key: str) -> Any:
+        value = await self.backend.get(key)
+        CACHE_REQUESTS.inc(namespace=self.namespace, result="miss" if value is MISSING else "hit")
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.backend.set(key, value, effective_ttl(self.ttl if ttl is None else ttl))
+
+    def invalidate(self, scope_value: Any = None) -> None:
+        self._generation += 1
+        self.backend.invalidate("" if scope_value is None else f"{scope_value}|")
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        topic = event.get("topic")
+        if topic == TOPIC_ALL:
+            self.invalidate()
+        elif topic in self.topics:
+            self.invalidate(event.get(self.scope) if self.scope else None)
+
+    def make_key(self, arguments: Dict[str, Any]) -> str:
+        key = repr(make_key(arguments))
+        if self.scope:
+            return f"{arguments.get(self.scope)}|{key}"
+        return key
+
+    def cached(self, func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        """
+        Caches results of an async function by its bound arguments.
+
+        Keeps the original signature, so it can be placed under FastAPI
+        route decorators; exceptions are not cached.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            if not settings.CACHE_ENABLED:
+                return await func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = self.make_key(bound.arguments)
+            value = await self.get(key)
+            if value is not MISSING:
+                return value
+            generation = self._generation
+            with primary_reads():
+                value = await func(*args, **kwargs)
+            if generation == self._generation:
+                await self.set(key, value)
+            return value
+
+        wrapper.cache = self
+        return wrapper
+
+
+_caches: List[Cache] = []
+
+
+@subscribe
+def _on_invalidation(event: Dict[str, Any]) -> None:
+    for cache in _caches:
+        cache.handle_event(event)
+
+
+async def close_caches(timeout: float = 5.0) -> None:
+    """Finishes pending invalidations within `timeout` and closes backend connections."""
+    deadline = time.monotonic() + timeout
+    for cache in _caches:
+        await cache.backend.flush(max(deadline - time.monotonic(), 0))
+    if _redis_client is not None:
+        await _redis_client.close()
@@ -1,23 +1,127 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
+from tortoise.backends.base.config_generator import expand_db_url
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 5
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: Optional[float] = None
+    DB_MAX_INACTIVE_CONNECTION_LIFETIME: float = 300.0
+    DATABASE_READ_URL: Optional[str] = None
+    DB_READ_POOL_MAX_SIZE: int = 5
+    DB_READ_MAX_LAG_SECONDS: float = 30.0
+    DB_READ_LAG_CHECK_INTERVAL: float = 5.0
+    DB_READ_CHECK_TIMEOUT: float = 2.0
     LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_ENABLED: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_QUEUE_POLICY: str = "drop"
+    LOG_QUEUE_BLOCK_TIMEOUT: float = 0.05
     ENABLE_REQUEST_LOGGING: bool = True
+    REQUEST_LOG_BODY_SAMPLE_RATE: float = 1.0
+    REQUEST_LOG_BODY_MAX_BYTES: int = 10000
+    REQUEST_LOG_REDACT: bool = True
     LOG_SQL_QUERIES: bool = False
+    DB_STATEMENT_TIMEOUT_HINTS: Optional[float] = 5.0
+    DB_STATEMENT_TIMEOUT_WRITES: Optional[float] = 15.0
+    DB_STATEMENT_TIMEOUT_EXPORTS: Optional[float] = 300.0
+    EXPORT_DISCONNECT_POLL_INTERVAL: float = 0.5
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_HINTS_CONCURRENCY: int = 20
+    ADMISSION_HINTS_QUEUE: int = 100
+    ADMISSION_HINTS_QUEUE_TIMEOUT: float = 5.0
+    ADMISSION_WRITES_CONCURRENCY: int = 10
+    ADMISSION_WRITES_QUEUE: int = 50
+    ADMISSION_WRITES_QUEUE_TIMEOUT: float = 10.0
+    ADMISSION_EXPORTS_CONCURRENCY: int = 2
+    ADMISSION_EXPORTS_QUEUE: int = 4
+    ADMISSION_EXPORTS_QUEUE_TIMEOUT: float = 30.0
+    SINGLEFLIGHT_ENABLED: bool = True
+    DB_DEBUG_HEADERS: bool = False
+    DB_QUERY_BUDGET: int = 20
+    DB_TIME_BUDGET_MS: float = 500.0
+    DB_REPEATED_QUERY_THRESHOLD: int = 5
     TELEGRAM_BOT_TOKEN: str
     TELEGRAM_CHAT_ID: str
     TELEGRAM_LOG_LEVEL: str = "INFO"
     ENABLE_TELEGRAM_LOGGING: bool = False
+    TELEGRAM_API_BASE_URL: str = "https://api.telegram.org/bot"
+    TELEGRAM_QUEUE_SIZE: int = 1000
+    TELEGRAM_MIN_SEND_INTERVAL: float = 3.0
+    EVENT_LOOP_LAG_INTERVAL: float = 0.5
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 50
+    PROFILING_SAMPLE_INTERVAL: float = 0.005
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_INTERVAL: float = 3600.0
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_BATCH_PAUSE: float = 1.0
+    ARCHIVE_MIN_AGE_DAYS: int = 7
+    INVALIDATION_ENABLED: bool = True
+    INVALIDATION_FALLBACK_TTL: float = 30.0
+    INVALIDATION_KEEPALIVE_INTERVAL: float = 30.0
+    INVALIDATION_RECONNECT_MAX_DELAY: float = 30.0
+    CACHE_ENABLED: bool = True
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_ENTRIES: int = 1024
+    CACHE_HINTS_TTL: float = 300.0
+    CACHE_REFERENCE_TTL: float = 3600.0
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_REDIS_POOL_SIZE: int = 4
+    CACHE_REDIS_TIMEOUT: float = 0.5
+    CACHE_KEY_PREFIX: str = "rkc"
+    WARMUP_ENABLED: bool = True
+    WARMUP_WAIT: bool = True
+    WARMUP_TIMEOUT: float = 30.0
+    WARMUP_DB_CONNECTIONS: int = 3
+    READINESS_DB_TIMEOUT: float = 1.0
+    READINESS_MAX_POOL_WAITERS: int = 5
+    READINESS_MAX_LOOP_LAG: float = 0.5
+    SHUTDOWN_EXPORT_TIMEOUT: float = 60.0
+    SHUTDOWN_FLUSH_TIMEOUT: float = 5.0
+    SHUTDOWN_DB_TIMEOUT: float = 10.0
+    EXPORT_DIR: Optional[str] = None
+    EXPORT_DELETE_AFTER_SEND: bool = True
+    EXPORT_RETENTION: float = 3600.0
+    EXPORT_DISK_QUOTA_MB: int = 1024
+    EXPORT_SWEEP_INTERVAL: float = 300.0
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_UTC_OFFSET_HOURS: int = 7
 
     class Config:
         env_file = ".env"
 
 
+def build_db_connection(db_url: str, max_size: int) -> dict:
+    """Собирает конфигурацию подключения с параметрами пула из настроек"""
+    connection = expand_db_url(db_url)
+    connection["engine"] = "app.core.db"
+    connection["credentials"].update(
+        {
+            "minsize": settings.DB_POOL_MIN_SIZE,
+            "maxsize": max_size,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+            "max_inactive_connection_lifetime": settings.DB_MAX_INACTIVE_CONNECTION_LIFETIME,
+        }
+    )
+    return connection
+
+
 settings = Settings()
+DB_CONNECTIONS = {
+    "default": build_db_connection(settings.DATABASE_URL, settings.DB_POOL_MAX_SIZE)
+}
+if settings.DATABASE_READ_URL:
+    DB_CONNECTIONS["replica"] = build_db_connection(
+        settings.DATABASE_READ_URL, settings.DB_READ_POOL_MAX_SIZE
+    )
 TORTOISE_ORM = {
-    "connections": {"default": settings.DATABASE_URL},
+    "connections": DB_CONNECTIONS,
     "apps": {
         "models": {
             "models": ["app.models", "aerich.models"],
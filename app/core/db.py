@@ -0,0 +1,437 @@
+import asyncio
+import contextlib
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import asyncpg
+from tortoise import Tortoise
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import ConfigurationError
+from app.core.config import settings
+from app.core.exceptions import StatementTimeoutError
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import DB_POOL_ACQUIRE_DURATION, DB_QUERY_DURATION
+
+logger = get_logger("db")
+
+
+class PoolMonitor:
+    """Collects acquire statistics for a single connection pool."""
+
+    def __init__(self, connection_name: str, window: int = 1000):
+        self.connection_name = connection_name
+        self.waiters = 0
+        self.acquired_total = 0
+        self.acquire_seconds_total = 0.0
+        self.acquire_seconds_max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record_acquire(self, seconds: float) -> None:
+        self.acquired_total += 1
+        self.acquire_seconds_total += seconds
+        self.acquire_seconds_max = max(self.acquire_seconds_max, seconds)
+        self._recent.append(seconds)
+        DB_POOL_ACQUIRE_DURATION.observe(seconds, connection=self.connection_name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+
+        def percentile(fraction: float) -> float:
+            if not recent:
+                return 0.0
+            index = min(len(recent) - 1, int(round(fraction * (len(recent) - 1))))
+            return round(recent[index] * 1000, 3)
+
+        average = (
+            self.acquire_seconds_total / self.acquired_total
+            if self.acquired_total
+            else 0.0
+        )
+        return {
+            "count": self.acquired_total,
+            "avg_ms": round(average * 1000, 3),
+            "max_ms": round(self.acquire_seconds_max * 1000, 3),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+        }
+
+
+_pool_monitors: Dict[str, PoolMonitor] = {}
+
+
+def get_pool_monitor(connection_name: str) -> PoolMonitor:
+    if connection_name not in _pool_monitors:
+        _pool_monitors[connection_name] = PoolMonitor(connection_name)
+    return _pool_monitors[connection_name]
+
+
+class InstrumentedPool:
+    """Proxy around asyncpg.Pool that measures how long callers wait for a connection."""
+
+    def __init__(self, pool: asyncpg.Pool, monitor: PoolMonitor):
+        self._pool = pool
+        self.monitor = monitor
+
+    async def acquire(self, *, timeout: Optional[float] = None):
+        self.monitor.waiters += 1
+        start_time = time.perf_counter()
+        try:
+            connection = await self._pool.acquire(timeout=timeout)
+        finally:
+            self.monitor.waiters -= 1
+        self.monitor.record_acquire(time.perf_counter() - start_time)
+        return connection
+
+    def __getattr__(self, name: str):
+        return getattr(self._pool, name)
+
+
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMS_PATTERN = re.compile(r"\$\d+(?:\s*,\s*\$\d+)*")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_query(query: str) -> str:
+    """
+    Reduce a statement to its shape: literals and parameter lists become
+    placeholders, so the same query issued in a loop collapses to one key.
+    """
+    shape = _PARAMS_PATTERN.sub("$?", query)
+    shape = _LITERAL_PATTERN.sub("?", shape)
+    return _SPACE_PATTERN.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """SQL statements executed within one request or background job."""
+
+    max_statements = 200
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.pending_count = 0
+        self.pending_seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.statements: List[Tuple[str, float]] = []
+
+    def add(self, query: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.pending_count += 1
+        self.pending_seconds += seconds
+        self.shapes[normalize_query(query)] += 1
+        if len(self.statements) < self.max_statements:
+            self.statements.append((query, seconds))
+
+    def take_pending(self) -> Tuple[int, float]:
+        """Return statements recorded since the previous call and reset them."""
+        pending = (self.pending_count, self.pending_seconds)
+        self.pending_count = 0
+        self.pending_seconds = 0.0
+        return pending
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times, most frequent first."""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_tracking() -> QueryStats:
+    """Start collecting statements executed in the current context."""
+    stats = QueryStats()
+    _query_stats.set(stats)
+    return stats
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+_statement_timeout: ContextVar[Optional[float]] = ContextVar("statement_timeout", default=None)
+
+
+def set_statement_timeout(seconds: Optional[float]) -> None:
+    """
+    Limit every statement in the current context to `seconds`.
+
+    asyncpg sends a cancel request to the server when the timeout expires,
+    so the statement stops consuming database CPU, and raises
+    StatementTimeoutError.
+    """
+    _statement_timeout.set(seconds)
+
+
+def record_query(connection_name: str, query: str, seconds: float) -> None:
+    DB_QUERY_DURATION.observe(seconds, connection=connection_name)
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.add(query, seconds)
+
+
+class InstrumentedConnection(asyncpg.connection.Connection):
+    """asyncpg connection that reports the duration of every statement."""
+
+    connection_name = "default"
+    _instrumented = True
+
+    async def reset(self, *, timeout: Optional[float] = None) -> None:
+        # Cleanup the pool runs on release is not part of the caller's work
+        self._instrumented = False
+        try:
+            await super().reset(timeout=timeout)
+        finally:
+            self._instrumented = True
+
+    def _timeout(self, timeout: Optional[float]) -> Optional[float]:
+        return timeout if timeout is not None else _statement_timeout.get()
+
+    def _record(self, query: str, start_time: float) -> None:
+        if self._instrumented:
+            record_query(self.connection_name, query, time.perf_counter() - start_time)
+
+    @contextlib.contextmanager
+    def _statement(self, query: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        except asyncio.TimeoutError as e:
+            raise StatementTimeoutError(
+                f"Statement timed out: {' '.join(query.split())[:200]}"
+            ) from e
+        finally:
+            self._record(query, start_time)
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None) -> str:
+        with self._statement(query):
+            return await super().execute(query, *args, timeout=self._timeout(timeout))
+
+    async def executemany(self, command: str, args, *, timeout: Optional[float] = None):
+        with self._statement(command):
+            return await super().executemany(command, args, timeout=self._timeout(timeout))
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None, record_class=None):
+        with self._statement(query):
+            return await super().fetch(
+                query, *args, timeout=self._timeout(timeout), record_class=record_class
+            )
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        with self._statement(query):
+            return await super().fetchval(
+                query, *args, column=column, timeout=self._timeout(timeout)
+            )
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None, record_class=None):
+        with self._statement(query):
+            return await super().fetchrow(
+                query, *args, timeout=self._timeout(timeout), record_class=record_class
+            )
+
+
+class InstrumentedAsyncpgClient(AsyncpgDBClient):
+    """
+    Tortoise asyncpg client whose pool reports acquire latency and waiters
+    and whose connections report statement timings.
+    """
+
+    connection_class = InstrumentedConnection
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connection_class = type(
+            "InstrumentedConnection",
+            (InstrumentedConnection,),
+            {"connection_name": self.connection_name},
+        )
+
+    async def create_pool(self, **kwargs) -> InstrumentedPool:
+        pool = await super().create_pool(**kwargs)
+        return InstrumentedPool(pool, get_pool_monitor(self.connection_name))
+
+
+client_class = InstrumentedAsyncpgClient
+
+
+async def stream_query(
+    client: BaseDBAsyncClient, query: str, params: Sequence[Any], batch_size: int
+) -> AsyncIterator[List[asyncpg.Record]]:
+    """
+    Yields the rows of `query` in batches through a server-side cursor.
+
+    Holds one pool connection in a read-only transaction until the
+    generator is exhausted or closed, so wrap it in contextlib.aclosing.
+    Each fetch is bounded by the current statement timeout; the query is
+    recorded once, with the time spent waiting for the server.
+    """
+    async with client.acquire_connection() as connection:
+        seconds = 0.0
+        try:
+            async with connection.transaction(readonly=True):
+                start_time = time.perf_counter()
+                cursor = await connection.cursor(query, *params, timeout=_statement_timeout.get())
+                while True:
+                    records = await cursor.fetch(batch_size, timeout=_statement_timeout.get())
+                    seconds += time.perf_counter() - start_time
+                    if records:
+                        yield records
+                    if len(records) < batch_size:
+                        break
+                    start_time = time.perf_counter()
+        except asyncio.TimeoutError as e:
+            raise StatementTimeoutError(
+                f"Statement timed out: {' '.join(query.split())[:200]}"
+            ) from e
+        finally:
+            record_query(client.connection_name, query, seconds)
+
+
+def get_pool_stats(connection_name: str = "default") -> Dict[str, Any]:
+    """Возвращает текущее состояние пула соединений"""
+    try:
+        client = Tortoise.get_connection(connection_name)
+    except (ConfigurationError, KeyError):
+        client = None
+    pool = getattr(client, "_pool", None)
+    monitor = get_pool_monitor(connection_name)
+    if pool is None:
+        size = idle = 0
+        min_size = getattr(client, "pool_minsize", 0)
+        max_size = getattr(client, "pool_maxsize", 0)
+    else:
+        size = pool.get_size()
+        idle = pool.get_idle_size()
+        min_size = pool.get_min_size()
+        max_size = pool.get_max_size()
+    return {
+        "connection": connection_name,
+        "initialized": pool is not None,
+        "min_size": min_size,
+        "max_size": max_size,
+        "size": size,
+        "in_use": size - idle,
+        "idle": idle,
+        "waiters": monitor.waiters,
+        "acquire": monitor.snapshot(),
+    }
+
+
+READ_CONNECTION = "replica"
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag_seconds
+"""
+
+
+class ReplicaState:
+    """Cached health of the read-only connection."""
+
+    def __init__(self):
+        self.usable = False
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.lock = asyncio.Lock()
+
+
+_replica_state = ReplicaState()
+
+
+def is_replica_configured() -> bool:
+    return bool(settings.DATABASE_READ_URL)
+
+
+async def _check_replica() -> None:
+    state = _replica_state
+    async with state.lock:
+        if (
+            state.checked_at is not None
+            and time.monotonic() - state.checked_at < settings.DB_READ_LAG_CHECK_INTERVAL
+        ):
+            return
+        try:
+            replica = Tortoise.get_connection(READ_CONNECTION)
+            rows = await asyncio.wait_for(
+                replica.execute_query_dict(REPLICA_LAG_QUERY),
+                timeout=settings.DB_READ_CHECK_TIMEOUT,
+            )
+            state.lag_seconds = float(rows[0]["lag_seconds"] or 0)
+            state.usable = state.lag_seconds <= settings.DB_READ_MAX_LAG_SECONDS
+            state.error = None
+        except Exception as e:
+            state.usable = False
+            state.lag_seconds = None
+            state.error = str(e) or type(e).__name__
+        state.checked_at = time.monotonic()
+        if not state.usable:
+            logger.warning(
+                categorize_log(
+                    "Read replica unavailable, falling back to primary", LogCategory.DB
+                ),
+                extra={"lag_seconds": state.lag_seconds, "error": state.error},
+            )
+
+
+_primary_reads: ContextVar[bool] = ContextVar("primary_reads", default=False)
+
+
+@contextlib.contextmanager
+def primary_reads() -> Iterator[None]:
+    """
+    Routes get_read_connection() to the primary inside the block.
+
+    Used while loading values that are cached until the next write event:
+    a lagging replica would otherwise keep a pre-write value cached for
+    the whole TTL instead of serving it for one request.
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+async def get_read_connection() -> BaseDBAsyncClient:
+    """
+    Возвращает соединение для тяжелых запросов на чтение (выгрузки, подсказки).
+
+    Если реплика не настроена, недоступна или отстает больше чем на
+    DB_READ_MAX_LAG_SECONDS, а также внутри primary_reads(), используется
+    основное соединение.
+    """
+    if not is_replica_configured() or _primary_reads.get():
+        return Tortoise.get_connection("default")
+    state = _replica_state
+    if (
+        state.checked_at is None
+        or time.monotonic() - state.checked_at >= settings.DB_READ_LAG_CHECK_INTERVAL
+    ):
+        await _check_replica()
+    if state.usable:
+        return Tortoise.get_connection(READ_CONNECTION)
+    return Tortoise.get_connection("default")
+
+
+def get_replica_state() -> Dict[str, Any]:
+    state = _replica_state
+    return {
+        "configured": is_replica_configured(),
+        "usable": state.usable,
+        "lag_seconds": state.lag_seconds,
+        "error": state.error,
+    }
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import HTTPException
 from app.core.logging import get_logger
 
@@ -21,3 +22,19 @@ class DatabaseError(HTTPException):
     def __init__(self, detail="Неуспешная операция в базе данных"):
         logger.error(f"Database error: {detail}")
         super().__init__(status_code=500, detail=detail)
+
+
+class ClientDisconnectedError(HTTPException):
+    def __init__(self, detail="Клиент закрыл соединение до завершения запроса"):
+        logger.info(f"Client disconnected: {detail}")
+        super().__init__(status_code=499, detail=detail)
+
+
+class StorageQuotaExceededError(HTTPException):
+    def __init__(self, detail="Недостаточно места для файлов выгрузок, повторите позже"):
+        logger.warning(f"Export storage quota exceeded: {detail}")
+        super().__init__(status_code=507, detail=detail)
+
+
+class StatementTimeoutError(asyncio.TimeoutError):
+    """Оператор БД превысил таймаут маршрута (DB_STATEMENT_TIMEOUT_*); отдается как 504."""
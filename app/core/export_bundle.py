@@ -0,0 +1,157 @@
+import asyncio
+import contextlib
+import io
+import re
+import time
+import zipfile
+from typing import AsyncIterator, Optional, Tuple, Type
+from app.core.export_engine import ExportSink, RowSource, write_export
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import record_export
+from app.core.profiling import run_in_thread
+
+logger = get_logger("export_bundle")
+
+# Байты архива отдаются клиенту кусками такого размера
+BUNDLE_CHUNK_SIZE = 64 * 1024
+# Сколько кусков может ждать отправки, пока запись архива не приостановится
+BUNDLE_QUEUE_CHUNKS = 4
+
+BundleEntry = Tuple[str, RowSource]
+
+
+class ZipOutput(io.RawIOBase):
+    """
+    Поток, в который zipfile пишет архив, а клиент читает его по кускам.
+
+    Пишут в него только рабочие потоки (run_in_thread): если клиент
+    не успевает забирать куски, write ждет свободного места в очереди,
+    поэтому в памяти не больше BUNDLE_QUEUE_CHUNKS кусков архива.
+    Перемотки нет, zipfile в этом случае пишет размеры записей после данных.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(BUNDLE_QUEUE_CHUNKS)
+        self.pending = bytearray()
+        self.size = 0
+        self.aborted = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.aborted:
+            return len(data)
+        self.pending += data
+        self.size += len(data)
+        if len(self.pending) >= BUNDLE_CHUNK_SIZE:
+            self._put(bytes(self.pending))
+            self.pending.clear()
+        return len(data)
+
+    def flush(self) -> None:
+        if self.pending:
+            self._put(bytes(self.pending))
+            self.pending.clear()
+
+    def finish(self) -> None:
+        """Отдает остаток и отмечает конец архива"""
+        self.flush()
+        self._put(None)
+
+    def _put(self, chunk: Optional[bytes]) -> None:
+        if self.aborted:
+            return
+        asyncio.run_coroutine_threadsafe(self.queue.put(chunk), self.loop).result()
+
+    def abort(self) -> None:
+        """
+        Освобождает писателя, ждущего места в очереди. Дальнейшие записи
+        отбрасываются, в том числе закрытие архива сборщиком мусора.
+        """
+        self.aborted = True
+        self.pending.clear()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+def entry_name(title: str, suffix: str) -> str:
+    """Имя файла внутри архива без символов, недопустимых в путях"""
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', "_", title).strip(" ._")
+    return f"{name or 'export'}{suffix}"
+
+
+async def write_bundle(
+    output: ZipOutput, entries: AsyncIterator[BundleEntry], sink_class: Type[ExportSink]
+) -> Tuple[int, int]:
+    """Пишет записи архива одну за другой; возвращает число файлов и строк"""
+    archive = zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED)
+    files = rows = 0
+    try:
+        async with contextlib.aclosing(entries) as sources:
+            async for name, source in sources:
+                entry = await run_in_thread(
+                    archive.open, entry_name(name, sink_class.suffix), "w", force_zip64=True
+                )
+                rows += await write_export(source, sink_class, entry)
+                await run_in_thread(entry.close)
+                files += 1
+        await run_in_thread(archive.close)
+        await run_in_thread(output.finish)
+    except BaseException:
+        output.abort()
+        raise
+    return files, rows
+
+
+async def stream_bundle(
+    name: str, entries: AsyncIterator[BundleEntry], sink_class: Type[ExportSink]
+) -> AsyncIterator[bytes]:
+    """
+    ZIP-архив выгрузок, который строится во время отправки.
+
+    Записи (имя файла и источник строк) создаются по очереди, каждая пишется
+    в архив по мере чтения из базы, а готовые байты сразу уходят клиенту;
+    ни архив, ни отдельные файлы целиком не хранятся. Если клиент
+    отключился, построение архива отменяется.
+    """
+    start_time = time.perf_counter()
+    output = ZipOutput(asyncio.get_running_loop())
+    writer = asyncio.ensure_future(write_bundle(output, entries, sink_class))
+    getter: Optional[asyncio.Future] = None
+    try:
+        while True:
+            getter = asyncio.ensure_future(output.queue.get())
+            await asyncio.wait({getter, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                # Построение архива завершилось ошибкой раньше, чем пришел конец архива
+                getter.cancel()
+                writer.result()
+            chunk = getter.result()
+            if chunk is None:
+                break
+            yield chunk
+        files, rows = await writer
+    except BaseException as e:
+        if getter is not None:
+            getter.cancel()
+        output.abort()
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+        if not isinstance(e, (GeneratorExit, asyncio.CancelledError)):
+            logger.error(
+                categorize_log(f"Export bundle {name} failed: {e}", LogCategory.ERROR),
+                exc_info=True,
+            )
+        raise
+    record_export(
+        f"{name}_{sink_class.format}_bundle", rows, output.size, time.perf_counter() - start_time
+    )
+    logger.info(
+        categorize_log(
+            f"Export bundle {name}: {files} file(s), {rows} rows, {output.size} bytes",
+            LogCategory.GENERAL,
+        )
+    )
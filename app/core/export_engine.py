@@ -0,0 +1,311 @@
+import contextlib
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple, Type
+from fastapi import HTTPException
+from app.core.artifacts import Artifact, get_artifact_store
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+from app.core.metrics import record_export
+from app.core.profiling import run_in_thread
+from app.core.utils import import_lazily
+
+TEXT = "text"
+INTEGER = "integer"
+BOOLEAN = "boolean"
+DATETIME = "datetime"
+
+DATETIME_FORMAT = "%d.%m.%Y %H:%M"
+YES = "Да"
+NO = "Нет"
+
+Row = Tuple[Any, ...]
+
+
+class Column:
+    """Колонка выгрузки: ключ (для NDJSON/Parquet), заголовок, тип значений и ширина в Excel"""
+
+    def __init__(self, key: str, title: str, type: str = TEXT, width: int = 15):
+        self.key = key
+        self.title = title
+        self.type = type
+        self.width = width
+
+
+class RowSource:
+    """
+    Типизированный поток строк выгрузки.
+
+    Колонки известны до чтения первой строки, строки приходят пачками из
+    курсора базы (`batches` - функция, возвращающая async-генератор), так что
+    память не зависит от объема выгрузки. Значения строки идут в порядке
+    колонок и имеют тип колонки: str, int, bool, datetime (местное время)
+    или None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        filename: str,
+        sheet_name: str,
+        columns: Sequence[Column],
+        batches: Callable[[], AsyncIterator[List[Row]]],
+        empty_message: str = "Не найдено данных для экспорта с указанными параметрами",
+    ):
+        self.name = name
+        self.filename = filename
+        self.sheet_name = sheet_name
+        self.columns = list(columns)
+        self.batches = batches
+        self.empty_message = empty_message
+
+
+def to_local_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Время из базы (UTC) в местное время выгрузок, без часового пояса"""
+    if value is None:
+        return None
+    return value.replace(tzinfo=None) + timedelta(hours=settings.EXPORT_UTC_OFFSET_HOURS)
+
+
+def format_text(value: Any) -> str:
+    """Значение ячейки для текстовых форматов"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return YES if value else NO
+    if isinstance(value, datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return str(value)
+
+
+class ExportSink:
+    """
+    Формат файла выгрузки.
+
+    Получает источник в конструкторе (для заголовков), затем строки пачками
+    в write_rows и завершает файл в close. Методы синхронные и выполняются в
+    отдельном потоке, чтобы форматирование не задерживало event loop;
+    модули из `modules` импортируются заранее через import_lazily.
+    Новый формат - это подкласс с @register_sink.
+    """
+
+    format = ""
+    suffix = ""
+    media_type = "application/octet-stream"
+    modules: Tuple[str, ...] = ()
+
+    def __init__(self, file: BinaryIO, source: RowSource):
+        self.file = file
+        self.columns = source.columns
+
+    def write_rows(self, rows: List[Row]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+SINKS: Dict[str, Type[ExportSink]] = {}
+
+
+def register_sink(sink_class: Type[ExportSink]) -> Type[ExportSink]:
+    SINKS[sink_class.format] = sink_class
+    return sink_class
+
+
+@register_sink
+class CsvSink(ExportSink):
+    """CSV через `;`, все значения в кавычках, UTF-8 без BOM"""
+
+    format = "csv"
+    suffix = ".csv"
+    media_type = "text/csv; charset=utf-8"
+
+    def __init__(self, file: BinaryIO, source: RowSource):
+        super().__init__(file, source)
+        self.text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        self.writer = csv.writer(self.text, delimiter=";", quoting=csv.QUOTE_ALL)
+        self.writer.writerow([column.title for column in self.columns])
+
+    def write_rows(self, rows: List[Row]) -> None:
+        self.writer.writerows([format_text(value) for value in row] for row in rows)
+
+    def close(self) -> None:
+        self.text.flush()
+        # Файл закрывает владелец, а не обертка
+        self.text.detach()
+
+
+@register_sink
+class XlsxSink(ExportSink):
+    """
+    Excel в режиме constant_memory: строки сбрасываются на диск по мере
+    записи. Ширина колонок берется из Column.width, даты пишутся как даты.
+    """
+
+    format = "xlsx"
+    suffix = ".xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    modules = ("xlsxwriter",)
+
+    def __init__(self, file: BinaryIO, source: RowSource):
+        super().__init__(file, source)
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(file, {"constant_memory": True})
+        self.worksheet = self.workbook.add_worksheet(source.sheet_name)
+        header_format = self.workbook.add_format(
+            {
+                "bold": True,
+                "text_wrap": True,
+                "valign": "top",
+                "align": "center",
+                "border": 1,
+                "bg_color": "#D7E4BC",
+            }
+        )
+        self.cell_format = self.workbook.add_format({"border": 1, "text_wrap": True})
+        self.date_format = self.workbook.add_format({"border": 1, "num_format": "dd.mm.yyyy hh:mm"})
+        self.number_format = self.workbook.add_format({"border": 1, "align": "center"})
+        for col_num, column in enumerate(self.columns):
+            self.worksheet.set_column(col_num, col_num, column.width)
+            self.worksheet.write_string(0, col_num, column.title, header_format)
+        self.row_num = 1
+
+    def write_rows(self, rows: List[Row]) -> None:
+        worksheet = self.worksheet
+        for row in rows:
+            for col_num, (column, value) in enumerate(zip(self.columns, row)):
+                if value is None or value == "":
+                    worksheet.write_blank(self.row_num, col_num, None, self.cell_format)
+                elif column.type == DATETIME:
+                    worksheet.write_datetime(self.row_num, col_num, value, self.date_format)
+                elif column.type == INTEGER:
+                    worksheet.write_number(self.row_num, col_num, value, self.number_format)
+                else:
+                    # Строкой, чтобы значения вида "=..." не стали формулами
+                    worksheet.write_string(self.row_num, col_num, format_text(value), self.cell_format)
+            self.row_num += 1
+
+    def close(self) -> None:
+        self.workbook.close()
+
+
+@register_sink
+class NdjsonSink(ExportSink):
+    """Одна JSON-строка на запись с ключами колонок; даты в ISO 8601"""
+
+    format = "ndjson"
+    suffix = ".ndjson"
+    media_type = "application/x-ndjson"
+
+    def write_rows(self, rows: List[Row]) -> None:
+        keys = [column.key for column in self.columns]
+        lines = [
+            json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_json_default)
+            for row in rows
+        ]
+        self.file.write(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+@register_sink
+class ParquetSink(ExportSink):
+    """
+    Parquet с типизированной схемой. Нужен pyarrow (не входит в
+    requirements.txt); строки копятся до PARQUET_ROW_GROUP_ROWS на группу.
+    """
+
+    format = "parquet"
+    suffix = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+    modules = ("pyarrow", "pyarrow.parquet")
+    PARQUET_ROW_GROUP_ROWS = 50000
+
+    def __init__(self, file: BinaryIO, source: RowSource):
+        super().__init__(file, source)
+        import pyarrow
+        import pyarrow.parquet
+
+        types = {
+            TEXT: pyarrow.string(),
+            INTEGER: pyarrow.int64(),
+            BOOLEAN: pyarrow.bool_(),
+            DATETIME: pyarrow.timestamp("s"),
+        }
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(column.key, types[column.type]) for column in self.columns])
+        self.writer = pyarrow.parquet.ParquetWriter(file, self.schema)
+        self.pending: List[Row] = []
+
+    def write_rows(self, rows: List[Row]) -> None:
+        self.pending.extend(rows)
+        if len(self.pending) >= self.PARQUET_ROW_GROUP_ROWS:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+
+    def _flush(self) -> None:
+        if not self.pending:
+            return
+        arrays = [
+            self.pyarrow.array([row[index] for row in self.pending], type=field.type)
+            for index, field in enumerate(self.schema)
+        ]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(arrays, schema=self.schema))
+        self.pending = []
+
+
+async def load_sink(name: str) -> Type[ExportSink]:
+    """Класс формата по имени; модули формата импортируются при первом использовании"""
+    sink_class = SINKS.get(name)
+    if sink_class is None:
+        raise ValidationError(
+            f"Неизвестный формат выгрузки: {name}, доступны: {', '.join(sorted(SINKS))}"
+        )
+    try:
+        for module in sink_class.modules:
+            await import_lazily(module)
+    except ImportError:
+        raise ValidationError(f"Формат {name} недоступен на сервере")
+    return sink_class
+
+
+async def write_export(source: RowSource, sink_class: Type[ExportSink], file: BinaryIO) -> int:
+    """Пишет все строки источника в файл и возвращает их количество"""
+    sink = await run_in_thread(sink_class, file, source)
+    rows = 0
+    async with contextlib.aclosing(source.batches()) as batches:
+        async for batch in batches:
+            await run_in_thread(sink.write_rows, batch)
+            rows += len(batch)
+    await run_in_thread(sink.close)
+    return rows
+
+
+async def export_to_artifact(source: RowSource, sink_class: Type[ExportSink]) -> Tuple[Artifact, int]:
+    """
+    Пишет выгрузку в хранилище файлов выгрузок и возвращает файл и число строк.
+
+    Пустая выгрузка - 404, файл при этом удаляется.
+    """
+    start_time = time.perf_counter()
+    async with get_artifact_store().create(source.filename, sink_class.suffix) as artifact:
+        with open(artifact.write_path, "wb") as file:
+            rows = await write_export(source, sink_class, file)
+        if not rows:
+            raise HTTPException(status_code=404, detail=source.empty_message)
+    record_export(
+        f"{source.name}_{sink_class.format}", rows, artifact.size, time.perf_counter() - start_time
+    )
+    return artifact, rows
@@ -1,11 +1,32 @@
-from tortoise.expressions import Q, Case, When, F
-from tortoise.functions import Lower
-from typing import Optional, List, Dict, Any, Tuple
+import contextlib
+from typing import Optional, List, Dict, Any, NamedTuple, Tuple
 from datetime import date, datetime, timedelta
-from fastapi import HTTPException
-from app.models.models import AddressV2, TypeValue, FieldType, GazificationData, Municipality, TypeAddress
+from fastapi import HTTPException, Query
+from app.models.models import TypeValue, FieldType
 from app.core.utils import log_db_operation
-from tortoise import Tortoise
+from app.core.db import get_read_connection, stream_query
+from app.core.cache import Cache
+from app.core.config import settings
+from app.core.export_engine import (
+    BOOLEAN,
+    DATETIME,
+    INTEGER,
+    NO,
+    TEXT,
+    YES,
+    Column,
+    Row,
+    RowSource,
+    to_local_time,
+)
+from app.core.invalidation import TOPIC_QUESTIONNAIRE
+
+field_types_cache = Cache(
+    "field_types", settings.CACHE_REFERENCE_TTL, topics=(TOPIC_QUESTIONNAIRE,)
+)
+
+UNKNOWN_MUNICIPALITY = "Неизвестный муниципалитет"
+GAS_STATUS_LABELS = {3: YES, 6: "Адрес не существует", 7: "Собственника нет дома"}
 
 
 def parse_date(date_str, is_start=True):
@@ -37,345 +58,322 @@ def parse_date(date_str, is_start=True):
         raise HTTPException(status_code=400, detail=f"Неверный формат даты: {date_str}")
 
 
-async def get_gazification_data(
-    mo_id: Optional[int] = None, 
-    district: Optional[str] = None, 
-    street: Optional[str] = None,
-    date_from: Optional[date] = None,
-    date_to: Optional[date] = None,
-) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[int, Dict[int, str]]]:
-    """
-    Получает данные о газификации на основе фильтров
-    
-    Args:
-        mo_id: ID муниципалитета (опционально)
-        district: Название района (опционально)
-        street: Название улицы (опционально)
-        date_from: Начальная дата для фильтрации (опционально)
-        date_to: Конечная дата для фильтрации (опционально)
-    Returns:
-        Tuple[List[Dict], List[Dict], Dict[int, Dict[int, str]]]: (addresses, questions, answers)
-            - addresses: список адресов, соответствующих фильтрам
-            - questions: список вопросов (TypeValue) для отображения в отчете
-            - answers: словарь ответов на вопросы по адресам, где ключ внешний - id адреса,
-              ключ внутренний - id вопроса, значение - ответ"""
-    # Оптимизированный запрос для получения последних записей по каждому адресу
-    # Используем единый SQL запрос для получения всех данных сразу
-    
-    # Строим базовый фильтр для дат
-    date_filter_sql = ""
-    params = []
-    
-    if date_from:
-        date_filter_sql = "AND gd.date_create >= $1"
-        params.append(date_from)
-    
-    if date_to:
-        if date_filter_sql:
-            date_filter_sql += f" AND gd.date_create <= ${len(params) + 1}"
-        else:
-            date_filter_sql = "AND gd.date_create <= $1"
-        params.append(date_to)
-    
-    # Получаем последние записи газификации для каждого адреса с дополнительными фильтрами
-    district_filter_sql = ""
-    mo_filter_sql = ""
-    
-    # Добавляем параметры в правильном порядке
-    if district:
-        district_param_num = len(params) + 1
-        district_filter_sql = f"AND (LOWER(a.district) = LOWER(${district_param_num}) OR LOWER(a.city) = LOWER(${district_param_num}))"
-        params.append(district)
-    
-    if mo_id is not None:
-        mo_param_num = len(params) + 1
-        mo_filter_sql = f"AND a.id_mo = ${mo_param_num}"
-        params.append(mo_id)
-    
-    latest_gas_records_query = f"""
-        SELECT 
-            gd.id_address, gd.id_type_address, gd.date_create, gd.from_login,
-            a.id_mo, a.district, a.city, a.street, a.house, a.flat, a.from_login as address_from_login
-        FROM s_gazifikacia.t_gazifikacia_data gd
-        JOIN s_gazifikacia.t_address_v2 a ON gd.id_address = a.id
-        WHERE gd.id_type_address IN (3, 4, 6, 7) 
-            AND gd.is_mobile = true 
-            AND gd.deleted = false
-            AND a.deleted = false
-            AND a.house IS NOT NULL
-            {mo_filter_sql}
-            {district_filter_sql}
-            {date_filter_sql}
-        ORDER BY gd.date_create DESC
-    """
-    
-    # Выполняем оптимизированный запрос
-    connection = Tortoise.get_connection("default")
-    combined_data = await connection.execute_query_dict(latest_gas_records_query, params)
-    # Обрабатываем результаты запроса
-    address_gas_info = {}
-    gazification_status = {}
-    temp_addresses = []
-    
-    for item in combined_data:
-        address_id = item["id_address"]
-        
-        # Пропускаем, если уже обработали этот адрес (берем только самую свежую запись)
-        if address_id in address_gas_info:
-            continue
-            
-        type_address = item["id_type_address"]
-        date_create = item["date_create"]
-        from_login = item["from_login"]
-        
-        # Сохраняем информацию о газификации
-        address_gas_info[address_id] = {
-            "gas_type": type_address,
-            "date_create": date_create,
-            "from_login": from_login,
-        }
-        gazification_status[address_id] = type_address
-        
-        # Формируем информацию об адресе
-        # Объединяем district и city в одно поле для корректного определения района
-        district_value = item["district"] or item["city"] or ""
-        city_value = item["city"] or item["district"] or ""
-        
-        address = {
-            "id": address_id,
-            "id_mo": item["id_mo"],
-            "district": district_value,
-            "city": city_value,
-            "street": item["street"] if item["street"] != "Нет улиц" else "",
-            "house": item["house"],
-            "flat": item["flat"] or "",
-            "from_login": item["address_from_login"],
-            "gas_type": type_address,
-            "date_create": date_create,
-            "gas_from_login": from_login,
+class ExportFilters(NamedTuple):
+    """Фильтры выгрузок адресов; даты уже разобраны parse_date"""
+
+    mo_id: Optional[int] = None
+    district: Optional[str] = None
+    street: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+    def to_log(self) -> Dict[str, Any]:
+        return {
+            "mo_id": self.mo_id,
+            "district": self.district,
+            "street": self.street,
+            "date_from": self.date_from.isoformat() if self.date_from else None,
+            "date_to": self.date_to.isoformat() if self.date_to else None,
         }
-        temp_addresses.append(address)
-    
-    # Удаляем дубликаты адресов, оставляя только с самыми свежими данными газификации
-    # Группируем адреса по ключу (mo_id, district, street, house, flat)
-    address_groups = {}
-    for address in temp_addresses:
-        key = (address["id_mo"], address["district"], address["street"], address["house"], address["flat"])
-        if key not in address_groups:
-            address_groups[key] = []
-        address_groups[key].append(address)
-    
-    # Для каждой группы оставляем только адрес с самыми свежими данными газификации
-    addresses = []
-    for group in address_groups.values():
-        if len(group) == 1:
-            addresses.append(group[0])
-        else:
-            # Сортируем по дате создания данных газификации (самые свежие первыми)
-            group.sort(key=lambda x: x["date_create"], reverse=True)
-            addresses.append(group[0])
-    
-    # Применяем фильтр по улице, если он задан (district уже обработан в SQL)
-    if street:
-        filtered_addresses = []
-        for address in addresses:
-            normalized_street = street.strip().lower()
-            address_street = (address.get("street") or "").strip().lower()
-            if address_street == normalized_street:
-                filtered_addresses.append(address)
-        addresses = filtered_addresses
-
-    # Получаем информацию о муниципалитетах
-    mo_ids = {address["id_mo"] for address in addresses if address["id_mo"] is not None}
-    if mo_ids:
-        municipalities = await Municipality.filter(id__in=mo_ids).values("id", "name")
-        mo_names = {mo["id"]: mo["name"] for mo in municipalities}
-        
-        # Добавляем название муниципалитета к каждому адресу
-        for address in addresses:
-            mo_id = address.get("id_mo")
-            if mo_id and mo_id in mo_names:
-                address["mo_name"] = mo_names[mo_id]
-            else:
-                address["mo_name"] = "Неизвестный муниципалитет"
-    else:
-        for address in addresses:
-            address["mo_name"] = "Неизвестный муниципалитет"
-    
-    # Получаем типы полей для фильтрации
-    field_types = await FieldType.all()
-    field_type_mapping = {ft.field_type_id: ft.field_type_name for ft in field_types}
+
+
+def export_filters(
+    mo_id: Optional[int] = Query(None, description="ID муниципалитета"),
+    district: Optional[str] = Query(None, description="Название района"),
+    street: Optional[str] = Query(None, description="Название улицы"),
+    date_from: Optional[str] = Query(
+        None,
+        description="Начальная дата для фильтрации (YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS)",
+    ),
+    date_to: Optional[str] = Query(
+        None,
+        description="Конечная дата для фильтрации (YYYY-MM-DD или YYYY-MM-DDTHH:MM:SS)",
+    ),
+) -> ExportFilters:
+    """Зависимость FastAPI: общие параметры фильтрации выгрузок"""
+    return ExportFilters(
+        mo_id,
+        district,
+        street,
+        parse_date(date_from, is_start=True),
+        parse_date(date_to, is_start=False),
+    )
+
+
+def format_answer(value: Optional[str]) -> Optional[str]:
+    """Ответ анкеты для выгрузки: "true"/"false" становятся "Да"/"Нет\""""
+    if value and value.lower() == "true":
+        return YES
+    if value and value.lower() == "false":
+        return NO
+    return value
+
+
+def gas_status_label(id_type_address: Optional[int]) -> str:
+    """Статус газификации адреса по типу последней записи"""
+    return GAS_STATUS_LABELS.get(id_type_address, NO)
+
+
+@field_types_cache.cached
+async def get_field_type_mapping() -> Dict[int, str]:
+    """Соответствие ID типа поля его названию"""
+    connection = await get_read_connection()
+    field_types = await FieldType.all().using_db(connection)
+    log_db_operation("read", "FieldType", {"count": len(field_types)})
+    return {ft.field_type_id: ft.field_type_name for ft in field_types}
+
+
+async def get_export_questions(connection) -> List[Dict[str, Any]]:
+    """Вопросы анкеты мобильного приложения для колонок выгрузки (без полей типа info)"""
+    field_type_mapping = await get_field_type_mapping()
     info_field_type_ids = [
         field_id for field_id, name in field_type_mapping.items() if name == "info"
     ]
-    
-    # Получаем вопросы для мобильного приложения
-    questions = (
+    return (
         await TypeValue.filter(for_mobile=True)
+        .using_db(connection)
         .exclude(field_type_id__in=info_field_type_ids)
         .order_by("order")
-        .values("id", "type_value", "description", "field_type_id")
+        .values("id", "type_value")
     )
-    for question in questions:
-        field_type_id = question.get("field_type_id")
-        if field_type_id:
-            question["field_type"] = field_type_mapping.get(field_type_id)
-    # Оптимизированное получение ответов - только последние ответы по каждому адресу и вопросу
-    address_ids = [address["id"] for address in addresses]
-    answers = {}
-    
-    if address_ids:
-        # Используем SQL для получения последних ответов по каждому адресу и типу вопроса
-        answers_params = []
-        date_filter_answers = ""
-        
-        if date_from:
-            date_filter_answers = "AND date_create >= $2"
-            answers_params.append(date_from)
-            
-        if date_to:
-            if date_filter_answers:
-                date_filter_answers += f" AND date_create <= ${len(answers_params) + 2}"
-            else:
-                date_filter_answers = "AND date_create <= $2"
-            answers_params.append(date_to)
-        
-        latest_answers_query = f"""
-            SELECT DISTINCT ON (id_address, id_type_value) 
-                id_address, id_type_value, value
-            FROM s_gazifikacia.t_gazifikacia_data 
-            WHERE id_address = ANY($1)
-                AND id_type_value IS NOT NULL 
-                AND is_mobile = true 
-                AND deleted = false
-                {date_filter_answers}
-            ORDER BY id_address, id_type_value, date_create DESC
-        """
-        
-        answers_data = await connection.execute_query_dict(
-            latest_answers_query, 
-            [address_ids] + answers_params
+
+
+def build_gazification_query(filters: ExportFilters) -> Tuple[str, List[Any]]:
+    """
+    SQL выгрузки /export: последняя запись о газификации по каждому адресу,
+    один адрес из дублей (МО, район, улица, дом, квартира) с самой свежей
+    записью и последние ответы на вопросы анкеты массивами.
+
+    Строки отсортированы от новых к старым, как в прежней выгрузке.
+    """
+    params: List[Any] = []
+    gas_conditions = []
+    answer_conditions = []
+    if filters.date_from:
+        params.append(filters.date_from)
+        gas_conditions.append(f"gd.date_create >= ${len(params)}")
+        answer_conditions.append(f"gd.date_create >= ${len(params)}")
+    if filters.date_to:
+        params.append(filters.date_to)
+        gas_conditions.append(f"gd.date_create <= ${len(params)}")
+        answer_conditions.append(f"gd.date_create <= ${len(params)}")
+    if filters.district:
+        params.append(filters.district)
+        gas_conditions.append(
+            f"(LOWER(a.district) = LOWER(${len(params)}) OR LOWER(a.city) = LOWER(${len(params)}))"
+        )
+    if filters.mo_id is not None:
+        params.append(filters.mo_id)
+        gas_conditions.append(f"a.id_mo = ${len(params)}")
+    if filters.street:
+        # Улица входит в ключ дублей, поэтому фильтр можно применить до их удаления
+        params.append(filters.street.strip())
+        gas_conditions.append(
+            "LOWER(TRIM(CASE WHEN a.street = 'Нет улиц' THEN '' ELSE COALESCE(a.street, '') END))"
+            f" = LOWER(${len(params)})"
+        )
+    gas_filter_sql = "".join(f" AND {condition}" for condition in gas_conditions)
+    answer_filter_sql = "".join(f" AND {condition}" for condition in answer_conditions)
+    query = f"""
+        WITH latest_gas_records AS (
+            SELECT DISTINCT ON (gd.id_address)
+                gd.id_address, gd.id_type_address, gd.date_create,
+                gd.from_login AS gas_from_login,
+                a.id_mo,
+                COALESCE(NULLIF(a.district, ''), NULLIF(a.city, ''), '') AS district,
+                CASE WHEN a.street = 'Нет улиц' THEN '' ELSE a.street END AS street,
+                a.house,
+                COALESCE(a.flat, '') AS flat,
+                a.from_login AS address_from_login
+            FROM s_gazifikacia.t_gazifikacia_data gd
+            JOIN s_gazifikacia.t_address_v2 a ON gd.id_address = a.id
+            WHERE gd.id_type_address IN (3, 4, 6, 7)
+                AND gd.is_mobile = true
+                AND gd.deleted = false
+                AND a.deleted = false
+                AND a.house IS NOT NULL
+                {gas_filter_sql}
+            ORDER BY gd.id_address, gd.date_create DESC
+        ),
+        addresses AS (
+            SELECT DISTINCT ON (id_mo, district, street, house, flat) *
+            FROM latest_gas_records
+            ORDER BY id_mo, district, street, house, flat, date_create DESC
+        ),
+        latest_answers AS (
+            SELECT DISTINCT ON (gd.id_address, gd.id_type_value)
+                gd.id_address, gd.id_type_value, gd.value
+            FROM s_gazifikacia.t_gazifikacia_data gd
+            WHERE gd.id_address IN (SELECT id_address FROM addresses)
+                AND gd.id_type_value IS NOT NULL
+                AND gd.is_mobile = true
+                AND gd.deleted = false
+                {answer_filter_sql}
+            ORDER BY gd.id_address, gd.id_type_value, gd.date_create DESC
+        ),
+        answers AS (
+            SELECT id_address,
+                array_agg(id_type_value) AS answer_ids,
+                array_agg(value) AS answer_values
+            FROM latest_answers
+            GROUP BY id_address
         )
-        
-        for answer in answers_data:
-            address_id = answer["id_address"]
-            type_value_id = answer["id_type_value"]
-            value = answer["value"]
-            if value and value.lower() == "true":
-                value = "Да"
-            elif value and value.lower() == "false":
-                value = "Нет"
-            if address_id not in answers:
-                answers[address_id] = {}
-            answers[address_id][type_value_id] = value
-    log_db_operation(
-        "read",
-        "export_data",
-        {
-            "mo_id": mo_id,
-            "district": district,
-            "street": street,
-            "date_from": date_from.isoformat() if date_from else None,
-            "date_to": date_to.isoformat() if date_to else None,
-            "addresses_count": len(addresses),
-            "questions_count": len(questions),
-            "answers_count": len(answers),
-        },
+        SELECT ad.*, m.name AS mo_name, an.answer_ids, an.answer_values
+        FROM addresses ad
+        LEFT JOIN sp_s_subekty.v_all_name_mo m ON m.id = ad.id_mo
+        LEFT JOIN answers an ON an.id_address = ad.id_address
+        ORDER BY ad.date_create DESC
+    """
+    return query, params
+
+
+GAZIFICATION_COLUMNS = [
+    Column("date_create", "Дата создания", DATETIME, 18),
+    Column("address_from_login", "Создатель адреса", TEXT, 25),
+    Column("gas_from_login", "Отправитель", TEXT, 25),
+    Column("mo_name", "Муниципалитет", TEXT, 30),
+    Column("district", "Район", TEXT, 25),
+    Column("street", "Улица", TEXT, 25),
+    Column("house", "Дом", TEXT, 10),
+    Column("flat", "Квартира", TEXT, 10),
+    Column("gas_status", "Газифицирован?", TEXT, 22),
+]
+
+
+def gazification_row(record, question_ids: List[int]) -> Row:
+    answers = dict(zip(record["answer_ids"] or (), record["answer_values"] or ()))
+    return (
+        to_local_time(record["date_create"]),
+        record["address_from_login"] or "Отсутствует",
+        record["gas_from_login"] or "Отсутствует",
+        record["mo_name"] or UNKNOWN_MUNICIPALITY,
+        record["district"] or "Не указан",
+        record["street"],
+        record["house"],
+        record["flat"],
+        gas_status_label(record["id_type_address"]),
+        *(format_answer(answers.get(question_id)) or "" for question_id in question_ids),
     )
-    
-    return addresses, questions, answers
 
 
-async def get_activity_data(
-    date_from: Optional[date] = None,
-    date_to: Optional[date] = None
-) -> List[Dict[str, Any]]:
+async def get_gazification_rows(
+    filters: ExportFilters, questions: Optional[List[Dict[str, Any]]] = None
+) -> RowSource:
     """
-    Получает данные активности пользователей
-    
-    Args:
-        date_from: Начальная дата для фильтрации (опционально)
-        date_to: Конечная дата для фильтрации (опционально)
-        
-    Returns:
-        List[Dict[str, Any]]: список записей активности
+    Источник строк выгрузки /export: статус газификации по адресам и
+    ответы на вопросы анкеты мобильного приложения (колонка на вопрос).
+
+    Вопросы можно передать заранее, чтобы не читать их для каждого
+    муниципалитета архива.
     """
-    from app.models.models import Activity
-    query = Activity.all()
-    if date_from:
-        query = query.filter(date_create__gte=date_from)
-    if date_to:
-        query = query.filter(date_create__lte=date_to)
-    activities = await query.order_by('-date_create').values(
-        'email', 'activity_count', 'date_create'
+    connection = await get_read_connection()
+    if questions is None:
+        questions = await get_export_questions(connection)
+    question_ids = [question["id"] for question in questions]
+    columns = GAZIFICATION_COLUMNS + [
+        Column(
+            f"question_{question['id']}",
+            question["type_value"] or f"Вопрос {question['id']}",
+            TEXT,
+            25,
+        )
+        for question in questions
+    ]
+    query, params = build_gazification_query(filters)
+
+    async def batches():
+        async with contextlib.aclosing(
+            stream_query(connection, query, params, settings.EXPORT_BATCH_SIZE)
+        ) as records:
+            async for batch in records:
+                yield [gazification_row(record, question_ids) for record in batch]
+        log_db_operation(
+            "read", "export_data", {**filters.to_log(), "questions_count": len(questions)}
+        )
+
+    return RowSource("gazification", "gazification_export", "Газификация", columns, batches)
+
+
+async def get_bundle_municipalities(mo_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Муниципалитеты для архива выгрузок: те, где есть адреса с домом, по имени.
+
+    Если переданы mo_ids, только они.
+    """
+    connection = await get_read_connection()
+    params: List[Any] = []
+    mo_filter_sql = ""
+    if mo_ids:
+        params.append(list(mo_ids))
+        mo_filter_sql = "AND a.id_mo = ANY($1)"
+    municipalities = await connection.execute_query_dict(
+        f"""
+        SELECT mo.id_mo, COALESCE(m.name, '{UNKNOWN_MUNICIPALITY}') AS name
+        FROM (
+            SELECT DISTINCT a.id_mo
+            FROM s_gazifikacia.t_address_v2 a
+            WHERE a.deleted = false
+                AND a.house IS NOT NULL
+                AND a.id_mo IS NOT NULL
+                {mo_filter_sql}
+        ) mo
+        LEFT JOIN sp_s_subekty.v_all_name_mo m ON m.id = mo.id_mo
+        ORDER BY m.name NULLS LAST, mo.id_mo
+        """,
+        params,
     )
-    log_db_operation("read", "Activity", {"count": len(activities)})
-    return activities
+    log_db_operation("read", "bundle_municipalities", {"count": len(municipalities)})
+    return municipalities
 
 
-async def get_gazification_view_data(
-    mo_id: Optional[int] = None,
-    district: Optional[str] = None,
-    street: Optional[str] = None,
-    date_from: Optional[date] = None,
-    date_to: Optional[date] = None,
-) -> List[Dict[str, Any]]:
+def build_gazification_view_query(filters: ExportFilters) -> Tuple[str, List[Any]]:
     """
-    Получает данные для представления газификации на основе SQL view.
-    
-    Эта функция воспроизводит логику SQL представления v_gazifikacia_data_10_07_2025
-    для получения структурированных данных о газификации с разворачиванием ответов
-    на вопросы в отдельные колонки.
-    
-    Args:
-        mo_id: ID муниципалитета (опционально)
-        district: Название района (опционально) 
-        street: Название улицы (опционально)
-        date_from: Начальная дата для фильтрации (опционально)
-        date_to: Конечная дата для фильтрации (опционально)
-    
-    Returns:
-        List[Dict[str, Any]]: список записей с данными газификации и развернутыми ответами
+    SQL выгрузки /export-csv, воспроизводящий логику представления
+    v_gazifikacia_data_10_07_2025 с разворачиванием ответов на вопросы в
+    отдельные колонки.
     """
-    # Строим SQL запрос, воспроизводящий логику представления
-    connection = Tortoise.get_connection("default")
-    
     # Собираем все параметры и условия в правильном порядке
     params = []
     where_conditions = []
-    
+
     # Фильтры для дат газификации
-    if date_from:
-        params.append(date_from)
+    if filters.date_from:
+        params.append(filters.date_from)
         where_conditions.append(f"gd.date_create >= ${len(params)}")
-    
-    if date_to:
-        params.append(date_to)
+
+    if filters.date_to:
+        params.append(filters.date_to)
         where_conditions.append(f"gd.date_create <= ${len(params)}")
-    
+
     date_filter_sql = ""
     if where_conditions:
         date_filter_sql = "AND " + " AND ".join(where_conditions)
-    
+
     # Фильтры для адресов
     address_where_conditions = []
-    
-    if mo_id is not None:
-        params.append(mo_id)
+
+    if filters.mo_id is not None:
+        params.append(filters.mo_id)
         address_where_conditions.append(f"a.id_mo = ${len(params)}")
-    
-    if district:
-        params.append(district)
+
+    if filters.district:
+        params.append(filters.district)
         address_where_conditions.append(f"(LOWER(a.district) = LOWER(${len(params)}) OR LOWER(a.city) = LOWER(${len(params)}))")
-    
-    if street:
-        params.append(street)
+
+    if filters.street:
+        params.append(filters.street)
         address_where_conditions.append(f"LOWER(a.street) = LOWER(${len(params)})")
-    
+
     address_filter_sql = ""
     if address_where_conditions:
         address_filter_sql = "AND " + " AND ".join(address_where_conditions)
-    
+        # Записи других адресов все равно отбрасываются соединением с адресами
+        date_filter_sql += f"""
+            AND gd.id_address IN (
+                SELECT a.id FROM s_gazifikacia.t_address_v2 a
+                WHERE a.deleted = false AND a.house IS NOT NULL {address_filter_sql}
+            )"""
+
     # Основной SQL запрос, основанный на представлении
     query = f"""
     WITH 
@@ -506,7 +504,7 @@ async def get_gazification_view_data(
         lgr.house,
         lgr.flat,
         lgr.district,
-        to_char(lgr.date_create, 'DD.MM.YYYY HH24:MI') AS date_doc,
+        lgr.date_create,
         lgr.id_type_address,
         tta.type_address,
         lgr.is_mobile,
@@ -529,35 +527,129 @@ async def get_gazification_view_data(
     LEFT JOIN s_gazifikacia.t_type_address tta ON tta.id = lgr.id_type_address
     ORDER BY lgr.id_mo, lgr.district, lgr.street, lgr.house, lgr.flat
     """
-    
-    # Выполняем запрос
-    result = await connection.execute_query_dict(query, params)
-    
-    # Нормализуем данные и преобразуем boolean значения
-    for row in result:
-        # Преобразуем boolean значения в читаемый формат
-        for field in ["podal_zaivku", "doc_na_domovladenie", "doc_na_zem_ych", 
-                     "est_otdeln_zjil_pomech", "soc_potderhka", "proinformirovan_new_ystr",
-                     "proinformirovan_new_org", "planiryet_podkluchits", "buklet_s_kontaktami"]:
-            value = row.get(field)
-            if value and value.lower() == "true":
-                row[field] = "Да"
-            elif value and value.lower() == "false":
-                row[field] = "Нет"
-            elif not value:
-                row[field] = ""
-    
-    log_db_operation(
-        "read",
-        "gazification_view_data",
-        {
-            "mo_id": mo_id,
-            "district": district,
-            "street": street,
-            "date_from": date_from.isoformat() if date_from else None,
-            "date_to": date_to.isoformat() if date_to else None,
-            "records_count": len(result),
-        },
+    return query, params
+
+
+GAZIFICATION_VIEW_COLUMNS = [
+    Column("id_address", "ID адреса", INTEGER, 12),
+    Column("id_mo", "ID муниципалитета", INTEGER, 12),
+    Column("name_mo", "Муниципалитет", TEXT, 30),
+    Column("city", "Город", TEXT, 20),
+    Column("street", "Улица", TEXT, 25),
+    Column("house", "Дом", TEXT, 10),
+    Column("flat", "Квартира", TEXT, 10),
+    Column("district", "Район", TEXT, 20),
+    Column("date_create", "Дата создания", DATETIME, 18),
+    Column("id_type_address", "ID типа адреса", INTEGER, 12),
+    Column("type_address", "Тип адреса", TEXT, 20),
+    Column("is_mobile", "Мобильное приложение", BOOLEAN, 12),
+    Column("date", "Дата", TEXT, 14),
+    Column("podal_zaivku", "Подал заявку", TEXT, 15),
+    Column("doc_na_domovladenie", "Документы на домовладение", TEXT, 15),
+    Column("doc_na_zem_ych", "Документы на земельный участок", TEXT, 15),
+    Column("est_otdeln_zjil_pomech", "Есть отдельные жилые помещения", TEXT, 15),
+    Column("soc_potderhka", "Социальная поддержка", TEXT, 15),
+    Column("proinformirovan_new_ystr", "Проинформирован о новых условиях", TEXT, 15),
+    Column("proinformirovan_new_org", "Проинформирован о новой организации", TEXT, 15),
+    Column("planiryet_podkluchits", "Планирует подключиться", TEXT, 15),
+    Column("prichina", "Причина", TEXT, 25),
+    Column("buklet_s_kontaktami", "Буклет с контактами", TEXT, 15),
+    Column("tekychi_sposob_otoplenia", "Текущий способ отопления", TEXT, 20),
+    Column("prichina_nehelania", "Причина нежелания", TEXT, 25),
+    Column("sposob_otoplenia", "Способ отопления", TEXT, 20),
+]
+# Ответы "да/нет", которые выгружаются как "Да"/"Нет"
+VIEW_YES_NO_FIELDS = {
+    "podal_zaivku",
+    "doc_na_domovladenie",
+    "doc_na_zem_ych",
+    "est_otdeln_zjil_pomech",
+    "soc_potderhka",
+    "proinformirovan_new_ystr",
+    "proinformirovan_new_org",
+    "planiryet_podkluchits",
+    "buklet_s_kontaktami",
+}
+
+
+def gazification_view_row(record) -> Row:
+    row = []
+    for column in GAZIFICATION_VIEW_COLUMNS:
+        value = record[column.key]
+        if column.type == DATETIME:
+            value = to_local_time(value)
+        elif column.key in VIEW_YES_NO_FIELDS:
+            value = format_answer(value)
+        row.append(value)
+    return tuple(row)
+
+
+async def get_gazification_view_rows(filters: ExportFilters) -> RowSource:
+    """Источник строк выгрузки /export-csv с фиксированным набором колонок анкеты"""
+    connection = await get_read_connection()
+    query, params = build_gazification_view_query(filters)
+
+    async def batches():
+        async with contextlib.aclosing(
+            stream_query(connection, query, params, settings.EXPORT_BATCH_SIZE)
+        ) as records:
+            async for batch in records:
+                yield [gazification_view_row(record) for record in batch]
+        log_db_operation("read", "gazification_view_data", filters.to_log())
+
+    return RowSource(
+        "gazification_view", "gazification_data", "Газификация", GAZIFICATION_VIEW_COLUMNS, batches
+    )
+
+
+ACTIVITY_COLUMNS = [
+    Column("date_create", "Дата входа", DATETIME, 18),
+    Column("email", "Аккаунт", TEXT, 30),
+    Column("activity_count", "Количество внесений", INTEGER, 20),
+]
+
+
+async def get_activity_rows(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> RowSource:
+    """Источник строк выгрузки активности пользователей, новые сессии первыми"""
+    connection = await get_read_connection()
+    params: List[Any] = []
+    conditions = []
+    if date_from:
+        params.append(date_from)
+        conditions.append(f"date_create >= ${len(params)}")
+    if date_to:
+        params.append(date_to)
+        conditions.append(f"date_create <= ${len(params)}")
+    where_sql = "WHERE " + " AND ".join(conditions) if conditions else ""
+    query = f"""
+        SELECT email, activity_count, date_create
+        FROM s_gazifikacia.activity
+        {where_sql}
+        ORDER BY date_create DESC
+    """
+
+    async def batches():
+        async with contextlib.aclosing(
+            stream_query(connection, query, params, settings.EXPORT_BATCH_SIZE)
+        ) as records:
+            async for batch in records:
+                yield [
+                    (
+                        to_local_time(record["date_create"]),
+                        record["email"] or "Не указан",
+                        record["activity_count"] or 0,
+                    )
+                    for record in batch
+                ]
+
+    return RowSource(
+        "activity",
+        "activity_export",
+        "Активность",
+        ACTIVITY_COLUMNS,
+        batches,
+        empty_message="Не найдено данных активности для экспорта с указанными параметрами",
     )
-    
-    return result
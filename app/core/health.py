@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import Any, Dict, Tuple
+from tortoise import Tortoise
+from app.core.config import settings
+from app.core.db import get_pool_stats, get_replica_state
+from app.core.metrics import get_event_loop_lag
+from app.core.shutdown import get_exports_in_flight, is_draining
+from app.core.warmup import get_warmup_state, is_warmup_finished
+
+STARTED_AT = time.monotonic()
+
+
+async def check_database() -> Dict[str, Any]:
+    """
+    Runs SELECT 1 through the pool within READINESS_DB_TIMEOUT.
+
+    Going through the pool is deliberate: when every connection is busy the
+    check waits like a real request would and fails on the deadline.
+    """
+    start_time = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            Tortoise.get_connection("default").execute_query("SELECT 1"),
+            settings.READINESS_DB_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"no response within {settings.READINESS_DB_TIMEOUT}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start_time) * 1000, 1)}
+
+
+def check_pool() -> Dict[str, Any]:
+    stats = get_pool_stats("default")
+    return {
+        "ok": stats["waiters"] <= settings.READINESS_MAX_POOL_WAITERS,
+        "in_use": stats["in_use"],
+        "max_size": stats["max_size"],
+        "waiters": stats["waiters"],
+    }
+
+
+def check_event_loop() -> Dict[str, Any]:
+    lag = get_event_loop_lag()
+    return {
+        "ok": lag is None or lag <= settings.READINESS_MAX_LOOP_LAG,
+        "lag_ms": round(lag * 1000, 1) if lag is not None else None,
+    }
+
+
+async def get_readiness() -> Tuple[bool, Dict[str, Any]]:
+    """
+    Whether this worker can serve requests within SLO, with per-check details.
+
+    Replica state is reported but does not affect readiness: reads fall back
+    to the primary. A draining worker reports not ready right away, so the
+    balancer stops sending it traffic before the pool is closed.
+    """
+    checks = {
+        "shutdown": {"ok": not is_draining(), "exports_in_flight": get_exports_in_flight()},
+        "warmup": {"ok": is_warmup_finished(), **get_warmup_state()},
+        "event_loop": check_event_loop(),
+        "pool": check_pool(),
+        "database": await check_database(),
+    }
+    ready = all(check["ok"] for check in checks.values())
+    checks["replica"] = get_replica_state()
+    return ready, checks
+
+
+def get_liveness() -> Dict[str, Any]:
+    return {"uptime_seconds": round(time.monotonic() - STARTED_AT, 1)}
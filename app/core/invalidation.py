@@ -0,0 +1,184 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+import asyncpg
+from tortoise import Tortoise
+from app.core.config import settings
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import (
+    INVALIDATION_EVENTS,
+    INVALIDATION_LISTENER_CONNECTED,
+    INVALIDATION_RECONNECTS,
+)
+
+logger = get_logger("invalidation")
+
+CHANNEL = "rkc_invalidation"
+TOPIC_ADDRESS = "address"
+TOPIC_QUESTIONNAIRE = "questionnaire"
+# Sent locally after (re)connecting: events may have been missed, drop everything
+TOPIC_ALL = "all"
+
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+Handler = Callable[[Dict[str, Any]], None]
+_handlers: List[Handler] = []
+
+
+def subscribe(handler: Handler) -> Handler:
+    """Registers a local handler called with every change event."""
+    _handlers.append(handler)
+    return handler
+
+
+def dispatch(event: Dict[str, Any], source: str = "local") -> None:
+    INVALIDATION_EVENTS.inc(topic=event.get("topic", "unknown"), source=source)
+    for handler in _handlers:
+        try:
+            handler(event)
+        except Exception as e:
+            logger.error(
+                categorize_log(f"Invalidation handler failed: {e}", LogCategory.ERROR),
+                extra={"event": event},
+                exc_info=True,
+            )
+
+
+async def publish(topic: str, **fields: Any) -> None:
+    """
+    Invalidates local caches and notifies other workers about a change.
+
+    Call after the write is committed. Fields with None values are omitted
+    to keep the payload small. A failed NOTIFY is logged and ignored: other
+    workers then rely on cache TTL.
+    """
+    event = {"topic": topic, **{key: value for key, value in fields.items() if value is not None}}
+    dispatch(event)
+    if not settings.INVALIDATION_ENABLED:
+        return
+    payload = json.dumps({**event, "origin": ORIGIN}, separators=(",", ":"), default=str)
+    try:
+        await Tortoise.get_connection("default").execute_query(
+            "SELECT pg_notify($1, $2)", [CHANNEL, payload]
+        )
+    except Exception as e:
+        logger.warning(
+            categorize_log(f"Failed to publish invalidation event: {e}", LogCategory.DB),
+            extra={"event": event},
+        )
+
+
+class InvalidationListener:
+    """
+    Dedicated LISTEN connection that feeds remote events to local handlers.
+
+    The connection is outside the pool (pooled connections run UNLISTEN on
+    release). A periodic probe detects silently dropped connections; after
+    every (re)connect all caches are flushed, because events sent while the
+    listener was away are lost. While disconnected, caches shorten their TTL
+    to INVALIDATION_FALLBACK_TTL.
+    """
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.connected = False
+        self.connected_at: Optional[float] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._lost: Optional[asyncio.Event] = None
+
+    async def run(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                await self._connect()
+                delay = 1.0
+                await self._watch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    categorize_log(f"Invalidation listener disconnected: {e}", LogCategory.DB),
+                    extra={"retry_in": delay},
+                )
+            finally:
+                await self._close()
+            INVALIDATION_RECONNECTS.inc()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, settings.INVALIDATION_RECONNECT_MAX_DELAY)
+
+    async def _connect(self) -> None:
+        self._lost = asyncio.Event()
+        self._connection = await asyncpg.connect(self.dsn, timeout=10)
+        self._connection.add_termination_listener(lambda _: self._lost.set())
+        await self._connection.add_listener(CHANNEL, self._on_notification)
+        self.connected = True
+        self.connected_at = time.monotonic()
+        INVALIDATION_LISTENER_CONNECTED.set(1)
+        dispatch({"topic": TOPIC_ALL})
+        logger.info(categorize_log("Invalidation listener connected", LogCategory.DB))
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._lost.wait(), timeout=settings.INVALIDATION_KEEPALIVE_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                await self._connection.fetchval("SELECT 1", timeout=10)
+            else:
+                raise ConnectionError("listener connection closed")
+
+    async def _close(self) -> None:
+        self.connected = False
+        INVALIDATION_LISTENER_CONNECTED.set(0)
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            connection.terminate()
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(
+                categorize_log("Malformed invalidation event", LogCategory.DB),
+                extra={"payload": payload[:200]},
+            )
+            return
+        if event.pop("origin", None) == ORIGIN:
+            return
+        dispatch(event, source="remote")
+
+
+_listener: Optional[InvalidationListener] = None
+
+
+async def run_invalidation_listener() -> None:
+    """Background task started from the application lifespan."""
+    global _listener
+    _listener = InvalidationListener(settings.DATABASE_URL)
+    await _listener.run()
+
+
+def is_listener_connected() -> bool:
+    return _listener is not None and _listener.connected
+
+
+async def wait_for_listener(timeout: float) -> bool:
+    """Waits until the listener is connected; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while not is_listener_connected():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+def effective_ttl(ttl: float) -> float:
+    """TTL for cached values: shortened while remote invalidations can be missed."""
+    if is_listener_connected():
+        return ttl
+    return min(ttl, settings.INVALIDATION_FALLBACK_TTL)
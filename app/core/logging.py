@@ -1,10 +1,15 @@
+import copy
 import logging
+import queue
 import sys
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from enum import Enum
+from typing import Optional
 import json
 from app.core.config import settings
+from app.core.metrics import LOG_RECORDS_DROPPED
 
 
 class LogCategory(Enum):
@@ -55,7 +60,49 @@ class DetailedFileFormatter(logging.Formatter):
             return str(data)
 
 
-def setup_logging(log_level: str = "INFO") -> None:
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them.
+
+    With the "drop" policy a full queue drops the record immediately; with
+    "block" the caller waits up to LOG_QUEUE_BLOCK_TIMEOUT before dropping.
+    """
+
+    def __init__(self, log_queue: queue.Queue, policy: str, block_timeout: float):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve the message arguments here; formatting and tracebacks
+        # are rendered by the file handlers on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+_queue_handler: Optional[BoundedQueueHandler] = None
+_queue_listener: Optional[QueueListener] = None
+_telegram_handler = None
+
+
+def setup_logging(log_level: str = "INFO", use_queue: Optional[bool] = None) -> None:
+    global _queue_handler, _queue_listener, _telegram_handler
+    if use_queue is None:
+        use_queue = settings.LOG_QUEUE_ENABLED
+    stop_logging()
     log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     log_level_obj = getattr(logging, log_level)
     logs_dir = Path("logs")
@@ -64,22 +111,35 @@ def setup_logging(log_level: str = "INFO") -> None:
     root_logger.setLevel(log_level_obj)
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+        handler.close()
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(logging.Formatter(log_format))
     console_handler.setLevel(log_level_obj)
-    root_logger.addHandler(console_handler)
     file_handler = logging.FileHandler(
         logs_dir / f"app_{datetime.now().strftime('%Y%m%d')}.log", encoding="utf-8"
     )
     file_handler.setFormatter(DetailedFileFormatter(log_format))
     file_handler.setLevel(log_level_obj)
-    root_logger.addHandler(file_handler)
     error_file_handler = logging.FileHandler(
         logs_dir / f"errors_{datetime.now().strftime('%Y%m%d')}.log", encoding="utf-8"
     )
     error_file_handler.setLevel(logging.ERROR)
     error_file_handler.setFormatter(DetailedFileFormatter(log_format))
-    root_logger.addHandler(error_file_handler)
+    output_handlers = [console_handler, file_handler, error_file_handler]
+    if use_queue:
+        _queue_handler = BoundedQueueHandler(
+            queue.Queue(maxsize=settings.LOG_QUEUE_SIZE),
+            policy=settings.LOG_QUEUE_POLICY,
+            block_timeout=settings.LOG_QUEUE_BLOCK_TIMEOUT,
+        )
+        _queue_listener = QueueListener(
+            _queue_handler.queue, *output_handlers, respect_handler_level=True
+        )
+        _queue_listener.start()
+        root_logger.addHandler(_queue_handler)
+    else:
+        for handler in output_handlers:
+            root_logger.addHandler(handler)
     if (
         settings.ENABLE_TELEGRAM_LOGGING
         and settings.TELEGRAM_BOT_TOKEN
@@ -88,9 +148,19 @@ def setup_logging(log_level: str = "INFO") -> None:
         from app.core.telegram_logging import TelegramLogHandler
 
         telegram_handler = TelegramLogHandler(
-            bot_token=settings.TELEGRAM_BOT_TOKEN, chat_id=settings.TELEGRAM_CHAT_ID
+            bot_token=settings.TELEGRAM_BOT_TOKEN,
+            chat_id=settings.TELEGRAM_CHAT_ID,
+            queue_size=settings.TELEGRAM_QUEUE_SIZE,
+            min_send_interval=settings.TELEGRAM_MIN_SEND_INTERVAL,
+            base_url=settings.TELEGRAM_API_BASE_URL,
         )
         telegram_handler.setLevel(logging.INFO)
+        try:
+            telegram_handler.start()
+        except RuntimeError:
+            # Нет запущенного event loop: записи копятся до вызова start()
+            pass
+        _telegram_handler = telegram_handler
         root_logger.addHandler(telegram_handler)
         logging.getLogger("app").info(
             categorize_log("Telegram logging initialized", LogCategory.INIT)
@@ -104,6 +174,35 @@ def setup_logging(log_level: str = "INFO") -> None:
             mod_logger.propagate = False
 
 
+def stop_logging() -> None:
+    """Flush queued records to disk and stop the listener thread."""
+    global _queue_handler, _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        for handler in _queue_listener.handlers:
+            handler.close()
+        _queue_listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+async def close_telegram_logging(timeout: float = 5.0) -> None:
+    """Send queued Telegram messages within timeout and detach the handler."""
+    global _telegram_handler
+    if _telegram_handler is None:
+        return
+    handler = _telegram_handler
+    _telegram_handler = None
+    logging.getLogger().removeHandler(handler)
+    await handler.aclose(timeout)
+
+
+def get_dropped_log_records() -> int:
+    """Number of records dropped because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
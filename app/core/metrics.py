@@ -0,0 +1,375 @@
+import asyncio
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+EXPORT_DURATION_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+EXPORT_ROWS_BUCKETS = (10, 100, 1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+EXPORT_BYTES_BUCKETS = tuple(1024 * 4**power for power in range(11))
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels: str) -> Optional[float]:
+        return self._values.get(self._key(labels))
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0.0
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        self._sums[key] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames, key, f'le="{_format_value(bound)}"'
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status",
+        ("method", "route", "status"),
+    )
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ("method", "route"),
+    )
+)
+DB_QUERY_DURATION = REGISTRY.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Duration of individual SQL statements",
+        ("connection",),
+        buckets=DB_BUCKETS,
+    )
+)
+DB_OPERATIONS = REGISTRY.register(
+    Counter(
+        "db_operations_total",
+        "Logical DB operations reported via log_db_operation",
+        ("operation", "model"),
+    )
+)
+DB_OPERATION_QUERIES = REGISTRY.register(
+    Counter(
+        "db_operation_queries_total",
+        "SQL statements executed for a logical DB operation",
+        ("operation", "model"),
+    )
+)
+DB_OPERATION_DURATION = REGISTRY.register(
+    Histogram(
+        "db_operation_duration_seconds",
+        "Total SQL time spent for a logical DB operation",
+        ("operation", "model"),
+        buckets=DB_BUCKETS,
+    )
+)
+EXPORT_DURATION = REGISTRY.register(
+    Histogram(
+        "export_duration_seconds",
+        "Time to fetch and render an export",
+        ("export",),
+        buckets=EXPORT_DURATION_BUCKETS,
+    )
+)
+EXPORT_ROWS = REGISTRY.register(
+    Histogram(
+        "export_rows",
+        "Rows written per export",
+        ("export",),
+        buckets=EXPORT_ROWS_BUCKETS,
+    )
+)
+EXPORT_BYTES = REGISTRY.register(
+    Histogram(
+        "export_size_bytes",
+        "Size of the rendered export file",
+        ("export",),
+        buckets=EXPORT_BYTES_BUCKETS,
+    )
+)
+EVENT_LOOP_LAG = REGISTRY.register(
+    Histogram(
+        "event_loop_lag_seconds",
+        "Delay between a scheduled event loop wakeup and the actual one",
+        buckets=LOOP_LAG_BUCKETS,
+    )
+)
+EVENT_LOOP_LAG_LAST = REGISTRY.register(
+    Gauge("event_loop_lag_last_seconds", "Most recent event loop lag measurement")
+)
+DB_POOL_CONNECTIONS = REGISTRY.register(
+    Gauge(
+        "db_pool_connections",
+        "Connection pool state",
+        ("connection", "state"),
+    )
+)
+DB_POOL_ACQUIRE_DURATION = REGISTRY.register(
+    Histogram(
+        "db_pool_acquire_duration_seconds",
+        "Time spent waiting for a pool connection",
+        ("connection",),
+        buckets=DB_BUCKETS,
+    )
+)
+LOG_RECORDS_DROPPED = REGISTRY.register(
+    Counter("log_records_dropped_total", "Log records dropped because the queue was full")
+)
+
+ARCHIVE_ROWS = REGISTRY.register(
+    Counter("history_archive_rows_total", "Soft-deleted history rows moved to the archive")
+)
+ARCHIVE_BATCH_DURATION = REGISTRY.register(
+    Histogram(
+        "history_archive_batch_duration_seconds",
+        "Time to move one batch of history rows to the archive",
+        buckets=LATENCY_BUCKETS,
+    )
+)
+
+ADMISSION_ACTIVE = REGISTRY.register(
+    Gauge("admission_active_requests", "Requests holding an admission slot", ("route_class",))
+)
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("admission_queue_depth", "Requests waiting for an admission slot", ("route_class",))
+)
+ADMISSION_QUEUE_WAIT = REGISTRY.register(
+    Histogram(
+        "admission_queue_wait_seconds",
+        "Time queued requests waited for an admission slot",
+        ("route_class",),
+    )
+)
+ADMISSION_REJECTED = REGISTRY.register(
+    Counter(
+        "admission_rejected_total",
+        "Requests rejected by admission control",
+        ("route_class", "reason"),
+    )
+)
+
+SINGLEFLIGHT_CALLS = REGISTRY.register(
+    Counter(
+        "singleflight_calls_total",
+        "Coalesced calls: leaders run the computation, followers share it",
+        ("name", "role"),
+    )
+)
+
+INVALIDATION_EVENTS = REGISTRY.register(
+    Counter(
+        "cache_invalidation_events_total",
+        "Cache invalidation events handled by this worker",
+        ("topic", "source"),
+    )
+)
+INVALIDATION_LISTENER_CONNECTED = REGISTRY.register(
+    Gauge("cache_invalidation_listener_connected", "1 while the LISTEN connection is up")
+)
+INVALIDATION_RECONNECTS = REGISTRY.register(
+    Counter("cache_invalidation_reconnects_total", "LISTEN connection reconnect attempts")
+)
+
+WARMUP_STEP_DURATION = REGISTRY.register(
+    Gauge("startup_warmup_step_seconds", "Duration of each startup warm-up step", ("step",))
+)
+
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("cache_requests_total", "Cache lookups by result (hit or miss)", ("namespace", "result"))
+)
+CACHE_EVICTIONS = REGISTRY.register(
+    Counter("cache_evictions_total", "Entries evicted by the in-process LRU bound", ("namespace",))
+)
+CACHE_ENTRIES = REGISTRY.register(
+    Gauge("cache_entries", "Entries held by the in-process cache", ("namespace",))
+)
+CACHE_ERRORS = REGISTRY.register(
+    Counter("cache_errors_total", "Shared cache backend errors", ("namespace", "operation"))
+)
+
+EXPORT_ARTIFACT_BYTES = REGISTRY.register(
+    Gauge("export_artifact_bytes", "Disk space used by export files of this worker")
+)
+EXPORT_ARTIFACTS = REGISTRY.register(
+    Gauge("export_artifacts", "Export files of this worker on disk")
+)
+EXPORT_ARTIFACT_DELETIONS = REGISTRY.register(
+    Counter(
+        "export_artifact_deletions_total",
+        "Export files deleted, by reason (sent, expired, evicted, failed, shutdown)",
+        ("reason",),
+    )
+)
+
+
+def record_request(method: str, route: str, status: int, seconds: float) -> None:
+    HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+    HTTP_REQUEST_DURATION.observe(seconds, method=method, route=route)
+
+
+def record_export(export: str, rows: int, size_bytes: Optional[int], seconds: float) -> None:
+    """Record size and duration of a finished export."""
+    EXPORT_DURATION.observe(seconds, export=export)
+    EXPORT_ROWS.observe(rows, export=export)
+    if size_bytes is not None:
+        EXPORT_BYTES.observe(size_bytes, export=export)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Measure how late the event loop wakes up after a sleep of `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - scheduled, 0.0)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+
+
+def get_event_loop_lag() -> Optional[float]:
+    """Return the latest lag measurement, or None before the first one."""
+    return EVENT_LOOP_LAG_LAST.get()
+
@@ -1,177 +1,317 @@
+import json
+import random
+import re
 import time
 import uuid
-from typing import Callable, List
-from fastapi import Request, Response, FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from typing import List
+from urllib.parse import parse_qsl
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
+from app.core.admission import AdmissionControlMiddleware
 from app.core.logging import get_logger, categorize_log, LogCategory
 from app.core.config import settings
-import json
-from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.db import QueryStats, set_statement_timeout, start_query_tracking
+from app.core.metrics import record_request
+from app.core.route_classes import classify_request, get_statement_timeout
+from app.core.profiling import (
+    PROFILE_HEADER,
+    PROFILE_QUERY_PARAM,
+    RequestProfiler,
+    is_profile_requested,
+    save_profile,
+)
 
 logger = get_logger("middleware")
 
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+SENSITIVE_HEADERS = {"authorization", "cookie", "set-cookie", "x-api-key", "x-profile"}
+SENSITIVE_BODY_FIELDS = {"password", "password_hash", "token", "secret", "authorization"}
+REDACTED = "[REDACTED]"
+# Probes and scrapes are polled every few seconds and would flood the request log
+UNLOGGED_PATHS = {"/healthz", "/readyz", "/metrics"}
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that applies proxy headers, assigns a request id,
+    measures processing time and logs requests with sampled body capture.
+
+    Bodies are only read when the request is sampled and its declared size is
+    under REQUEST_LOG_BODY_MAX_BYTES. Responses that are not small JSON
+    documents (file and streaming exports) are forwarded chunk by chunk untouched.
+    """
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.response_body_size_limit = 10000
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if not settings.ENABLE_REQUEST_LOGGING:
-            return await call_next(request)
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        start_time = time.time()
-        client_ip = self._get_client_ip(request)
-        query_params = dict(request.query_params)
-        headers = self._get_relevant_headers(request)
-        request_body = {}
-        if request.method != "GET":
-            try:
-                body_bytes = await request.body()
-                request.scope["_body"] = body_bytes
-                if len(body_bytes) > 0:
-                    try:
-                        body_str = body_bytes.decode("utf-8")
-                        if len(body_str) > 1000:
-                            request_body = {
-                                "content": body_str[:1000] + "... (truncated)"
-                            }
-                        else:
-                            try:
-                                request_body = json.loads(body_str)
-                            except:
-                                request_body = {"content": body_str}
-                    except:
-                        request_body = {"content": "[binary data]"}
-            except:
-                request_body = {"error": "Failed to read request body"}
-        logger.info(
-            categorize_log(
-                f"Request started: {request.method} {request.url.path}",
-                LogCategory.HTTP,
-            ),
-            extra={
-                "request_id": request_id,
-                "method": request.method,
-                "path": request.url.path,
-                "client_ip": client_ip,
-                "query_params": query_params,
-                "headers": headers,
-                "request_body": request_body,
-            },
-        )
-        try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            response_body = await self._get_response_body(response)
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start_time = time.perf_counter()
+        headers = Headers(scope=scope)
+        self._apply_proxy_headers(scope, headers)
+        request_id = self._get_request_id(headers)
+        scope.setdefault("state", {})["request_id"] = request_id
+        query_stats = start_query_tracking()
+        route_class = classify_request(scope["method"], scope["path"])
+        scope["state"]["route_class"] = route_class
+        set_statement_timeout(get_statement_timeout(route_class))
+        profiler = None
+        if settings.PROFILING_TOKEN and self._is_profile_requested(scope, headers):
+            profiler = RequestProfiler(settings.PROFILING_SAMPLE_INTERVAL)
+            profiler.start()
+        method = scope["method"]
+        path = scope["path"]
+        log_requests = settings.ENABLE_REQUEST_LOGGING and path not in UNLOGGED_PATHS
+        capture_body = log_requests and self._should_capture_body()
+        client_ip = scope["client"][0] if scope.get("client") else "unknown"
+        query_params = {}
+        if log_requests:
+            query_params = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+            if settings.REQUEST_LOG_REDACT and PROFILE_QUERY_PARAM in query_params:
+                query_params[PROFILE_QUERY_PARAM] = REDACTED
+            request_body = {}
+            if capture_body and method != "GET":
+                if self._is_small_body(headers):
+                    body_bytes, receive = await self._read_body(receive)
+                    request_body = self._parse_body(body_bytes)
+                elif headers.get("content-length") != "0":
+                    request_body = {"content": "[body not captured]"}
             logger.info(
-                categorize_log(
-                    f"Request completed: {request.method} {request.url.path}",
-                    LogCategory.HTTP,
-                ),
+                categorize_log(f"Request started: {method} {path}", LogCategory.HTTP),
                 extra={
                     "request_id": request_id,
-                    "status_code": response.status_code,
-                    "processing_time_ms": round(process_time * 1000, 2),
+                    "method": method,
+                    "path": path,
                     "client_ip": client_ip,
-                    "response_body": response_body,
-                    "response_headers": dict(response.headers),
+                    "query_params": query_params,
+                    "headers": self._get_relevant_headers(headers),
+                    "request_body": request_body,
                 },
             )
-            response.headers["X-Process-Time"] = str(process_time)
-            response.headers["X-Request-ID"] = request_id
-            return response
+        response_state = {"status_code": None, "headers": None, "capture": False}
+        response_chunks = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Process-Time"] = str(time.perf_counter() - start_time)
+                response_headers["X-Request-ID"] = request_id
+                if settings.DB_DEBUG_HEADERS:
+                    self._add_db_headers(response_headers, query_stats)
+                response_state["status_code"] = message["status"]
+                if log_requests:
+                    response_state["headers"] = dict(response_headers)
+                    response_state["capture"] = capture_body and self._is_small_json(
+                        response_headers
+                    )
+            elif message["type"] == "http.response.body" and response_state["capture"]:
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            process_time = time.time() - start_time
-            logger.error(
-                categorize_log(
-                    f"Request failed: {request.method} {request.url.path}",
-                    LogCategory.ERROR,
-                ),
+            record_request(
+                method, self._get_route_label(scope), 500, time.perf_counter() - start_time
+            )
+            if log_requests:
+                logger.error(
+                    categorize_log(f"Request failed: {method} {path}", LogCategory.ERROR),
+                    extra={
+                        "request_id": request_id,
+                        "error": str(e),
+                        "processing_time_ms": round(
+                            (time.perf_counter() - start_time) * 1000, 2
+                        ),
+                        "client_ip": client_ip,
+                        "query_params": query_params,
+                    },
+                )
+            raise
+        finally:
+            self._check_db_budget(method, path, request_id, query_stats)
+            if profiler is not None:
+                profiler.stop()
+                await save_profile(profiler, request_id, method, path)
+        record_request(
+            method,
+            self._get_route_label(scope),
+            response_state["status_code"] or 500,
+            time.perf_counter() - start_time,
+        )
+        if log_requests:
+            logger.info(
+                categorize_log(f"Request completed: {method} {path}", LogCategory.HTTP),
                 extra={
                     "request_id": request_id,
-                    "error": str(e),
-                    "processing_time_ms": round(process_time * 1000, 2),
+                    "status_code": response_state["status_code"],
+                    "processing_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
                     "client_ip": client_ip,
-                    "query_params": query_params,
+                    "response_body": self._get_response_body(
+                        response_state, response_chunks
+                    ),
+                    "response_headers": response_state["headers"],
                 },
             )
-            raise
 
-    async def _get_response_body(self, response: Response) -> dict:
-        """Extract the response body for logging."""
+    def _apply_proxy_headers(self, scope: Scope, headers: Headers) -> None:
+        """Take the client address and scheme from reverse proxy headers."""
+        forwarded_for = headers.get("x-forwarded-for")
+        if forwarded_for:
+            port = scope["client"][1] if scope.get("client") else 0
+            scope["client"] = (forwarded_for.split(",")[0].strip(), port)
+        forwarded_proto = headers.get("x-forwarded-proto")
+        if forwarded_proto:
+            scope["scheme"] = forwarded_proto.split(",")[0].strip()
+
+    def _is_profile_requested(self, scope: Scope, headers: Headers) -> bool:
+        query_params = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        return is_profile_requested(
+            headers.get(PROFILE_HEADER), query_params.get(PROFILE_QUERY_PARAM)
+        )
+
+    def _add_db_headers(self, headers: MutableHeaders, query_stats: QueryStats) -> None:
+        """Report DB work done before the response started."""
+        headers["X-DB-Query-Count"] = str(query_stats.count)
+        headers["X-DB-Time-Ms"] = str(round(query_stats.seconds * 1000, 2))
+        headers["X-DB-Repeated-Queries"] = str(
+            len(query_stats.repeated(settings.DB_REPEATED_QUERY_THRESHOLD))
+        )
+
+    def _check_db_budget(
+        self, method: str, path: str, request_id: str, query_stats: QueryStats
+    ) -> None:
+        """Warn when a request ran too many or too slow queries, or the same query in a loop."""
+        db_time_ms = round(query_stats.seconds * 1000, 2)
+        repeated = query_stats.repeated(settings.DB_REPEATED_QUERY_THRESHOLD)
+        if (
+            query_stats.count <= settings.DB_QUERY_BUDGET
+            and db_time_ms <= settings.DB_TIME_BUDGET_MS
+            and not repeated
+        ):
+            return
+        logger.warning(
+            categorize_log(f"DB budget exceeded: {method} {path}", LogCategory.DB),
+            extra={
+                "request_id": request_id,
+                "query_count": query_stats.count,
+                "query_budget": settings.DB_QUERY_BUDGET,
+                "db_time_ms": db_time_ms,
+                "db_time_budget_ms": settings.DB_TIME_BUDGET_MS,
+                "repeated_queries": [
+                    {"query": shape[:200], "count": count} for shape, count in repeated
+                ],
+            },
+        )
+
+    def _get_route_label(self, scope: Scope) -> str:
+        """Route template for metrics, so path parameters do not create new series."""
+        route = scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def _get_request_id(self, headers: Headers) -> str:
+        incoming = headers.get("x-request-id")
+        if incoming and REQUEST_ID_PATTERN.match(incoming):
+            return incoming
+        return str(uuid.uuid4())
+
+    def _should_capture_body(self) -> bool:
+        sample_rate = settings.REQUEST_LOG_BODY_SAMPLE_RATE
+        if sample_rate <= 0:
+            return False
+        return sample_rate >= 1 or random.random() < sample_rate
+
+    def _is_small_body(self, headers: Headers) -> bool:
+        content_length = headers.get("content-length")
+        return (
+            content_length is not None
+            and content_length.isdigit()
+            and int(content_length) <= settings.REQUEST_LOG_BODY_MAX_BYTES
+        )
+
+    async def _read_body(self, receive: Receive):
+        """Read a small request body and return a receive callable that replays it."""
+        messages = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            more_body = message.get("more_body", False)
+        body_bytes = b"".join(message.get("body", b"") for message in messages)
+
+        async def replay() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        return body_bytes, replay
+
+    def _parse_body(self, body_bytes: bytes) -> dict:
+        if not body_bytes:
+            return {}
         try:
-            if isinstance(response, JSONResponse):
-                if len(response.body) > self.response_body_size_limit:
-                    return {"content": "[response too large to log]"}
-                try:
-                    body_str = response.body.decode("utf-8")
-                    return json.loads(body_str)
-                except:
-                    return {
-                        "content": (
-                            body_str[: self.response_body_size_limit]
-                            + "... (truncated)"
-                            if len(body_str) > self.response_body_size_limit
-                            else body_str
-                        )
-                    }
-            elif isinstance(response, StreamingResponse):
-                return {"content": "[streaming response]"}
-            else:
-                return {
-                    "type": str(type(response)),
-                    "content": "[response body not captured]",
-                }
-        except Exception as e:
-            return {"error": f"Failed to capture response body: {str(e)}"}
+            body_str = body_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"content": "[binary data]"}
+        try:
+            body = json.loads(body_str)
+        except ValueError:
+            return {"content": body_str}
+        if settings.REQUEST_LOG_REDACT:
+            body = self._redact(body)
+        return body if isinstance(body, dict) else {"content": body}
 
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP address from request."""
-        client_host = request.client.host if request.client else None
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        return client_host or "unknown"
-
-    def _get_relevant_headers(self, request: Request) -> dict:
-        """Extract relevant headers from request for logging."""
-        headers = dict(request.headers)
-        sensitive_headers = ["authorization", "cookie", "set-cookie"]
-        filtered_headers = {}
-        for key, value in headers.items():
-            if key.lower() in sensitive_headers:
-                filtered_headers[key] = "[REDACTED]"
-            else:
-                filtered_headers[key] = value
-        return filtered_headers
-
-
-class ProxyHeadersMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+    def _redact(self, data):
+        if isinstance(data, dict):
+            return {
+                key: REDACTED if key.lower() in SENSITIVE_BODY_FIELDS else self._redact(value)
+                for key, value in data.items()
+            }
+        if isinstance(data, list):
+            return [self._redact(item) for item in data]
+        return data
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            request.scope["client"] = (
-                forwarded_for.split(",")[0].strip(),
-                request.scope["client"][1],
-            )
-        forwarded_proto = request.headers.get("X-Forwarded-Proto")
-        if forwarded_proto:
-            request.scope["scheme"] = forwarded_proto
-        response = await call_next(request)
-        return response
+    def _is_small_json(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "")
+        content_length = headers.get("content-length")
+        return (
+            content_type.startswith("application/json")
+            and content_length is not None
+            and int(content_length) <= settings.REQUEST_LOG_BODY_MAX_BYTES
+        )
+
+    def _get_response_body(self, response_state: dict, chunks: List[bytes]) -> dict:
+        """Describe the response body for logging."""
+        if not response_state["capture"]:
+            return {"content": "[response body not captured]"}
+        try:
+            body = json.loads(b"".join(chunks).decode("utf-8"))
+        except ValueError:
+            return {"content": "[invalid json]"}
+        return self._redact(body) if settings.REQUEST_LOG_REDACT else body
+
+    def _get_relevant_headers(self, headers: Headers) -> dict:
+        """Extract request headers for logging, redacting credentials."""
+        if not settings.REQUEST_LOG_REDACT:
+            return dict(headers)
+        return {
+            key: REDACTED if key in SENSITIVE_HEADERS else value
+            for key, value in headers.items()
+        }
 
 
 def setup_middlewares(app: FastAPI):
-    app.add_middleware(RequestLoggingMiddleware)
-    app.add_middleware(ProxyHeadersMiddleware)
+    # Added first, so it runs inside RequestContextMiddleware: rejected
+    # requests are still logged and counted with their request id
+    app.add_middleware(AdmissionControlMiddleware)
+    app.add_middleware(RequestContextMiddleware)
     setup_trusted_host_middleware(app)
     setup_cors_middleware(app)
 
@@ -0,0 +1,209 @@
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Optional, TypeVar
+from app.core.config import settings
+from app.core.logging import get_logger, categorize_log, LogCategory
+
+logger = get_logger("profiling")
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_PARAM = "profile"
+IDLE_STACK = "[event loop idle]"
+OTHER_TASK_STACK = "[other tasks]"
+WORKER_THREAD_FRAME = "[worker thread]"
+
+T = TypeVar("T")
+
+# Set in the profiled request's task; tasks and to_thread calls inherit it
+_profiler: ContextVar[Optional["RequestProfiler"]] = ContextVar("profiler", default=None)
+
+
+def is_profile_requested(header_value: Optional[str], query_value: Optional[str]) -> bool:
+    """Checks the profiling token passed in the X-Profile header or ?profile= parameter."""
+    token = settings.PROFILING_TOKEN
+    if not token:
+        return False
+    candidate = header_value or query_value
+    return bool(candidate) and hmac.compare_digest(candidate.encode(), token.encode())
+
+
+class RequestProfiler:
+    """
+    Sampling wall-clock profiler for a single request.
+
+    A background thread periodically captures the event loop thread's stack.
+    Samples taken while a task of the request is running keep their full
+    stack, samples taken while the loop waits for I/O are counted as idle,
+    and time spent running other requests is counted as a single bucket.
+    Tasks belong to the request when they were created in its context
+    (single flight leaders, disconnect watchers, streaming bodies). Worker
+    threads started through `run_in_thread` from that context are sampled
+    too, under a "[worker thread]" root frame. The result is written in the
+    collapsed stack format accepted by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.threads: set = set()
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._token = None
+        self._factory_installed = False
+
+    def start(self) -> None:
+        """Tags the current task and everything it starts; call from the request's task."""
+        _install_task_factory(self._loop)
+        self._factory_installed = True
+        self._token = _profiler.set(self)
+        self.tasks.add(asyncio.current_task())
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        if self._token is not None:
+            _profiler.reset(self._token)
+            self._token = None
+        if self._factory_installed:
+            _remove_task_factory(self._loop)
+            self._factory_installed = False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            frame = frames.get(self._thread_id)
+            if frame is not None:
+                current = asyncio.current_task(self._loop)
+                if current is None:
+                    self.samples[IDLE_STACK] += 1
+                elif current not in self.tasks:
+                    self.samples[OTHER_TASK_STACK] += 1
+                else:
+                    self.samples[self._collapse(frame)] += 1
+            for thread_id in tuple(self.threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.samples[f"{WORKER_THREAD_FRAME};{self._collapse(frame)}"] += 1
+
+    def _collapse(self, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def write(self, request_id: str) -> str:
+        """Writes collapsed stacks to PROFILING_DIR and returns the file path."""
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = os.path.join(settings.PROFILING_DIR, f"{timestamp}_{request_id}.collapsed")
+        with open(file_path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        _rotate_profiles()
+        return file_path
+
+
+def _install_task_factory(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Adds tasks created in a profiled request's context to its profiler.
+
+    The factory stays installed only while a profiler is running, so task
+    creation has no extra cost once the last profiled request finishes.
+    """
+    previous = loop.get_task_factory()
+    if getattr(previous, "profiled", False):
+        previous.active += 1
+        return
+
+    def task_factory(loop, coro, **kwargs):
+        if previous is not None:
+            task = previous(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        profiler = context.get(_profiler) if context is not None else _profiler.get()
+        if profiler is not None:
+            profiler.tasks.add(task)
+        return task
+
+    task_factory.profiled = True
+    task_factory.active = 1
+    task_factory.previous = previous
+    loop.set_task_factory(task_factory)
+
+
+def _remove_task_factory(loop: asyncio.AbstractEventLoop) -> None:
+    """Restores the previous task factory when the last running profiler stops."""
+    factory = loop.get_task_factory()
+    if not getattr(factory, "profiled", False):
+        return
+    factory.active -= 1
+    if not factory.active:
+        loop.set_task_factory(factory.previous)
+
+
+def _run_sampled(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    profiler = _profiler.get()
+    if profiler is None:
+        return func(*args, **kwargs)
+    thread_id = threading.get_ident()
+    profiler.threads.add(thread_id)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profiler.threads.discard(thread_id)
+
+
+async def run_in_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """asyncio.to_thread whose thread is sampled when the calling request is profiled."""
+    return await asyncio.to_thread(_run_sampled, func, *args, **kwargs)
+
+
+def _rotate_profiles() -> None:
+    """Keeps only the newest PROFILING_MAX_FILES profiles."""
+    entries = [
+        entry
+        for entry in os.scandir(settings.PROFILING_DIR)
+        if entry.is_file() and entry.name.endswith(".collapsed")
+    ]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[settings.PROFILING_MAX_FILES :]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+async def save_profile(profiler: RequestProfiler, request_id: str, method: str, path: str) -> None:
+    start_time = time.perf_counter()
+    try:
+        file_path = await asyncio.to_thread(profiler.write, request_id)
+    except OSError as e:
+        logger.error(
+            categorize_log(f"Failed to save profile: {e}", LogCategory.ERROR),
+            extra={"request_id": request_id},
+        )
+        return
+    logger.info(
+        categorize_log(f"Profile saved: {method} {path}", LogCategory.DEBUG),
+        extra={
+            "request_id": request_id,
+            "file": file_path,
+            "samples": sum(profiler.samples.values()),
+            "write_time_ms": round((time.perf_counter() - start_time) * 1000, 2),
+        },
+    )
@@ -0,0 +1,38 @@
+from typing import Optional
+from app.core.config import settings
+
+HINTS = "hints"
+WRITES = "writes"
+EXPORTS = "exports"
+OTHER = "other"
+ROUTE_CLASSES = (HINTS, WRITES, EXPORTS, OTHER)
+
+EXPORT_PREFIX = "/v1/export"
+HINT_PREFIXES = ("/v1/mo", "/v1/type-values")
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def classify_request(method: str, path: str) -> str:
+    """
+    Maps a request to its route class by method and path.
+
+    Works on the raw ASGI scope so it can be used before routing:
+    /v1/export* are exports, mutating methods are writes, address hints
+    and the questionnaire are hints, everything else (system, login) is other.
+    """
+    if path.startswith(EXPORT_PREFIX):
+        return EXPORTS
+    if method in WRITE_METHODS:
+        return WRITES
+    if path.startswith(HINT_PREFIXES):
+        return HINTS
+    return OTHER
+
+
+def get_statement_timeout(route_class: str) -> Optional[float]:
+    """Per-statement DB timeout in seconds for a route class, None for no limit."""
+    return {
+        HINTS: settings.DB_STATEMENT_TIMEOUT_HINTS,
+        WRITES: settings.DB_STATEMENT_TIMEOUT_WRITES,
+        EXPORTS: settings.DB_STATEMENT_TIMEOUT_EXPORTS,
+    }.get(route_class, settings.DB_COMMAND_TIMEOUT)
@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import signal
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from tortoise import Tortoise
+from tortoise.connection import connections
+from app.core.config import settings
+from app.core.logging import get_logger, categorize_log, LogCategory
+
+logger = get_logger("shutdown")
+
+HANDLED_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class DrainState:
+    """
+    Draining flag and the count of in-flight exports.
+
+    Draining starts on SIGTERM/SIGINT (before the server stops accepting
+    connections) or at the start of lifespan shutdown, whichever comes first.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.began_at: Optional[float] = None
+        self.exports_in_flight = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    def begin(self) -> None:
+        # Also called from a signal handler: no logging or locks here
+        if not self.draining:
+            self.draining = True
+            self.began_at = time.perf_counter()
+
+    @contextlib.asynccontextmanager
+    async def export(self):
+        self.exports_in_flight += 1
+        try:
+            yield
+        finally:
+            self.exports_in_flight -= 1
+            if not self.exports_in_flight and self._idle is not None:
+                self._idle.set()
+
+    async def wait_for_exports(self, timeout: float) -> bool:
+        """True if every in-flight export finished within `timeout`."""
+        if not self.exports_in_flight:
+            return True
+        self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._idle = None
+        return True
+
+
+_state = DrainState()
+
+
+def is_draining() -> bool:
+    return _state.draining
+
+
+def track_export():
+    """Async context manager counting an export request until its response is sent."""
+    return _state.export()
+
+
+def get_exports_in_flight() -> int:
+    return _state.exports_in_flight
+
+
+def install_signal_hooks() -> Callable[[], None]:
+    """
+    Starts draining as soon as a termination signal arrives.
+
+    The server's own handler is chained, so it still stops accepting
+    connections and waits for in-flight requests. Returns a function that
+    restores the previous handlers.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+    previous_handlers = {}
+
+    def handle(sig, frame):
+        _state.begin()
+        previous = previous_handlers.get(sig)
+        if callable(previous):
+            previous(sig, frame)
+        elif previous == signal.SIG_DFL and sig == signal.SIGINT:
+            raise KeyboardInterrupt
+
+    for sig in HANDLED_SIGNALS:
+        previous_handlers[sig] = signal.signal(sig, handle)
+
+    def restore() -> None:
+        for sig, previous in previous_handlers.items():
+            if signal.getsignal(sig) is handle:
+                signal.signal(sig, previous)
+
+    return restore
+
+
+async def close_database(timeout: float) -> None:
+    """Closes the pools gracefully, terminating connections still busy after `timeout`."""
+    try:
+        await asyncio.wait_for(Tortoise.close_connections(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(
+            categorize_log(f"Pools did not close within {timeout}s, terminating", LogCategory.DB)
+        )
+        for client in connections.all():
+            pool = getattr(client, "_pool", None)
+            if pool is not None:
+                pool.terminate()
+
+
+async def cancel_tasks(tasks: Iterable[Optional[asyncio.Task]]) -> None:
+    pending = [task for task in tasks if task is not None and not task.done()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+class ShutdownReport:
+    """
+    Runs shutdown phases in order and records how long each took.
+
+    When draining started on a signal, the time until lifespan shutdown is
+    reported as the "server" phase: the server closing its sockets and
+    waiting for open requests.
+    """
+
+    def __init__(self):
+        now = time.perf_counter()
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self._start_time = now
+        if _state.began_at is not None:
+            self._start_time = _state.began_at
+            self.phases["server"] = {"duration_ms": round((now - _state.began_at) * 1000, 1)}
+
+    async def phase(self, name: str, action: Awaitable[Any]) -> Any:
+        start_time = time.perf_counter()
+        result = None
+        error = None
+        try:
+            result = await action
+        except Exception as e:
+            error = str(e)
+            logger.error(
+                categorize_log(f"Shutdown phase {name} failed: {e}", LogCategory.INIT),
+                exc_info=True,
+            )
+        self.phases[name] = {"duration_ms": round((time.perf_counter() - start_time) * 1000, 1)}
+        if error:
+            self.phases[name]["error"] = error
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self._start_time) * 1000, 1),
+            "phases": self.phases,
+        }
+
+    def format(self) -> str:
+        summary = self.summary()
+        phases = ", ".join(
+            f"{name} {phase['duration_ms']} ms" + (" (failed)" if "error" in phase else "")
+            for name, phase in summary["phases"].items()
+        )
+        return f"{summary['total_ms']} ms: {phases}"
+
+
+async def drain_exports() -> Dict[str, Any]:
+    """Rejects new exports and waits up to SHUTDOWN_EXPORT_TIMEOUT for running ones."""
+    _state.begin()
+    in_flight = _state.exports_in_flight
+    logger.info(
+        categorize_log(f"Draining: new exports are rejected, {in_flight} running", LogCategory.INIT)
+    )
+    finished = await _state.wait_for_exports(settings.SHUTDOWN_EXPORT_TIMEOUT)
+    if not finished:
+        logger.warning(
+            categorize_log(
+                f"{_state.exports_in_flight} export(s) still running after "
+                f"{settings.SHUTDOWN_EXPORT_TIMEOUT}s",
+                LogCategory.INIT,
+            )
+        )
+    return {"in_flight": in_flight, "finished": finished}
@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from pydantic import BaseModel
+from starlette.requests import HTTPConnection
+from app.core.config import settings
+from app.core.metrics import SINGLEFLIGHT_CALLS
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key.
+
+    The first caller starts the computation as a separate task; callers that
+    arrive while it runs await the same task. A caller that is cancelled
+    (for example on client disconnect) stops waiting without cancelling the
+    others; the task itself is cancelled once nobody waits for it. Results
+    are not cached: a call that starts after the task finished runs again.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            SINGLEFLIGHT_CALLS.inc(name=self.name, role="leader")
+        else:
+            SINGLEFLIGHT_CALLS.inc(name=self.name, role="follower")
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if call.task.cancelled():
+            return
+        # Mark the exception as retrieved when every waiter has already left
+        call.task.exception()
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def make_key(arguments: Dict[str, Any]) -> Hashable:
+    """Normalized key from bound arguments; request objects are ignored."""
+    return tuple(
+        sorted(
+            (name, _freeze(value))
+            for name, value in arguments.items()
+            if not isinstance(value, HTTPConnection)
+        )
+    )
+
+
+def single_flight(
+    func: Optional[Callable[..., Awaitable[T]]] = None,
+    *,
+    key: Optional[Callable[..., Hashable]] = None,
+):
+    """
+    Coalesces concurrent calls of an async function with equal arguments.
+
+    Arguments are bound to the signature with defaults applied, so calls that
+    differ only in how parameters were passed share one computation. The
+    wrapper keeps the original signature, so it can be placed under FastAPI
+    route decorators. `key` overrides how the key is built from the arguments.
+    """
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        group = SingleFlight(f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}")
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            if not settings.SINGLEFLIGHT_ENABLED:
+                return await func(*args, **kwargs)
+            if key is not None:
+                call_key = key(*args, **kwargs)
+            else:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                call_key = make_key(bound.arguments)
+            return await group.do(call_key, lambda: func(*args, **kwargs))
+
+        wrapper.single_flight = group
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
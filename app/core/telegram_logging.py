@@ -1,17 +1,57 @@
 import logging
-from telegram import Bot
-from telegram.error import TelegramError
-from telegram.request import HTTPXRequest
+import sys
+import threading
+from collections import deque
 import asyncio
+import importlib
 import json
+from typing import List, Optional, Tuple
 from app.core.logging import LogCategory
 
+MAX_MESSAGE_LENGTH = 4000
+_STOP = object()
+
 
 class TelegramLogHandler(logging.Handler):
-    def __init__(self, bot_token: str, chat_id: str):
+    """
+    Ships log records to a Telegram chat from a single consumer task.
+
+    emit() only renders the record and puts it into a bounded queue; when the
+    queue is full the record is dropped and counted. The consumer waits for
+    the next send slot (min_send_interval), drains everything queued so far,
+    collapses identical messages into one line with a repeat count and packs
+    the result into messages of up to 4000 characters.
+    python-telegram-bot (and httpx) are imported in a worker thread before
+    the first send, so they do not slow down worker startup.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: str,
+        queue_size: int = 1000,
+        min_send_interval: float = 3.0,
+        base_url: str = "https://api.telegram.org/bot",
+    ):
         super().__init__()
-        self.bot = Bot(token=bot_token, request=HTTPXRequest(connection_pool_size=300))
+        self.bot_token = bot_token
+        self.base_url = base_url
+        self.bot = None
+        self._request = None
+        self._retry_after_error = None
+        self._telegram_error = None
         self.chat_id = chat_id
+        self.queue_size = queue_size
+        self.min_send_interval = min_send_interval
+        self.dropped = 0
+        self.sent_messages = 0
+        self._reported_dropped = 0
+        self._backlog: deque = deque()
+        self._backlog_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._next_send_at = 0.0
 
     def emit(self, record: logging.LogRecord):
         if self._should_skip_log(record):
@@ -24,13 +64,121 @@ class TelegramLogHandler(logging.Handler):
             extra_info += f"\nQuery Params: {self._format_dict(record.query_params)}"
         if hasattr(record, "request_body") and record.request_body:
             extra_info += f"\nRequest Body: {self._format_dict(record.request_body)}"
-        if extra_info:
-            log_entry += extra_info
-        try:
+        # Ошибки схлопываются по тексту сообщения, остальные записи - по полному тексту
+        text = log_entry + extra_info
+        key = log_entry if record.levelno >= logging.ERROR else text
+        self._put((key, text))
+
+    def start(self) -> None:
+        """Start the consumer task on the running event loop."""
+        if self._consumer is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._backlog_lock:
+            while self._backlog:
+                self._enqueue(self._backlog.popleft())
+        self._consumer = self._loop.create_task(self._consume())
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """Send what is already queued (up to timeout) and release the HTTP client."""
+        consumer = self._consumer
+        if consumer is not None:
             loop = asyncio.get_running_loop()
-            asyncio.create_task(self._send_log_to_telegram(log_entry))
+            deadline = loop.time() + timeout
+            try:
+                await asyncio.wait_for(self._queue.put(_STOP), timeout)
+                await asyncio.wait_for(
+                    asyncio.shield(consumer), max(deadline - loop.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                consumer.cancel()
+            self._consumer = None
+            self._loop = None
+        if self._request is not None:
+            await self._request.shutdown()
+
+    def _put(self, item: Tuple[str, str]) -> None:
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            with self._backlog_lock:
+                if len(self._backlog) >= self.queue_size:
+                    self.dropped += 1
+                else:
+                    self._backlog.append(item)
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
         except RuntimeError:
-            asyncio.run(self._send_log_to_telegram(log_entry))
+            running_loop = None
+        if running_loop is loop:
+            self._enqueue(item)
+        else:
+            loop.call_soon_threadsafe(self._enqueue, item)
+
+    def _enqueue(self, item) -> None:
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _consume(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            await self._wait_for_send_slot()
+            batch = [first]
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if self.dropped > self._reported_dropped:
+                note = f"Очередь логов переполнена, пропущено записей: {self.dropped - self._reported_dropped}"
+                batch.append((note, note))
+                self._reported_dropped = self.dropped
+            try:
+                for message in self._coalesce(batch):
+                    await self._wait_for_send_slot()
+                    await self._send_log_to_telegram(message)
+            except Exception as e:
+                print(f"Ошибка отправки логов в Telegram: {e}", file=sys.stderr)
+
+    async def _wait_for_send_slot(self) -> None:
+        delay = self._next_send_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _coalesce(self, batch: List[Tuple[str, str]]) -> List[str]:
+        """Collapse repeated records and pack them into Telegram-sized messages."""
+        counts = {}
+        texts = {}
+        for key, text in batch:
+            if key not in counts:
+                counts[key] = 0
+                texts[key] = text
+            counts[key] += 1
+        entries = []
+        for key, count in counts.items():
+            entry = texts[key]
+            if count > 1:
+                entry += f"\n(повторов: {count})"
+            if len(entry) > MAX_MESSAGE_LENGTH:
+                entry = entry[: MAX_MESSAGE_LENGTH - 3] + "..."
+            entries.append(entry)
+        messages = []
+        current = ""
+        for entry in entries:
+            if current and len(current) + 2 + len(entry) > MAX_MESSAGE_LENGTH:
+                messages.append(current)
+                current = ""
+            current = f"{current}\n\n{entry}" if current else entry
+        if current:
+            messages.append(current)
+        return messages
 
     def _should_skip_log(self, record: logging.LogRecord) -> bool:
         if record.levelno >= logging.ERROR:
@@ -59,10 +207,37 @@ class TelegramLogHandler(logging.Handler):
         except:
             return str(data)
 
+    async def _ensure_bot(self) -> None:
+        if self.bot is not None:
+            return
+        telegram, telegram_error, telegram_request = await asyncio.to_thread(
+            lambda: [
+                importlib.import_module(name)
+                for name in ("telegram", "telegram.error", "telegram.request")
+            ]
+        )
+        self._retry_after_error = telegram_error.RetryAfter
+        self._telegram_error = telegram_error.TelegramError
+        self._request = telegram_request.HTTPXRequest(connection_pool_size=1)
+        self.bot = telegram.Bot(token=self.bot_token, base_url=self.base_url, request=self._request)
+
     async def _send_log_to_telegram(self, log_entry: str):
+        await self._ensure_bot()
+        loop = asyncio.get_running_loop()
         try:
-            if len(log_entry) > 4000:
-                log_entry = log_entry[:3997] + "..."
             await self.bot.send_message(chat_id=self.chat_id, text=log_entry)
-        except TelegramError as e:
-            print(f"Не удалось отправить лог в Telegram: {e}")
+            self.sent_messages += 1
+        except self._retry_after_error as e:
+            retry_after = e.retry_after
+            if not isinstance(retry_after, (int, float)):
+                retry_after = retry_after.total_seconds()
+            self._next_send_at = loop.time() + retry_after
+            await self._wait_for_send_slot()
+            try:
+                await self.bot.send_message(chat_id=self.chat_id, text=log_entry)
+                self.sent_messages += 1
+            except self._telegram_error as retry_error:
+                print(f"Не удалось отправить лог в Telegram: {retry_error}", file=sys.stderr)
+        except self._telegram_error as e:
+            print(f"Не удалось отправить лог в Telegram: {e}", file=sys.stderr)
+        self._next_send_at = loop.time() + self.min_send_interval
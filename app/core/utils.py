@@ -1,12 +1,21 @@
+import asyncio
+import importlib
+import sys
 from fastapi import HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from app.schemas.base import BaseResponse
+from app.core.config import settings
+from app.core.exceptions import ClientDisconnectedError, StatementTimeoutError
 from app.core.logging import get_logger, categorize_log, LogCategory
-from typing import Optional, Any
+from app.core.db import get_query_stats
+from app.core.metrics import DB_OPERATIONS, DB_OPERATION_DURATION, DB_OPERATION_QUERIES
+from typing import Awaitable, Optional, Any, TypeVar
 
 logger = get_logger("utils")
 
+T = TypeVar("T")
+
 
 def create_response(data, message="Успех", ok=True):
     logger.debug(
@@ -72,14 +81,77 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     return create_error_response(422, error_detail)
 
 
+async def statement_timeout_handler(request: Request, exc: StatementTimeoutError):
+    request_id = getattr(request.state, "request_id", "unknown")
+    logger.warning(
+        categorize_log("Database statement timed out", LogCategory.DB),
+        extra={
+            "path": request.url.path,
+            "request_id": request_id,
+            "route_class": getattr(request.state, "route_class", None),
+        },
+    )
+    return create_error_response(504, "Превышено время выполнения запроса к базе данных")
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Выполняет awaitable, пока клиент остается подключенным.
+
+    Раз в EXPORT_DISCONNECT_POLL_INTERVAL секунд проверяет соединение; если
+    клиент ушел, задача отменяется (asyncpg отменяет выполняющийся SQL-запрос
+    на сервере, соединение возвращается в пул) и поднимается
+    ClientDisconnectedError.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.EXPORT_DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
 def log_db_operation(
     operation: str, model: str, extra: Optional[dict[str, Any]] = None
 ):
+    """
+    Логирует логическую операцию с БД и учитывает ее в метриках.
+
+    SQL-запросы, выполненные в текущем запросе после предыдущего вызова
+    log_db_operation, засчитываются этой операции.
+    """
+    DB_OPERATIONS.inc(operation=operation, model=model)
+    stats = get_query_stats()
+    if stats is not None:
+        query_count, query_seconds = stats.take_pending()
+        DB_OPERATION_QUERIES.inc(query_count, operation=operation, model=model)
+        DB_OPERATION_DURATION.observe(query_seconds, operation=operation, model=model)
     logger.info(
         categorize_log(f"DB {operation}: {model}", LogCategory.DB), extra=extra or {}
     )
 
 
+def log_export_sent(export: str, client_source: Optional[str], artifact_filename: str):
+    """
+    Логирует отдачу выгрузки клиенту.
+
+    Одинаковые одновременные выгрузки строятся один раз (single flight), поэтому
+    источник запроса логируется здесь, для каждого запроса, а не при построении.
+    """
+    logger.info(
+        categorize_log(f"Export sent: {export}", LogCategory.GENERAL),
+        extra={"client_source": client_source, "export_filename": artifact_filename},
+    )
+
+
 async def record_activity(email: str, session_id: str):
     """Записывает или обновляет активность пользователя"""
     if not session_id:
@@ -104,3 +176,16 @@ async def record_activity(email: str, session_id: str):
         )
     except Exception as e:
         logger.error(f"Error recording activity: {str(e)}", exc_info=True)
+
+
+async def import_lazily(name: str) -> Any:
+    """
+    Импортирует тяжелый модуль (pandas и т.п.) при первом использовании.
+
+    Первый импорт выполняется в отдельном потоке, чтобы не блокировать event
+    loop на сотни миллисекунд; дальше модуль берется из sys.modules.
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        module = await asyncio.to_thread(importlib.import_module, name)
+    return module
@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from tortoise import Tortoise
+from app.core.config import DB_CONNECTIONS, settings
+from app.core.invalidation import wait_for_listener
+from app.core.logging import get_logger, categorize_log, LogCategory
+from app.core.metrics import WARMUP_STEP_DURATION
+
+logger = get_logger("warmup")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+WarmupStep = Callable[[], Awaitable[Any]]
+_steps: List[Tuple[str, WarmupStep]] = []
+
+
+def register_warmup(name: str, step: WarmupStep) -> WarmupStep:
+    """Registers a coroutine function that preloads a cache during warm-up."""
+    _steps.append((name, step))
+    return step
+
+
+class WarmupState:
+    def __init__(self):
+        self.status = PENDING
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def snapshot(self) -> Dict[str, Any]:
+        duration = None
+        if self.started_at is not None:
+            duration = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "status": self.status,
+            "duration_ms": round(duration * 1000, 1) if duration is not None else None,
+            "steps": self.steps,
+        }
+
+
+_state = WarmupState()
+
+
+def get_warmup_state() -> Dict[str, Any]:
+    return _state.snapshot()
+
+
+def is_warmup_finished() -> bool:
+    return _state.finished
+
+
+async def _open_connections(connection_name: str, count: int) -> int:
+    """Holds `count` pool connections at once so the pool opens them now."""
+    client = Tortoise.get_connection(connection_name)
+    async with contextlib.AsyncExitStack() as stack:
+        for _ in range(count):
+            connection = await stack.enter_async_context(client.acquire_connection())
+            await connection.fetchval("SELECT 1")
+    return count
+
+
+async def _run_step(name: str, step: WarmupStep) -> bool:
+    start_time = time.perf_counter()
+    try:
+        await step()
+    except Exception as e:
+        seconds = time.perf_counter() - start_time
+        _state.steps[name] = {"ok": False, "duration_ms": round(seconds * 1000, 1), "error": str(e)}
+        logger.warning(
+            categorize_log(f"Warm-up step {name} failed: {e}", LogCategory.INIT),
+            extra={"step": name},
+        )
+        return False
+    seconds = time.perf_counter() - start_time
+    WARMUP_STEP_DURATION.set(seconds, step=name)
+    _state.steps[name] = {"ok": True, "duration_ms": round(seconds * 1000, 1)}
+    return True
+
+
+async def _run_steps() -> bool:
+    ok = True
+    for connection_name, connection in DB_CONNECTIONS.items():
+        count = min(settings.WARMUP_DB_CONNECTIONS, connection["credentials"]["maxsize"])
+        if count > 0:
+            ok &= await _run_step(
+                f"pool.{connection_name}", lambda: _open_connections(connection_name, count)
+            )
+    if settings.INVALIDATION_ENABLED:
+        # The listener flushes caches when it connects; preload after that
+        await wait_for_listener(settings.WARMUP_TIMEOUT / 2)
+    for name, step in _steps:
+        ok &= await _run_step(name, step)
+    return ok
+
+
+async def run_warmup() -> None:
+    """
+    Opens pool connections and preloads registered caches.
+
+    Runs once from the application lifespan. Step failures and the overall
+    WARMUP_TIMEOUT are logged but do not stop the application: caches fill
+    on first use instead. Readiness is reported once warm-up has finished.
+    """
+    _state.status = RUNNING
+    _state.started_at = time.monotonic()
+    try:
+        ok = await asyncio.wait_for(_run_steps(), settings.WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        ok = False
+        logger.warning(
+            categorize_log(f"Warm-up exceeded {settings.WARMUP_TIMEOUT}s", LogCategory.INIT)
+        )
+    _state.finished_at = time.monotonic()
+    _state.status = DONE if ok else FAILED
+    logger.info(
+        categorize_log(f"Warm-up finished: {_state.status}", LogCategory.INIT),
+        extra={"warmup": _state.snapshot()},
+    )
+
+
+def skip_warmup() -> None:
+    _state.status = DONE
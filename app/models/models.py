@@ -86,6 +86,27 @@ class GazificationData(models.Model):
         table = "t_gazifikacia_data"
 
 
+class GazificationDataHistory(models.Model):
+    """Полная история газификации: рабочая таблица и архив удаленных записей (только чтение)"""
+
+    id = fields.IntField(primary_key=True)
+    id_address = fields.IntField()
+    id_type_address = fields.IntField(null=False)
+    id_type_value = fields.IntField(null=True)
+    value = fields.CharField(max_length=256, null=True)
+    date_doc = fields.DateField(null=True)
+    date = fields.DateField(null=True)
+    date_create = fields.DatetimeField()
+    is_mobile = fields.BooleanField(default=False)
+    from_login = fields.TextField(null=True)
+    deleted = fields.BooleanField(default=False)
+    archived = fields.BooleanField(default=False)
+
+    class Meta:
+        schema = "s_gazifikacia"
+        table = "v_gazifikacia_data_history"
+
+
 class FieldType(models.Model):
     """Модель для типов полей"""
 
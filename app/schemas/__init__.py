@@ -13,3 +13,4 @@ from app.schemas.gazification import (
     FieldModel,
     GazificationUploadRequest,
 )
+from app.schemas.system import AcquireStatsModel, PoolStatsModel
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+
+
+class AcquireStatsModel(BaseModel):
+    """Статистика ожидания соединения из пула"""
+
+    count: int
+    avg_ms: float
+    max_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+class PoolStatsModel(BaseModel):
+    """Состояние пула соединений с базой данных"""
+
+    connection: str
+    initialized: bool
+    min_size: int
+    max_size: int
+    size: int
+    in_use: int
+    idle: int
+    waiters: int
+    acquire: AcquireStatsModel
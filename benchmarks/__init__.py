@@ -0,0 +1 @@
+"""Инструменты для замеров производительности сервиса."""
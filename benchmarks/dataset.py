@@ -0,0 +1,384 @@
+"""
+Генератор синтетических данных s_gazifikacia для бенчмарков.
+
+Создает схемы s_gazifikacia и sp_s_subekty (справочник муниципалитетов
+v_all_name_mo создается таблицей) и заполняет их детерминированно по seed:
+
+- муниципалитеты и адреса с особенностями реальных данных: район в district
+  или только в city, пробелы и регистр в названиях, села без улиц (street
+  NULL) и отдельные адреса с улицей "Нет улиц", многоквартирные дома с квартирами;
+- историю t_gazifikacia_data: несколько обходов на адрес, предыдущие обходы
+  помечены deleted, последний обход - анкета (id_type_address=4) или статус
+  (3 - газифицирован, 6 - адрес не существует, 7 - нет дома);
+- вопросы анкеты (t_type_value), типы полей, связи полей и варианты ответов.
+
+ВНИМАНИЕ: схемы удаляются и создаются заново. Используйте только локальную
+базу для замеров.
+
+Пример:
+    python -m benchmarks.dataset --database-url postgres://postgres@localhost/bench --addresses 10000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import asyncpg
+
+SCHEMA_SQL = """
+DROP SCHEMA IF EXISTS s_gazifikacia CASCADE;
+DROP SCHEMA IF EXISTS sp_s_subekty CASCADE;
+CREATE SCHEMA s_gazifikacia;
+CREATE SCHEMA sp_s_subekty;
+
+CREATE TABLE sp_s_subekty.v_all_name_mo (
+    id integer PRIMARY KEY,
+    name varchar(128) NOT NULL,
+    down_parent_id integer,
+    tip integer NOT NULL,
+    id_parent integer,
+    path_id integer[] NOT NULL,
+    level_parent integer NOT NULL
+);
+
+CREATE TABLE s_gazifikacia.t_address_v2 (
+    id serial PRIMARY KEY,
+    id_mo integer,
+    district varchar(128),
+    city varchar(128),
+    street varchar(128),
+    house varchar(64),
+    flat varchar(64),
+    id_parent integer,
+    mkd boolean NOT NULL DEFAULT false,
+    is_mobile boolean NOT NULL DEFAULT false,
+    date_create timestamptz NOT NULL DEFAULT now(),
+    from_login text,
+    deleted boolean NOT NULL DEFAULT false
+);
+
+CREATE TABLE s_gazifikacia.t_type_address (
+    id integer PRIMARY KEY,
+    type_address varchar(128)
+);
+
+CREATE TABLE s_gazifikacia.t_type_value (
+    id integer PRIMARY KEY,
+    "order" integer NOT NULL,
+    type_value varchar(128),
+    for_mobile boolean NOT NULL,
+    description varchar(256) NOT NULL,
+    field_type_id integer
+);
+
+CREATE TABLE s_gazifikacia.t_gazifikacia_data (
+    id serial PRIMARY KEY,
+    id_address integer NOT NULL,
+    id_type_address integer NOT NULL,
+    id_type_value integer,
+    value varchar(256),
+    date_doc date,
+    date date,
+    date_create timestamptz NOT NULL DEFAULT now(),
+    is_mobile boolean NOT NULL DEFAULT false,
+    from_login text,
+    deleted boolean NOT NULL DEFAULT false
+);
+
+CREATE TABLE s_gazifikacia.field_type (
+    field_type_id integer PRIMARY KEY,
+    field_type_name varchar(255) NOT NULL
+);
+
+CREATE TABLE s_gazifikacia.field_reference (
+    field_reference_id serial PRIMARY KEY,
+    field_origin_id integer NOT NULL,
+    field_origin_value varchar(255) NOT NULL,
+    field_ref_id integer NOT NULL
+);
+
+CREATE TABLE s_gazifikacia.field_answers (
+    field_answer_id serial PRIMARY KEY,
+    field_answer_value text NOT NULL,
+    type_value_id integer NOT NULL,
+    field_size text NOT NULL,
+    "order" integer NOT NULL DEFAULT 0
+);
+
+CREATE TABLE s_gazifikacia.users (
+    user_id serial PRIMARY KEY,
+    email varchar(255) NOT NULL,
+    password_hash varchar(255) NOT NULL
+);
+
+CREATE TABLE s_gazifikacia.activity (
+    session_id varchar(255) PRIMARY KEY,
+    email text NOT NULL,
+    activity_count integer NOT NULL DEFAULT 0,
+    date_create timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+TYPE_ADDRESSES = [
+    (1, "Адрес"),
+    (2, "Дом"),
+    (3, "Газифицирован"),
+    (4, "Анкета"),
+    (5, "Квартира"),
+    (6, "Адрес не существует"),
+    (7, "Собственника нет дома"),
+    (8, "Отказ"),
+]
+
+FIELD_TYPES = [(1, "boolean"), (2, "text"), (3, "date"), (4, "select")]
+
+# id, тип поля, вопрос, варианты ответа
+QUESTIONS = [
+    (0, 3, "Дата обхода", []),
+    (1, 1, "Подал заявку на газификацию", []),
+    (2, 1, "Есть документы на домовладение", []),
+    (3, 1, "Есть документы на земельный участок", []),
+    (4, 1, "Есть отдельное жилое помещение", []),
+    (5, 1, "Получает социальную поддержку", []),
+    (6, 1, "Проинформирован о новом устройстве", []),
+    (7, 1, "Проинформирован о новой организации", []),
+    (8, 1, "Планирует подключиться", []),
+    (9, 4, "Причина", ["Дорого", "Нет сетей", "Не нужно", "Другое"]),
+    (10, 1, "Буклет с контактами", []),
+    (11, 4, "Текущий способ отопления", ["Печь", "Электричество", "Уголь", "Дрова"]),
+    (12, 2, "Причина нежелания", []),
+    (13, 4, "Способ отопления", ["Котел", "Печь", "Электрокотел"]),
+]
+
+# Вопрос 9 показывается, если на вопрос 8 ответили "false", 12 - если 1 = "false"
+FIELD_REFERENCES = [(8, "false", 9), (8, "false", 12), (1, "false", 12), (11, "Печь", 13)]
+
+STATUS_WEIGHTS = [(4, 0.7), (3, 0.15), (6, 0.05), (7, 0.1)]
+
+TABLES = [
+    "sp_s_subekty.v_all_name_mo",
+    "s_gazifikacia.t_address_v2",
+    "s_gazifikacia.t_gazifikacia_data",
+    "s_gazifikacia.t_type_value",
+    "s_gazifikacia.field_answers",
+    "s_gazifikacia.field_reference",
+    "s_gazifikacia.activity",
+]
+
+
+def _answer_value(rng: random.Random, question_id: int, field_type: int, options: List[str], day: datetime) -> str:
+    if field_type == 1:
+        return rng.choice(["true", "false"])
+    if field_type == 3:
+        return day.strftime("%Y-%m-%d")
+    if field_type == 4:
+        return rng.choice(options)
+    return rng.choice(["Нет средств", "Арендатор", "Планирует продажу", ""])
+
+
+def _status(rng: random.Random) -> int:
+    point = rng.random()
+    for status, weight in STATUS_WEIGHTS:
+        point -= weight
+        if point <= 0:
+            return status
+    return STATUS_WEIGHTS[0][0]
+
+
+def build_addresses(rng: random.Random, addresses: int, municipalities: int) -> List[tuple]:
+    rows = []
+    base_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    address_id = 0
+    while address_id < addresses:
+        mo_id = 1 + address_id % municipalities
+        locality = rng.randint(1, 12)
+        if rng.random() < 0.3:
+            # Населенный пункт без района: название только в city
+            district, city = None, f"Село {locality}"
+        else:
+            district = f"Район {locality}"
+            if rng.random() < 0.05:
+                district = f" {district.lower()} "
+            city = rng.choice([None, None, district.strip(), f"Поселок {locality}"])
+        if district is None and locality > 10:
+            # Села без улиц: подсказка улиц вернет "Нет улиц"
+            street = None
+        elif rng.random() < 0.01:
+            street = "Нет улиц"
+        else:
+            street = f"Улица {rng.randint(1, 40)}"
+        house = str(rng.randint(1, 120)) + rng.choice(["", "", "", "А", "/2"])
+        mkd = rng.random() < 0.1
+        flats = [str(flat) for flat in range(1, rng.randint(4, 40))] if mkd else [None]
+        for flat in flats:
+            address_id += 1
+            rows.append(
+                (
+                    address_id,
+                    mo_id,
+                    district,
+                    city,
+                    street,
+                    house,
+                    flat,
+                    None,
+                    mkd,
+                    True,
+                    base_date + timedelta(minutes=address_id),
+                    f"user{rng.randint(1, 50)}@example.com",
+                    rng.random() < 0.02,
+                )
+            )
+            if address_id >= addresses:
+                break
+    return rows
+
+
+def build_history(rng: random.Random, address_rows: List[tuple]) -> List[tuple]:
+    rows = []
+    row_id = 0
+    for address in address_rows:
+        address_id, created = address[0], address[10]
+        visits = rng.choices([0, 1, 2, 3, 4], weights=[15, 40, 25, 15, 5])[0]
+        for visit in range(visits):
+            deleted = visit < visits - 1
+            visit_time = created + timedelta(days=visit * 30 + rng.randint(0, 20))
+            login = f"user{rng.randint(1, 50)}@example.com"
+            status = _status(rng)
+            if status == 4:
+                for question_id, field_type, _, options in QUESTIONS:
+                    row_id += 1
+                    rows.append(
+                        (
+                            row_id,
+                            address_id,
+                            4,
+                            question_id,
+                            _answer_value(rng, question_id, field_type, options, visit_time),
+                            visit_time,
+                            True,
+                            login,
+                            deleted,
+                        )
+                    )
+            else:
+                row_id += 1
+                rows.append(
+                    (row_id, address_id, status, None, None, visit_time, True, login, deleted)
+                )
+    return rows
+
+
+async def generate(database_url: str, addresses: int, seed: int = 42) -> Dict[str, Any]:
+    """Пересоздает схемы и заполняет их данными. Возвращает количество строк по таблицам."""
+    rng = random.Random(seed)
+    municipalities = max(3, addresses // 2000)
+    started = time.perf_counter()
+    connection = await asyncpg.connect(database_url)
+    try:
+        await connection.execute(SCHEMA_SQL)
+        await connection.copy_records_to_table(
+            "v_all_name_mo",
+            schema_name="sp_s_subekty",
+            records=[
+                (mo_id, f"Муниципальный округ {mo_id}", mo_id, 2, 0, [0, mo_id], 1)
+                for mo_id in range(1, municipalities + 1)
+            ],
+        )
+        await connection.copy_records_to_table(
+            "t_type_address", schema_name="s_gazifikacia", records=TYPE_ADDRESSES
+        )
+        await connection.copy_records_to_table(
+            "field_type", schema_name="s_gazifikacia", records=FIELD_TYPES
+        )
+        await connection.copy_records_to_table(
+            "t_type_value",
+            schema_name="s_gazifikacia",
+            records=[
+                (question_id, question_id + 1, name, True, name, field_type)
+                for question_id, field_type, name, _ in QUESTIONS
+            ],
+        )
+        await connection.copy_records_to_table(
+            "field_answers",
+            schema_name="s_gazifikacia",
+            columns=["field_answer_value", "type_value_id", "field_size", "order"],
+            records=[
+                (option, question_id, "m", order)
+                for question_id, _, _, options in QUESTIONS
+                for order, option in enumerate(options)
+            ],
+        )
+        await connection.copy_records_to_table(
+            "field_reference",
+            schema_name="s_gazifikacia",
+            columns=["field_origin_id", "field_origin_value", "field_ref_id"],
+            records=FIELD_REFERENCES,
+        )
+        address_rows = build_addresses(rng, addresses, municipalities)
+        await connection.copy_records_to_table(
+            "t_address_v2",
+            schema_name="s_gazifikacia",
+            columns=[
+                "id", "id_mo", "district", "city", "street", "house", "flat",
+                "id_parent", "mkd", "is_mobile", "date_create", "from_login", "deleted",
+            ],
+            records=address_rows,
+        )
+        history_rows = build_history(rng, address_rows)
+        await connection.copy_records_to_table(
+            "t_gazifikacia_data",
+            schema_name="s_gazifikacia",
+            columns=[
+                "id", "id_address", "id_type_address", "id_type_value", "value",
+                "date_create", "is_mobile", "from_login", "deleted",
+            ],
+            records=history_rows,
+        )
+        await connection.copy_records_to_table(
+            "activity",
+            schema_name="s_gazifikacia",
+            records=[
+                (
+                    f"session-{index}",
+                    f"user{index % 50}@example.com",
+                    rng.randint(1, 40),
+                    datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(hours=index),
+                )
+                for index in range(max(10, addresses // 100))
+            ],
+        )
+        for table in ("t_address_v2", "t_gazifikacia_data"):
+            await connection.execute(
+                f"SELECT setval(pg_get_serial_sequence('s_gazifikacia.{table}', 'id'), "
+                f"(SELECT max(id) FROM s_gazifikacia.{table}))"
+            )
+        await connection.execute("ANALYZE")
+        counts = {
+            table: await connection.fetchval(f"SELECT count(*) FROM {table}")
+            for table in TABLES
+        }
+    finally:
+        await connection.close()
+    return {
+        "addresses": addresses,
+        "municipalities": municipalities,
+        "seed": seed,
+        "rows": counts,
+        "generation_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--addresses", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("укажите --database-url или BENCH_DATABASE_URL")
+    print(asyncio.run(generate(args.database_url, args.addresses, args.seed)))
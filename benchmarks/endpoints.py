@@ -0,0 +1,266 @@
+"""
+Замер времени ответа эндпоинтов на синтетических данных разного объема.
+
+Для каждого объема (--scales, число адресов) база заполняется заново через
+benchmarks.dataset, приложение запускается в том же процессе (с lifespan и
+пулом соединений), и каждый сценарий выполняется --repeat раз (выгрузки -
+--export-repeat раз) после одного прогревочного запроса. В отчет попадают
+перцентили задержки, количество SQL-запросов и время в БД по заголовкам
+X-DB-*.
+
+ВНИМАНИЕ: схемы s_gazifikacia и sp_s_subekty в указанной базе пересоздаются.
+
+Пример:
+    python -m benchmarks.endpoints --database-url postgres://postgres@localhost/bench \\
+        --scales 1000,10000,50000 --output bench.json
+    python -m benchmarks.endpoints ... --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+import httpx
+
+from benchmarks import dataset
+
+SAMPLE_ADDRESS_QUERY = """
+    SELECT a.id_mo, COALESCE(a.district, a.city) AS district, a.street, a.house, a.flat
+    FROM s_gazifikacia.t_address_v2 a
+    WHERE a.mkd
+        AND NOT a.deleted
+        AND a.street <> 'Нет улиц'
+        AND COALESCE(a.district, a.city) = trim(COALESCE(a.district, a.city))
+        AND NOT EXISTS (
+            SELECT 1 FROM s_gazifikacia.t_gazifikacia_data g
+            WHERE g.id_address = a.id AND g.id_type_address IN (3, 6, 8) AND NOT g.deleted
+        )
+    ORDER BY a.id
+    LIMIT 1
+"""
+
+
+def build_scenarios(sample: Dict[str, Any]) -> List[Dict[str, Any]]:
+    mo_id = sample["id_mo"]
+    district = sample["district"]
+    street = sample["street"]
+    house = sample["house"]
+    return [
+        {"name": "mo", "method": "GET", "url": "/v1/mo"},
+        {"name": "district", "method": "GET", "url": f"/v1/mo/{mo_id}/district"},
+        {"name": "street", "method": "GET", "url": f"/v1/mo/{mo_id}/district/{district}/street"},
+        {
+            "name": "house",
+            "method": "GET",
+            "url": f"/v1/mo/{mo_id}/district/{district}/street/{street}/house",
+        },
+        {
+            "name": "flat",
+            "method": "GET",
+            "url": f"/v1/mo/{mo_id}/district/{district}/street/{street}/house/{house}/flat",
+        },
+        {"name": "type_values", "method": "GET", "url": "/v1/type-values"},
+        {
+            "name": "export_csv_mo",
+            "method": "GET",
+            "url": "/v1/export-csv",
+            "params": {"mo_id": mo_id},
+            "export": True,
+        },
+        {"name": "export_csv_all", "method": "GET", "url": "/v1/export-csv", "export": True},
+        {
+            "name": "export_excel_mo",
+            "method": "GET",
+            "url": "/v1/export",
+            "params": {"mo_id": mo_id},
+            "export": True,
+        },
+        # Запись идет последней: она добавляет историю по адресу выборки
+        {
+            "name": "upload",
+            "method": "POST",
+            "url": "/v1/upload",
+            "json": {
+                "address": {
+                    "mo_id": mo_id,
+                    "district": district,
+                    "street": street,
+                    "house": house,
+                    "flat": sample["flat"],
+                },
+                "fields": [
+                    {"id": question_id, "value": "true"}
+                    for question_id, _, _, _ in dataset.QUESTIONS
+                ],
+                "from_login": "bench@example.com",
+                "session_id": "bench-session",
+            },
+        },
+    ]
+
+
+def summarize(latencies: List[float], queries: List[int], db_times: List[float], statuses: List[int]) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        index = min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))
+        return round(latencies[index] * 1000, 3)
+
+    return {
+        "requests": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "min_ms": round(latencies[0] * 1000, 3),
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "db_queries": max(queries) if queries else None,
+        "db_time_ms": round(statistics.fmean(db_times), 3) if db_times else None,
+        "errors": sum(1 for status in statuses if status >= 400),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    latencies, queries, db_times, statuses = [], [], [], []
+    for iteration in range(repeat + 1):
+        start_time = time.perf_counter()
+        response = await client.request(
+            scenario["method"],
+            scenario["url"],
+            params=scenario.get("params"),
+            json=scenario.get("json"),
+        )
+        elapsed = time.perf_counter() - start_time
+        if iteration == 0:
+            continue
+        latencies.append(elapsed)
+        statuses.append(response.status_code)
+        if "x-db-query-count" in response.headers:
+            queries.append(int(response.headers["x-db-query-count"]))
+            db_times.append(float(response.headers["x-db-time-ms"]))
+    result = summarize(latencies, queries, db_times, statuses)
+    result["status"] = statuses[-1]
+    return result
+
+
+async def run_scale(app, database_url: str, addresses: int, args: argparse.Namespace) -> Dict[str, Any]:
+    info = await dataset.generate(database_url, addresses, args.seed)
+    connection = await asyncpg.connect(database_url)
+    try:
+        sample = dict(await connection.fetchrow(SAMPLE_ADDRESS_QUERY))
+    finally:
+        await connection.close()
+    info["sample"] = sample
+    info["results"] = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            for scenario in build_scenarios(sample):
+                repeat = args.export_repeat if scenario.get("export") else args.repeat
+                info["results"][scenario["name"]] = await run_scenario(
+                    client, scenario, repeat
+                )
+    return info
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict[str, Any], report: Dict[str, Any]) -> List[str]:
+    """Строки таблицы сравнения p50 и количества запросов с предыдущим отчетом."""
+    lines = [
+        f"{'scale':>8} {'scenario':<16} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'queries':>9}"
+    ]
+    previous = {scale["addresses"]: scale["results"] for scale in baseline["scales"]}
+    for scale in report["scales"]:
+        before_results = previous.get(scale["addresses"], {})
+        for name, after in scale["results"].items():
+            before = before_results.get(name)
+            if before is None:
+                continue
+            change = (after["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            queries = f"{before['db_queries']}->{after['db_queries']}"
+            lines.append(
+                f"{scale['addresses']:>8} {name:<16} {before['p50_ms']:>11.2f} "
+                f"{after['p50_ms']:>10.2f} {change:>+7.1f}% {queries:>9}"
+            )
+    return lines
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "")
+    from app.core.config import settings
+
+    settings.LOG_LEVEL = "ERROR"
+    settings.ENABLE_REQUEST_LOGGING = False
+    settings.ENABLE_TELEGRAM_LOGGING = False
+    settings.DB_DEBUG_HEADERS = True
+    from main import app
+
+    report: Dict[str, Any] = {
+        "benchmark": "endpoints",
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "export_repeat": args.export_repeat,
+        "scales": [],
+    }
+    for addresses in args.scales:
+        report["scales"].append(await run_scale(app, args.database_url, addresses, args))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument(
+        "--scales",
+        type=lambda value: [int(item) for item in value.split(",")],
+        default=[1000, 10000],
+        help="Число адресов через запятую",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--export-repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Путь для JSON-отчета")
+    parser.add_argument("--compare", help="JSON-отчет предыдущего прогона для сравнения")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("укажите --database-url или BENCH_DATABASE_URL")
+    workdir = tempfile.mkdtemp(prefix="rkc_endpoint_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(main(args))
+    finally:
+        os.chdir(cwd)
+    text = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text)
+    print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            print("\n".join(compare(json.load(baseline_file), report)))
@@ -0,0 +1,204 @@
+"""
+Проверка планов горячих запросов: нет ли последовательного сканирования.
+
+Применяет миграции из migrations/models (без записи в историю aerich,
+--skip-migrations - проверить базу как есть) и
+выполняет EXPLAIN для запросов подсказок адресов, записи анкеты и выгрузок с
+параметрами адреса из набора данных. Если в плане есть Seq Scan по
+t_gazifikacia_data или t_address_v2, скрипт печатает план и завершается с
+кодом 1.
+
+С --generate N база предварительно заполняется benchmarks.dataset (схемы
+пересоздаются). На маленьких таблицах планировщик законно выбирает Seq Scan,
+поэтому проверять имеет смысл на объеме от нескольких десятков тысяч адресов.
+
+Пример:
+    python -m benchmarks.explain_check --database-url postgres://postgres@localhost/bench --generate 50000
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import asyncpg
+
+from benchmarks import dataset
+from benchmarks.endpoints import SAMPLE_ADDRESS_QUERY
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "models"
+CHECKED_TABLES = {"t_gazifikacia_data", "t_address_v2"}
+
+CLOSED_ADDRESSES_QUERY = """
+    SELECT "id_address" FROM "s_gazifikacia"."t_gazifikacia_data"
+    WHERE ("id_type_address"=$1 OR "id_type_address"=$2 OR "id_type_address"=$3)
+        AND "deleted"=$4
+"""
+
+# Запросы повторяют SQL, который строят эндпоинты (см. tests/ и X-DB-* заголовки)
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {
+        "name": "hints_closed_addresses",
+        "query": CLOSED_ADDRESSES_QUERY,
+        "params": lambda sample: [3, 6, 8, False],
+    },
+    {
+        "name": "hints_districts",
+        "query": """
+            SELECT DISTINCT "district" FROM "s_gazifikacia"."t_address_v2"
+            WHERE "id_mo"=$1 AND NOT "house" IS NULL AND NOT "district" IS NULL
+                AND NOT "district"=$2 AND "deleted"=$3
+                AND NOT "id" IN (SELECT "id_address" FROM "s_gazifikacia"."t_gazifikacia_data"
+                    WHERE ("id_type_address"=3 OR "id_type_address"=6 OR "id_type_address"=8)
+                        AND "deleted"=false)
+        """,
+        "params": lambda sample: [sample["id_mo"], "", False],
+    },
+    {
+        "name": "hints_houses",
+        "query": """
+            SELECT DISTINCT "house", "district" FROM "s_gazifikacia"."t_address_v2"
+            WHERE "id_mo"=$1 AND "street"=$2 AND NOT "house" IS NULL AND NOT "house"=$3
+                AND NOT "district" IS NULL AND "deleted"=$4
+        """,
+        "params": lambda sample: [sample["id_mo"], sample["street"], "", False],
+    },
+    {
+        "name": "upload_address_lookup",
+        "query": """
+            SELECT "id" FROM "s_gazifikacia"."t_address_v2"
+            WHERE "id_mo"=$1 AND "street"=$2 AND "house"=$3 AND "deleted"=$4
+                AND ("district"=$5 OR "city"=$6) AND "flat"=$7
+            LIMIT $8
+        """,
+        "params": lambda sample: [
+            sample["id_mo"], sample["street"], sample["house"], False,
+            sample["district"], sample["district"], sample["flat"], 1,
+        ],
+    },
+    {
+        "name": "upload_mark_deleted",
+        "query": """
+            UPDATE "s_gazifikacia"."t_gazifikacia_data" SET "deleted"=$1
+            WHERE "id_address"=$2 AND "deleted"=$3
+        """,
+        "params": lambda sample: [True, sample["address_id"], False],
+    },
+    {
+        "name": "export_gazification_by_mo",
+        "query": """
+            WITH latest_gas_records AS (
+                SELECT DISTINCT ON (gd.id_address)
+                    gd.id_address, gd.date_create, a.id_mo,
+                    COALESCE(NULLIF(a.district, ''), NULLIF(a.city, ''), '') AS district,
+                    CASE WHEN a.street = 'Нет улиц' THEN '' ELSE a.street END AS street,
+                    a.house, COALESCE(a.flat, '') AS flat
+                FROM s_gazifikacia.t_gazifikacia_data gd
+                JOIN s_gazifikacia.t_address_v2 a ON gd.id_address = a.id
+                WHERE gd.id_type_address IN (3, 4, 6, 7)
+                    AND gd.is_mobile = true
+                    AND gd.deleted = false
+                    AND a.deleted = false
+                    AND a.house IS NOT NULL
+                    AND a.id_mo = $1
+                    AND LOWER(TRIM(CASE WHEN a.street = 'Нет улиц' THEN '' ELSE COALESCE(a.street, '') END)) = LOWER($2)
+                ORDER BY gd.id_address, gd.date_create DESC
+            ),
+            addresses AS (
+                SELECT DISTINCT ON (id_mo, district, street, house, flat) *
+                FROM latest_gas_records
+                ORDER BY id_mo, district, street, house, flat, date_create DESC
+            )
+            SELECT DISTINCT ON (gd.id_address, gd.id_type_value)
+                gd.id_address, gd.id_type_value, gd.value
+            FROM s_gazifikacia.t_gazifikacia_data gd
+            WHERE gd.id_address IN (SELECT id_address FROM addresses)
+                AND gd.id_type_value IS NOT NULL
+                AND gd.is_mobile = true
+                AND gd.deleted = false
+            ORDER BY gd.id_address, gd.id_type_value, gd.date_create DESC
+        """,
+        "params": lambda sample: [sample["id_mo"], sample["street"]],
+    },
+    {
+        "name": "export_by_district",
+        "query": """
+            SELECT a.id FROM s_gazifikacia.t_address_v2 a
+            WHERE a.deleted = false AND a.house IS NOT NULL
+                AND (LOWER(a.district) = LOWER($1) OR LOWER(a.city) = LOWER($1))
+        """,
+        "params": lambda sample: [sample["district"]],
+    },
+]
+
+
+def load_migrations() -> List[Any]:
+    modules = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.py"), key=lambda item: int(item.name.split("_")[0])):
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules.append(module)
+    return modules
+
+
+def find_seq_scans(plan: Dict[str, Any]) -> List[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in CHECKED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.generate:
+        print(await dataset.generate(args.database_url, args.generate, args.seed))
+    connection = await asyncpg.connect(args.database_url)
+    try:
+        if not args.skip_migrations:
+            for module in load_migrations():
+                await connection.execute(await module.upgrade(None))
+        sample = dict(await connection.fetchrow(SAMPLE_ADDRESS_QUERY))
+        sample["address_id"] = await connection.fetchval(
+            """SELECT id FROM s_gazifikacia.t_address_v2
+            WHERE id_mo = $1 AND street = $2 AND house = $3 ORDER BY id LIMIT 1""",
+            sample["id_mo"], sample["street"], sample["house"],
+        )
+        failed = 0
+        for hot_query in HOT_QUERIES:
+            plan = json.loads(
+                await connection.fetchval(
+                    f"EXPLAIN (FORMAT JSON) {hot_query['query']}",
+                    *hot_query["params"](sample),
+                )
+            )[0]["Plan"]
+            seq_scans = find_seq_scans(plan)
+            status = "SEQ SCAN " + ", ".join(seq_scans) if seq_scans else "ok"
+            print(f"{hot_query['name']:<28} {status:<40} cost={plan['Total Cost']}")
+            if seq_scans:
+                failed += 1
+                if args.verbose:
+                    print(json.dumps(plan, indent=2))
+    finally:
+        await connection.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--generate", type=int, help="Заполнить базу N адресами перед проверкой")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--skip-migrations", action="store_true", help="Проверить базу как есть, без миграций"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Печатать план при ошибке")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("укажите --database-url или BENCH_DATABASE_URL")
+    sys.exit(asyncio.run(main(args)))
@@ -0,0 +1,328 @@
+"""
+Нагрузочный тест: виртуальные пользователи проходят клиентские сценарии.
+
+Сценарии повторяют потоки из postman/ (город: муниципалитет - район - улица -
+дом - квартира; село: населенный пункт без района) на эндпоинтах /v1:
+
+- field_worker: обходчик идет по улице - подсказки адреса, анкета
+  /type-values, затем по нескольким домам квартиры и отправка /upload;
+  в конце обхода добавляет через /add дом, которого нет в базе (номер
+  уникален для пользователя и прохода, поэтому адрес каждый раз новый);
+- gas_status: поиск адреса по подсказкам и /update-gas-status;
+- admin_exports: выгрузки CSV и Excel по муниципалитету и активность.
+
+Каждый пользователь выбирает сценарий случайно с учетом веса, значения для
+следующего шага берутся из ответа предыдущего. В отчет попадают пропускная
+способность и по каждому шагу p50/p95/p99 и доля ошибок.
+
+Цель - запущенный сервис (--base-url) или приложение в этом же процессе
+(--database-url, с --generate N база предварительно заполняется
+benchmarks.dataset, схемы пересоздаются).
+
+Пример:
+    python -m benchmarks.load --base-url http://localhost:8000 --users 20 --duration 60
+    python -m benchmarks.load --database-url postgres://postgres@localhost/bench --generate 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+from urllib.parse import quote
+
+import httpx
+
+from benchmarks import dataset
+
+SCENARIO_WEIGHTS = {"field_worker": 8, "gas_status": 3, "admin_exports": 1}
+
+
+class StepFailed(Exception):
+    """Шаг вернул ошибку или пустой список, сценарий дальше продолжить нельзя."""
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.scenarios: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"completed": 0, "failed": 0, "failed_at": defaultdict(int)}
+        )
+
+    def record(self, step: str, seconds: float, status: str) -> None:
+        self.latencies[step].append(seconds)
+        self.statuses[step][status] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        steps = {}
+        total = 0
+        for step, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            total += len(latencies)
+            errors = sum(
+                count
+                for status, count in self.statuses[step].items()
+                if not status.isdigit() or int(status) >= 400
+            )
+
+            def percentile(fraction: float) -> float:
+                index = min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))
+                return round(latencies[index] * 1000, 2)
+
+            steps[step] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+                "p50_ms": percentile(0.5),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": dict(self.statuses[step]),
+            }
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+            "scenarios": dict(self.scenarios),
+            "steps": steps,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, rng: random.Random, args: argparse.Namespace):
+        self.client = client
+        self.stats = stats
+        self.rng = rng
+        self.think_time = args.think_ms / 1000
+        self.read_only = args.read_only
+        self.login = f"load{rng.randint(1, 10**6)}@example.com"
+        self.session_id = f"load-{rng.randint(1, 10**9)}"
+        self.added_houses = 0
+
+    async def request(self, step: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start_time = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            if method == "GET":
+                await response.aread()
+        except httpx.HTTPError as e:
+            self.stats.record(step, time.perf_counter() - start_time, type(e).__name__)
+            raise StepFailed(step) from e
+        self.stats.record(step, time.perf_counter() - start_time, str(response.status_code))
+        if self.think_time:
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * self.think_time)
+        if response.status_code >= 400:
+            raise StepFailed(step)
+        return response
+
+    async def pick(self, step: str, url: str, key: str) -> str:
+        data = (await self.request(step, "GET", url)).json()["data"][key]
+        if not data:
+            raise StepFailed(step)
+        return self.rng.choice(data)
+
+    async def walk_to_street(self) -> Dict[str, Any]:
+        mo = await self.pick("mo", "/v1/mo", "mos")
+        mo_id = mo["id"]
+        district = await self.pick("district", f"/v1/mo/{mo_id}/district", "districts")
+        street = await self.pick(
+            "street", f"/v1/mo/{mo_id}/district/{quote(district, safe='')}/street", "streets"
+        )
+        return {"mo_id": mo_id, "district": district, "street": street}
+
+    def street_url(self, address: Dict[str, Any]) -> str:
+        return (
+            f"/v1/mo/{address['mo_id']}/district/{quote(address['district'], safe='')}"
+            f"/street/{quote(address['street'], safe='')}"
+        )
+
+    async def houses(self, address: Dict[str, Any]) -> List[str]:
+        response = await self.request("house", "GET", f"{self.street_url(address)}/house")
+        # Номера домов со слешем не проходят как сегмент пути
+        houses = [house for house in response.json()["data"]["houses"] if "/" not in house]
+        if not houses:
+            raise StepFailed("house")
+        return houses
+
+    async def flats(self, address: Dict[str, Any], house: str) -> List[str]:
+        url = f"{self.street_url(address)}/house/{quote(house, safe='')}/flat"
+        return (await self.request("flat", "GET", url)).json()["data"]["flats"]
+
+    async def field_worker(self) -> None:
+        await self.request("type_values", "GET", "/v1/type-values")
+        address = await self.walk_to_street()
+        houses = await self.houses(address)
+        for house in self.rng.sample(houses, min(len(houses), 5)):
+            flats = await self.flats(address, house)
+            if self.read_only:
+                continue
+            await self.request(
+                "upload",
+                "POST",
+                "/v1/upload",
+                json={
+                    "address": {
+                        **address,
+                        "house": house,
+                        "flat": self.rng.choice(flats) if flats else None,
+                    },
+                    "fields": [
+                        {"id": question_id, "value": self.rng.choice(["true", "false"])}
+                        for question_id, _, _, _ in dataset.QUESTIONS
+                    ],
+                    "from_login": self.login,
+                    "session_id": self.session_id,
+                },
+            )
+        if not self.read_only:
+            await self.add_address(address)
+
+    async def add_address(self, address: Dict[str, Any]) -> None:
+        self.added_houses += 1
+        await self.request(
+            "add_address",
+            "POST",
+            "/v1/add",
+            json={
+                **address,
+                "house": f"{self.session_id}-{self.added_houses}",
+                "has_gas": self.rng.choice([True, False]),
+                "from_login": self.login,
+                "session_id": self.session_id,
+            },
+        )
+
+    async def gas_status(self) -> None:
+        address = await self.walk_to_street()
+        house = self.rng.choice(await self.houses(address))
+        flats = await self.flats(address, house)
+        if self.read_only:
+            return
+        await self.request(
+            "update_gas_status",
+            "POST",
+            "/v1/update-gas-status",
+            json={
+                **address,
+                "house": house,
+                "flat": self.rng.choice(flats) if flats else None,
+                "has_gas": self.rng.choice(["true", "false", "not_at_home", "not_exist"]),
+                "from_login": self.login,
+                "session_id": self.session_id,
+            },
+        )
+
+    async def admin_exports(self) -> None:
+        mo = await self.pick("mo", "/v1/mo", "mos")
+        await self.request("export_csv", "GET", "/v1/export-csv", params={"mo_id": mo["id"]})
+        await self.request(
+            "export_excel", "GET", "/v1/export", params={"mo_id": mo["id"], "client_source": "load"}
+        )
+        await self.request("export_activity", "GET", "/v1/export-activity")
+
+    async def run(self, deadline: float) -> None:
+        names = list(SCENARIO_WEIGHTS)
+        weights = list(SCENARIO_WEIGHTS.values())
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(names, weights=weights)[0]
+            try:
+                await getattr(self, scenario)()
+            except StepFailed as e:
+                self.stats.scenarios[scenario]["failed"] += 1
+                self.stats.scenarios[scenario]["failed_at"][e.args[0]] += 1
+            else:
+                self.stats.scenarios[scenario]["completed"] += 1
+
+
+async def run_load(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, Any]:
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    async def start_user(index: int) -> None:
+        # Пользователи подключаются равномерно в течение --ramp-up секунд
+        await asyncio.sleep(args.ramp_up * index / args.users)
+        user = VirtualUser(client, stats, random.Random(args.seed + index), args)
+        await user.run(deadline)
+
+    await asyncio.gather(*(start_user(index) for index in range(args.users)))
+    report = stats.report(time.perf_counter() - started)
+    report.update({"users": args.users, "read_only": args.read_only, "think_ms": args.think_ms})
+    return report
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+            return await run_load(client, args)
+    report_extra = {}
+    if args.generate:
+        report_extra["dataset"] = await dataset.generate(args.database_url, args.generate, args.seed)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "")
+    os.environ.setdefault("TELEGRAM_CHAT_ID", "")
+    from app.core.config import settings
+
+    settings.LOG_LEVEL = "ERROR"
+    settings.ENABLE_REQUEST_LOGGING = False
+    settings.ENABLE_TELEGRAM_LOGGING = False
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://load", timeout=args.timeout
+        ) as client:
+            report = await run_load(client, args)
+    report.update(report_extra)
+    return report
+
+
+def format_table(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{'step':<18} {'requests':>8} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    ]
+    for step, result in report["steps"].items():
+        lines.append(
+            f"{step:<18} {result['requests']:>8} {result['throughput_rps']:>8.2f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['error_rate']:>6.1%}"
+        )
+    lines.append(f"total: {report['requests']} requests, {report['throughput_rps']} rps")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", help="Адрес запущенного сервиса")
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--generate", type=int, help="Заполнить базу N адресами перед запуском")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Секунды нагрузки")
+    parser.add_argument("--ramp-up", type=float, default=5.0)
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Пауза между шагами")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--read-only", action="store_true", help="Без /upload, /add и /update-gas-status")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Путь для JSON-отчета")
+    args = parser.parse_args()
+    if not args.base_url and not args.database_url:
+        parser.error("укажите --base-url или --database-url (BENCH_DATABASE_URL)")
+    cwd = os.getcwd()
+    if not args.base_url:
+        os.chdir(tempfile.mkdtemp(prefix="rkc_load_"))
+    try:
+        report = asyncio.run(main(args))
+    finally:
+        os.chdir(cwd)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(json.dumps(report, ensure_ascii=False, indent=2, default=str))
+    print(format_table(report))
@@ -0,0 +1,146 @@
+"""
+Замер накладных расходов логирования запросов.
+
+Запускает минимальное приложение с теми же middleware, что и основное, и
+прогоняет через него запросы в трех режимах:
+
+- off: ENABLE_REQUEST_LOGGING=false
+- sync: обработчики файлов вызываются в потоке event loop
+- queue: записи уходят в очередь и пишутся фоновым потоком
+
+Флаг --slow-io-ms добавляет задержку к каждому сбросу буфера обработчика,
+имитируя медленный диск или переполненный journald.
+
+Пример:
+    python -m benchmarks.logging_overhead --requests 2000 --concurrency 20 --slow-io-ms 1
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.core.config import settings
+from app.core.logging import get_dropped_log_records, setup_logging, stop_logging
+from app.core.middleware import setup_middlewares
+
+MODES = ("off", "sync", "queue")
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    setup_middlewares(app)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"ok": True, "data": await request.json()}
+
+    return app
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        index = min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))
+        return round(latencies[index] * 1000, 3)
+
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+async def run_mode(mode: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    settings.ENABLE_REQUEST_LOGGING = mode != "off"
+    setup_logging("INFO", use_queue=mode == "queue")
+    app = build_app()
+    payload = {
+        "address": {"mo_id": 1, "district": "Район", "street": "Улица", "house": "1"},
+        "fields": [{"id": i, "value": "true"} for i in range(14)],
+    }
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(index: int) -> None:
+            async with semaphore:
+                start_time = time.perf_counter()
+                if index % 2:
+                    response = await client.post("/echo", json=payload)
+                else:
+                    response = await client.get("/ping", params={"mo_id": index})
+                latencies.append(time.perf_counter() - start_time)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+    result = summarize(latencies, elapsed)
+    result["dropped_log_records"] = get_dropped_log_records()
+    stop_logging()
+    return result
+
+
+def slow_down_handlers(delay_ms: float) -> None:
+    original_flush = logging.StreamHandler.flush
+
+    def flush(self):
+        time.sleep(delay_ms / 1000)
+        original_flush(self)
+
+    logging.StreamHandler.flush = flush
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.slow_io_ms:
+        slow_down_handlers(args.slow_io_ms)
+    report: Dict[str, Any] = {
+        "benchmark": "logging_overhead",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "slow_io_ms": args.slow_io_ms,
+        "modes": {},
+    }
+    for mode in MODES:
+        report["modes"][mode] = await run_mode(mode, args.requests, args.concurrency)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--slow-io-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="Путь для JSON-отчета")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp(prefix="rkc_log_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(main(args))
+    finally:
+        os.chdir(cwd)
+    report["log_dir"] = workdir
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text)
+    print(text)
@@ -0,0 +1,101 @@
+"""
+Отчет о времени импорта при запуске воркера.
+
+Запускает `python -X importtime -c "import main"` в отдельном процессе
+(каждый прогон - с холодным состоянием интерпретатора, но с прогретым кэшем
+байткода), печатает медиану общего времени импорта, самые долгие модули по
+суммарному времени и проверяет, что тяжелые зависимости выгрузок и
+Telegram-логов (LAZY_MODULES) не загружаются при запуске. Если хотя бы одна
+загружена, скрипт завершается с кодом 1.
+
+Переменные окружения для Settings берутся из окружения; недостающие
+DATABASE_URL и TELEGRAM_* подставляются заглушками - подключение к базе при
+импорте не выполняется.
+
+Пример:
+    python -m benchmarks.startup_trace --runs 5 --top 25
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+LAZY_MODULES = ("pandas", "numpy", "xlsxwriter", "telegram", "httpx")
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+PROBE = (
+    "import json, sys, {module}; "
+    "print(json.dumps(sorted(name for name in {lazy} if name in sys.modules)))"
+)
+
+
+def run_import_trace(module: str = "main") -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Один прогон: записи importtime и список загруженных LAZY_MODULES."""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "postgres://postgres@localhost:5432/startup_trace")
+    env.setdefault("TELEGRAM_BOT_TOKEN", "")
+    env.setdefault("TELEGRAM_CHAT_ID", "")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_DIR), env.get("PYTHONPATH")]))
+    probe = PROBE.format(module=module, lazy=repr(LAZY_MODULES))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", probe],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            entries.append(
+                {
+                    "module": match.group(4),
+                    "self_us": int(match.group(1)),
+                    "cumulative_us": int(match.group(2)),
+                    "depth": (len(match.group(3)) - 1) // 2,
+                }
+            )
+    return entries, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(args: argparse.Namespace) -> int:
+    totals = []
+    entries: List[Dict[str, Any]] = []
+    loaded: List[str] = []
+    for _ in range(args.runs):
+        entries, loaded = run_import_trace(args.module)
+        totals.append(sum(entry["self_us"] for entry in entries) / 1000)
+    top = sorted(
+        (entry for entry in entries if entry["module"] != args.module),
+        key=lambda entry: entry["cumulative_us"],
+        reverse=True,
+    )[: args.top]
+    if args.json:
+        print(json.dumps({"total_ms": statistics.median(totals), "top": top, "lazy_loaded": loaded}))
+    else:
+        print(f"import {args.module}: медиана {statistics.median(totals):.1f} ms, прогонов {args.runs}")
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for entry in top:
+            print(
+                f"{entry['cumulative_us'] / 1000:>14.1f} {entry['self_us'] / 1000:>9.1f}  "
+                f"{'  ' * entry['depth']}{entry['module']}"
+            )
+        print("тяжелые модули при запуске:", ", ".join(loaded) if loaded else "нет")
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="main", help="Импортируемый модуль")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20, help="Сколько модулей показать")
+    parser.add_argument("--json", action="store_true", help="Вывод в JSON")
+    sys.exit(main(parser.parse_args()))
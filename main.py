@@ -1,15 +1,39 @@
+import asyncio
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from tortoise.contrib.fastapi import register_tortoise
 from app.core.config import TORTOISE_ORM, settings
+from app.core.exceptions import StatementTimeoutError
 from app.api.v1 import api_v1_router
+from app.api.system import router as system_router
 from app.core.utils import (
     general_exception_handler,
     http_exception_handler,
+    statement_timeout_handler,
     validation_exception_handler,
 )
-from app.core.logging import setup_logging, get_logger, categorize_log, LogCategory
+from app.core.logging import (
+    setup_logging,
+    stop_logging,
+    close_telegram_logging,
+    get_logger,
+    categorize_log,
+    LogCategory,
+)
+from app.core.archive import run_archiver
+from app.core.artifacts import close_artifacts, run_artifact_sweeper
+from app.core.cache import close_caches
+from app.core.invalidation import run_invalidation_listener
+from app.core.metrics import monitor_event_loop_lag
 from app.core.middleware import setup_middlewares
+from app.core.shutdown import (
+    ShutdownReport,
+    cancel_tasks,
+    close_database,
+    drain_exports,
+    install_signal_hooks,
+)
+from app.core.warmup import run_warmup, skip_warmup
 
 logger = None
 
@@ -19,8 +43,42 @@ async def lifespan(app: FastAPI):
     setup_logging(settings.LOG_LEVEL)
     logger = get_logger("main")
     logger.info(categorize_log("Starting up application", LogCategory.INIT))
+    restore_signal_handlers = install_signal_hooks()
+    loop_lag_task = asyncio.create_task(
+        monitor_event_loop_lag(settings.EVENT_LOOP_LAG_INTERVAL)
+    )
+    archive_task = asyncio.create_task(run_archiver()) if settings.ARCHIVE_ENABLED else None
+    sweeper_task = asyncio.create_task(run_artifact_sweeper())
+    invalidation_task = (
+        asyncio.create_task(run_invalidation_listener())
+        if settings.INVALIDATION_ENABLED
+        else None
+    )
+    warmup_task = None
+    if settings.WARMUP_ENABLED:
+        warmup_task = asyncio.create_task(run_warmup())
+        if settings.WARMUP_WAIT:
+            await warmup_task
+    else:
+        skip_warmup()
     yield
     logger.info(categorize_log("Shutting down application", LogCategory.INIT))
+    report = ShutdownReport()
+    await report.phase("exports", drain_exports())
+    await report.phase(
+        "background_tasks",
+        cancel_tasks([loop_lag_task, warmup_task, archive_task, sweeper_task, invalidation_task]),
+    )
+    await report.phase("export_files", asyncio.to_thread(close_artifacts))
+    await report.phase("caches", close_caches(settings.SHUTDOWN_FLUSH_TIMEOUT))
+    await report.phase("telegram", close_telegram_logging(settings.SHUTDOWN_FLUSH_TIMEOUT))
+    await report.phase("database", close_database(settings.SHUTDOWN_DB_TIMEOUT))
+    restore_signal_handlers()
+    logger.info(
+        categorize_log(f"Shutdown finished in {report.format()}", LogCategory.INIT),
+        extra={"shutdown": report.summary()},
+    )
+    stop_logging()
 
 
 app = FastAPI(
@@ -34,7 +92,9 @@ app = FastAPI(
 )
 setup_middlewares(app)
 app.include_router(api_v1_router, prefix="/v1")
+app.include_router(system_router, tags=["system"])
 app.add_exception_handler(HTTPException, http_exception_handler)
+app.add_exception_handler(StatementTimeoutError, statement_timeout_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 register_tortoise(
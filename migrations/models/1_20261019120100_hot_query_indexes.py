@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+from tortoise import BaseDBAsyncClient
+
+# Частичные индексы повторяют условия горячих запросов: подсказки адресов
+# исключают адреса с актуальным статусом 3/6/8, выгрузки читают только
+# неудаленные записи, последние ответы берутся через DISTINCT ON.
+# Индексы на t_address_v2 покрывают поиск адреса при записи и фильтры
+# выгрузок по LOWER(district)/LOWER(city).
+INDEXES = [
+    (
+        "ix_gazifikacia_data_address_date_active",
+        "t_gazifikacia_data",
+        '("id_address", "date_create" DESC)\n    WHERE NOT "deleted"',
+    ),
+    (
+        "ix_gazifikacia_data_closed_addresses",
+        "t_gazifikacia_data",
+        """("id_type_address", "id_address")
+    WHERE NOT "deleted" AND "id_type_address" IN (3, 6, 8)""",
+    ),
+    (
+        "ix_gazifikacia_data_latest_answers",
+        "t_gazifikacia_data",
+        """("id_address", "id_type_value", "date_create" DESC)
+    INCLUDE ("value")
+    WHERE NOT "deleted" AND "is_mobile" AND "id_type_value" IS NOT NULL""",
+    ),
+    (
+        "ix_address_v2_mo_street_house_active",
+        "t_address_v2",
+        """("id_mo", "street", "house")
+    WHERE NOT "deleted" AND "house" IS NOT NULL""",
+    ),
+    (
+        "ix_address_v2_lower_district_active",
+        "t_address_v2",
+        """(LOWER("district"))
+    WHERE NOT "deleted" AND "house" IS NOT NULL""",
+    ),
+    (
+        "ix_address_v2_lower_city_active",
+        "t_address_v2",
+        """(LOWER("city"))
+    WHERE NOT "deleted" AND "house" IS NOT NULL""",
+    ),
+]
+
+
+def create_index(name: str, table: str, definition: str, concurrently: bool = False) -> str:
+    mode = " CONCURRENTLY" if concurrently else ""
+    return (
+        f'CREATE INDEX{mode} IF NOT EXISTS "{name}"\n'
+        f'    ON "s_gazifikacia"."{table}" {definition};'
+    )
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # aerich выполняет миграцию в транзакции, поэтому здесь индексы строятся
+    # без CONCURRENTLY и на время построения блокируют запись в
+    # t_gazifikacia_data и t_address_v2. На рабочей базе перед
+    # `aerich upgrade` запустите этот файл как скрипт (см. build_concurrently):
+    # он построит те же индексы без блокировки записи, и миграция
+    # из-за IF NOT EXISTS выполнит только ANALYZE.
+    statements = [create_index(*index) for index in INDEXES]
+    statements.append('ANALYZE "s_gazifikacia"."t_gazifikacia_data";')
+    statements.append('ANALYZE "s_gazifikacia"."t_address_v2";')
+    return "\n        " + "\n".join(statements)
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return "\n        " + "\n".join(
+        f'DROP INDEX IF EXISTS "s_gazifikacia"."{name}";' for name, _, _ in INDEXES
+    )
+
+
+async def build_concurrently(db_url: str) -> None:
+    """
+    Строит индексы миграции через CREATE INDEX CONCURRENTLY, не блокируя запись.
+
+    Каждая команда выполняется отдельно и вне транзакции. Прерванное
+    построение оставляет невалидный индекс, который IF NOT EXISTS пропустил
+    бы, поэтому такой индекс сначала удаляется.
+    """
+    import asyncpg
+
+    connection = await asyncpg.connect(db_url)
+    try:
+        for name, table, definition in INDEXES:
+            valid = await connection.fetchval(
+                """SELECT i.indisvalid FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 's_gazifikacia' AND c.relname = $1""",
+                name,
+            )
+            if valid is False:
+                print(f"{name}: удаляется невалидный индекс")
+                await connection.execute(
+                    f'DROP INDEX CONCURRENTLY IF EXISTS "s_gazifikacia"."{name}"'
+                )
+            elif valid:
+                print(f"{name}: уже есть")
+                continue
+            print(f"{name}: построение")
+            await connection.execute(create_index(name, table, definition, concurrently=True))
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    # python migrations/models/1_20261019120100_hot_query_indexes.py [DATABASE_URL]
+    asyncio.run(build_concurrently(sys.argv[1] if len(sys.argv) > 1 else os.environ["DATABASE_URL"]))
@@ -0,0 +1,47 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # Архив удаленной истории секционирован по месяцам date_create; секции
+    # создает фоновая задача app.core.archive перед переносом пачки.
+    # v_gazifikacia_data_history объединяет рабочую таблицу и архив.
+    return """
+        CREATE TABLE IF NOT EXISTS "s_gazifikacia"."t_gazifikacia_data_archive" (
+    "id" INT NOT NULL,
+    "id_address" INT NOT NULL,
+    "id_type_address" INT NOT NULL,
+    "id_type_value" INT,
+    "value" VARCHAR(256),
+    "date_doc" DATE,
+    "date" DATE,
+    "date_create" TIMESTAMPTZ NOT NULL,
+    "is_mobile" BOOL NOT NULL DEFAULT False,
+    "from_login" TEXT,
+    "deleted" BOOL NOT NULL DEFAULT True,
+    "archived_at" TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY ("id", "date_create")
+) PARTITION BY RANGE ("date_create");
+CREATE INDEX IF NOT EXISTS "ix_gazifikacia_data_archive_address_date"
+    ON "s_gazifikacia"."t_gazifikacia_data_archive" ("id_address", "date_create" DESC);
+CREATE OR REPLACE VIEW "s_gazifikacia"."v_gazifikacia_data_history" AS
+    SELECT "id", "id_address", "id_type_address", "id_type_value", "value", "date_doc",
+        "date", "date_create", "is_mobile", "from_login", "deleted", False AS "archived"
+    FROM "s_gazifikacia"."t_gazifikacia_data"
+    UNION ALL
+    SELECT "id", "id_address", "id_type_address", "id_type_value", "value", "date_doc",
+        "date", "date_create", "is_mobile", "from_login", "deleted", True AS "archived"
+    FROM "s_gazifikacia"."t_gazifikacia_data_archive";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    # Перенесенные строки возвращаются в рабочую таблицу, чтобы откат не терял историю
+    return """
+        DROP VIEW IF EXISTS "s_gazifikacia"."v_gazifikacia_data_history";
+INSERT INTO "s_gazifikacia"."t_gazifikacia_data" (
+    "id", "id_address", "id_type_address", "id_type_value", "value", "date_doc",
+    "date", "date_create", "is_mobile", "from_login", "deleted"
+)
+SELECT "id", "id_address", "id_type_address", "id_type_value", "value", "date_doc",
+    "date", "date_create", "is_mobile", "from_login", "deleted"
+FROM "s_gazifikacia"."t_gazifikacia_data_archive";
+DROP TABLE IF EXISTS "s_gazifikacia"."t_gazifikacia_data_archive";"""
@@ -0,0 +1,34 @@
+from tortoise import BaseDBAsyncClient
+
+QUESTIONNAIRE_TABLES = ("t_type_value", "t_type_address", "field_type", "field_reference", "field_answers")
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # Анкету правят напрямую в БД, минуя API: триггеры уровня оператора
+    # отправляют событие в канал app.core.invalidation.CHANNEL, и каждый
+    # воркер сбрасывает кэш справочников анкеты.
+    triggers = "\n".join(
+        f"""DROP TRIGGER IF EXISTS "trg_{table}_notify" ON "s_gazifikacia"."{table}";
+CREATE TRIGGER "trg_{table}_notify"
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "s_gazifikacia"."{table}"
+    FOR EACH STATEMENT EXECUTE FUNCTION "s_gazifikacia"."notify_questionnaire_change"();"""
+        for table in QUESTIONNAIRE_TABLES
+    )
+    return f"""
+        CREATE OR REPLACE FUNCTION "s_gazifikacia"."notify_questionnaire_change"() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('rkc_invalidation', json_build_object('topic', 'questionnaire', 'table', TG_TABLE_NAME)::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+{triggers}"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    triggers = "\n".join(
+        f'DROP TRIGGER IF EXISTS "trg_{table}_notify" ON "s_gazifikacia"."{table}";'
+        for table in QUESTIONNAIRE_TABLES
+    )
+    return f"""
+        {triggers}
+DROP FUNCTION IF EXISTS "s_gazifikacia"."notify_questionnaire_change"();"""
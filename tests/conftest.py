@@ -0,0 +1,126 @@
+"""
+Фикстуры тестов бюджетов производительности.
+
+Тесты выполняются на отдельной локальной базе из TEST_DATABASE_URL (или
+BENCH_DATABASE_URL): схемы пересоздаются, заполняются benchmarks.dataset, и к
+ним применяются миграции из migrations/models.
+Если база не задана или недоступна, тесты пропускаются.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import asyncpg
+import httpx
+import pytest
+
+from benchmarks import dataset
+from benchmarks.endpoints import SAMPLE_ADDRESS_QUERY, build_scenarios
+from benchmarks.explain_check import load_migrations
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL") or os.environ.get("BENCH_DATABASE_URL")
+DATASET_ADDRESSES = 2000
+DATASET_SEED = 42
+
+# Settings читаются при импорте app; без тестовой базы приложение не
+# запускается, а модульным тестам нужен только сам объект настроек
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("DATABASE_URL", "postgres://postgres@localhost:5432/test")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "")
+
+
+class AppClient:
+    """Выполняет запросы к приложению в этом процессе и возвращает учет SQL-запросов."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient, sample: Dict[str, Any]):
+        self.loop = loop
+        self.client = client
+        self.sample = sample
+        self.scenarios = {scenario["name"]: scenario for scenario in build_scenarios(sample)}
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def request(self, method: str, url: str, **kwargs):
+        return self.loop.run_until_complete(self._request(method, url, **kwargs))
+
+    def scenario(self, name: str, **overrides):
+        scenario = {**self.scenarios[name], **overrides}
+        return self.request(
+            scenario["method"],
+            scenario["url"],
+            params=scenario.get("params"),
+            json=scenario.get("json"),
+        )
+
+    async def _request(self, method: str, url: str, **kwargs) -> Tuple[httpx.Response, Any, float]:
+        from app.core.db import get_query_stats
+
+        start_time = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start_time
+        # ASGITransport вызывает приложение в этой же задаче, поэтому учет
+        # запросов, начатый middleware, виден здесь после ответа
+        return response, get_query_stats(), elapsed
+
+
+def format_statements(statements: List[Tuple[str, float]]) -> str:
+    return "\n".join(
+        f"{index:>3}. {seconds * 1000:8.2f} ms  {' '.join(query.split())[:300]}"
+        for index, (query, seconds) in enumerate(statements, start=1)
+    )
+
+
+async def _database_available() -> bool:
+    try:
+        connection = await asyncpg.connect(TEST_DATABASE_URL, timeout=3)
+    except (OSError, asyncpg.PostgresError, asyncio.TimeoutError):
+        return False
+    await connection.close()
+    return True
+
+
+async def _prepare_dataset() -> Dict[str, Any]:
+    await dataset.generate(TEST_DATABASE_URL, DATASET_ADDRESSES, DATASET_SEED)
+    connection = await asyncpg.connect(TEST_DATABASE_URL)
+    try:
+        for module in load_migrations():
+            await connection.execute(await module.upgrade(None))
+        return dict(await connection.fetchrow(SAMPLE_ADDRESS_QUERY))
+    finally:
+        await connection.close()
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL не задан")
+    loop = asyncio.new_event_loop()
+    if not loop.run_until_complete(_database_available()):
+        loop.close()
+        pytest.skip("тестовая база недоступна")
+    from app.core.config import settings
+
+    settings.LOG_LEVEL = "ERROR"
+    settings.ENABLE_REQUEST_LOGGING = False
+    settings.ENABLE_TELEGRAM_LOGGING = False
+    # Бюджеты проверяют запросы к БД, а не попадания в кэш
+    settings.CACHE_ENABLED = False
+    from main import app
+
+    sample = loop.run_until_complete(_prepare_dataset())
+    lifespan = app.router.lifespan_context(app)
+    loop.run_until_complete(lifespan.__aenter__())
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None
+    )
+    try:
+        yield AppClient(loop, client, sample)
+    finally:
+        loop.run_until_complete(client.aclose())
+        loop.run_until_complete(lifespan.__aexit__(None, None, None))
+        loop.close()
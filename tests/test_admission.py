@@ -0,0 +1,78 @@
+"""Ограничение одновременных запросов по классам маршрутов."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import admission
+from app.core.admission import AdmissionControlMiddleware, AdmissionRejected, RouteClassLimiter
+
+
+def test_limiter_hands_slots_to_waiters_in_order():
+    async def scenario():
+        limiter = RouteClassLimiter("test", concurrency=1, queue_size=5, queue_timeout=1)
+        order = []
+
+        async def worker(name):
+            await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0.01)
+            limiter.release(0.01)
+
+        await asyncio.gather(*(worker(name) for name in "abcd"))
+        return order, limiter.active, len(limiter.waiters)
+
+    assert asyncio.run(scenario()) == (list("abcd"), 0, 0)
+
+
+def test_limiter_rejects_full_queue_and_queue_timeout():
+    async def scenario():
+        limiter = RouteClassLimiter("test", concurrency=1, queue_size=1, queue_timeout=0.05)
+        await limiter.acquire()
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as timeout:
+            await queued
+        limiter.release(0.5)
+        return full.value, timeout.value, limiter.active
+
+    full, timeout, active = asyncio.run(scenario())
+    assert (full.status_code, full.reason) == (429, admission.QUEUE_FULL)
+    assert (timeout.status_code, timeout.reason) == (503, admission.QUEUE_TIMEOUT)
+    assert full.retry_after >= 1
+    assert active == 0
+
+
+def test_exports_are_limited_without_blocking_hints(monkeypatch):
+    monkeypatch.setattr(admission.settings, "ADMISSION_CONTROL_ENABLED", True)
+    monkeypatch.setattr(admission.settings, "ADMISSION_EXPORTS_CONCURRENCY", 1)
+    monkeypatch.setattr(admission.settings, "ADMISSION_EXPORTS_QUEUE", 0)
+    monkeypatch.setattr(admission, "_limiters", {})
+
+    async def scenario():
+        release_export = asyncio.Event()
+
+        async def endpoint(scope, receive, send):
+            if scope["path"].startswith("/v1/export"):
+                await release_export.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        transport = httpx.ASGITransport(app=AdmissionControlMiddleware(endpoint))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            running_export = asyncio.ensure_future(client.get("/v1/export"))
+            await asyncio.sleep(0.01)
+            rejected = await client.get("/v1/export-csv")
+            hint = await client.get("/v1/mo")
+            release_export.set()
+            return (await running_export), rejected, hint
+
+    running_export, rejected, hint = asyncio.run(scenario())
+    assert running_export.status_code == 200
+    assert hint.status_code == 200
+    assert rejected.status_code == 429
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert rejected.json()["ok"] is False
@@ -0,0 +1,74 @@
+"""Перенос удаленной истории в архив: рабочая таблица очищается, полная история сохраняется."""
+
+import asyncio
+
+from tortoise import Tortoise
+
+COUNTS_QUERY = """
+    SELECT
+        (SELECT count(*) FROM s_gazifikacia.t_gazifikacia_data) AS live,
+        (SELECT count(*) FROM s_gazifikacia.t_gazifikacia_data WHERE deleted) AS live_deleted,
+        (SELECT count(*) FROM s_gazifikacia.t_gazifikacia_data_archive) AS archived,
+        (SELECT count(*) FROM s_gazifikacia.v_gazifikacia_data_history) AS history
+"""
+
+
+def fetch_counts(app_client):
+    connection = Tortoise.get_connection("default")
+    return app_client.run(connection.execute_query_dict(COUNTS_QUERY))[0]
+
+
+def test_archive_moves_deleted_rows(app_client, monkeypatch):
+    # Приложение импортируется после того, как фикстура задала DATABASE_URL
+    from app.core import archive
+
+    monkeypatch.setattr(archive.settings, "ARCHIVE_BATCH_SIZE", 500)
+    monkeypatch.setattr(archive.settings, "ARCHIVE_BATCH_PAUSE", 0)
+    monkeypatch.setattr(archive.settings, "ARCHIVE_MIN_AGE_DAYS", 0)
+    before = fetch_counts(app_client)
+    assert before["live_deleted"] > 500
+
+    moved = app_client.run(archive.archive_deleted_history())
+
+    after = fetch_counts(app_client)
+    assert moved == before["live_deleted"]
+    assert after["live_deleted"] == 0
+    assert after["live"] == before["live"] - moved
+    assert after["archived"] == before["archived"] + moved
+    assert after["history"] == before["history"]
+    assert app_client.run(archive.archive_deleted_history()) == 0
+
+
+def test_concurrent_archive_passes(app_client, monkeypatch):
+    from app.core import archive
+
+    monkeypatch.setattr(archive.settings, "ARCHIVE_BATCH_SIZE", 100)
+    monkeypatch.setattr(archive.settings, "ARCHIVE_BATCH_PAUSE", 0)
+    monkeypatch.setattr(archive.settings, "ARCHIVE_MIN_AGE_DAYS", 0)
+    # Копии архивных строк с новыми id возвращаются в рабочую таблицу удаленными;
+    # сдвиг date_create на 25 лет требует новых секций архива
+    columns = archive.COLUMNS.replace('"id", ', "", 1)
+    shifted = columns.replace('"date_create"', '"date_create" - interval \'25 years\'')
+    connection = Tortoise.get_connection("default")
+    app_client.run(
+        connection.execute_script(
+            f"""INSERT INTO s_gazifikacia.t_gazifikacia_data ({columns})
+            SELECT {shifted} FROM s_gazifikacia.t_gazifikacia_data_archive
+            ORDER BY id LIMIT 600"""
+        )
+    )
+    before = fetch_counts(app_client)
+    assert before["live_deleted"] == 600
+
+    async def two_passes():
+        return await asyncio.gather(
+            archive.archive_deleted_history(), archive.archive_deleted_history()
+        )
+
+    # Второй проход не должен падать на тех же строках и секциях: архивирует один
+    results = app_client.run(two_passes())
+
+    after = fetch_counts(app_client)
+    assert sum(results) == 600
+    assert after["live_deleted"] == 0
+    assert after["archived"] == before["archived"] + 600
@@ -0,0 +1,92 @@
+"""Хранилище файлов выгрузок: уникальные имена, удаление после отправки, квота."""
+
+import asyncio
+import os
+import time
+
+import httpx
+import pytest
+
+from app.core.artifacts import PARTIAL_PREFIX, ArtifactStore
+from app.core.exceptions import StorageQuotaExceededError
+
+
+async def write_artifact(store, content: bytes, prefix: str = "export"):
+    async with store.create(prefix, ".bin") as artifact:
+        with open(artifact.write_path, "wb") as file:
+            file.write(content)
+    return artifact
+
+
+def test_unique_names_and_delete_after_send(tmp_path):
+    store = ArtifactStore(str(tmp_path), quota_bytes=1024, retention=60, delete_after_send=True)
+
+    async def scenario():
+        first = await write_artifact(store, b"first")
+        second = await write_artifact(store, b"second")
+        assert first.path != second.path
+        assert first.filename.startswith("export_")
+
+        async def app(scope, receive, send):
+            await store.response(first, "application/octet-stream")(scope, receive, send)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/")
+        return first, second, response
+
+    first, second, response = asyncio.run(scenario())
+    assert response.content == b"first"
+    assert first.filename in response.headers["content-disposition"]
+    assert not os.path.exists(first.path)
+    assert os.listdir(tmp_path) == [os.path.basename(second.path)]
+    assert store.used_bytes == len(b"second")
+
+
+def test_failed_write_leaves_nothing(tmp_path):
+    store = ArtifactStore(str(tmp_path), quota_bytes=1024, retention=60, delete_after_send=True)
+
+    async def scenario():
+        async with store.create("export", ".bin") as artifact:
+            with open(artifact.write_path, "wb") as file:
+                file.write(b"partial")
+            assert os.path.basename(artifact.write_path).startswith(PARTIAL_PREFIX)
+            raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
+    assert os.listdir(tmp_path) == []
+    assert store.used_bytes == 0
+
+
+def test_quota_evicts_least_recently_used_and_sweeper_expires(tmp_path):
+    store = ArtifactStore(str(tmp_path), quota_bytes=10, retention=60, delete_after_send=False)
+
+    async def scenario():
+        old = await write_artifact(store, b"aaaa")
+        recent = await write_artifact(store, b"bbbb")
+        for artifact in (old, recent):
+            store.acquire(artifact)
+            store.release(artifact, sent=True)
+        store.acquire(recent)
+        store.release(recent, sent=True)
+        newest = await write_artifact(store, b"cccc")
+        return old, recent, newest
+
+    old, recent, newest = asyncio.run(scenario())
+    assert not os.path.exists(old.path)
+    assert os.path.exists(recent.path) and os.path.exists(newest.path)
+
+    # Отправляемые и еще не скачанные файлы не вытесняются: новая выгрузка отклоняется
+    store.quota_bytes = 8
+    store.acquire(recent)
+    with pytest.raises(StorageQuotaExceededError):
+        asyncio.run(write_artifact(store, b"dddd"))
+    store.release(recent, sent=True)
+
+    leftover = tmp_path / "export_20200101_000000_0123456789ab.bin"
+    leftover.write_bytes(b"old run")
+    os.utime(leftover, (time.time() - 120, time.time() - 120))
+    recent.last_used -= 120
+    assert store.sweep() == 2
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(newest.path)]
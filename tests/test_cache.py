@@ -0,0 +1,158 @@
+"""Кэш: вытеснение LRU, TTL, сброс по событиям и общий бэкенд по протоколу Redis."""
+
+import asyncio
+import fnmatch
+import time
+
+from app.core import cache as cache_module, db
+from app.core.cache import MISSING, Cache, MemoryBackend, RedisBackend, RedisClient
+from app.core.invalidation import TOPIC_ADDRESS, dispatch
+from app.core.metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+
+
+def test_memory_backend_evicts_least_recently_used_and_expired():
+    async def scenario():
+        backend = MemoryBackend("test.lru", max_entries=2)
+        await backend.set("a", 1, ttl=60)
+        await backend.set("b", 2, ttl=60)
+        await backend.get("a")
+        await backend.set("c", 3, ttl=60)
+        await backend.set("short", 4, ttl=0.01)
+        await asyncio.sleep(0.02)
+        return [await backend.get(key) for key in ("a", "b", "c", "short")]
+
+    evictions = CACHE_EVICTIONS.get(namespace="test.lru")
+    assert asyncio.run(scenario()) == [MISSING, MISSING, 3, MISSING]
+    assert CACHE_EVICTIONS.get(namespace="test.lru") - evictions == 2
+
+
+def test_cached_function_is_invalidated_by_scope(monkeypatch):
+    monkeypatch.setattr(cache_module.settings, "CACHE_ENABLED", True)
+    calls = []
+    districts = Cache("test.districts", ttl=60, topics=(TOPIC_ADDRESS,), scope="mo_id")
+
+    @districts.cached
+    async def load(mo_id: int, district: str = ""):
+        calls.append(mo_id)
+        return [mo_id, district]
+
+    async def scenario():
+        await load(1)
+        await load(mo_id=1, district="")
+        await load(2)
+        dispatch({"topic": TOPIC_ADDRESS, "mo_id": 1})
+        await load(1)
+        await load(2)
+        dispatch({"topic": TOPIC_ADDRESS})
+        await load(2)
+
+    asyncio.run(scenario())
+    assert calls == [1, 2, 1, 2]
+    assert CACHE_REQUESTS.get(namespace="test.districts", result="hit") == 2
+    assert CACHE_REQUESTS.get(namespace="test.districts", result="miss") == 4
+
+
+def test_value_computed_during_invalidation_is_not_stored(monkeypatch):
+    monkeypatch.setattr(cache_module.settings, "CACHE_ENABLED", True)
+    stale = Cache("test.stale", ttl=60, topics=(TOPIC_ADDRESS,))
+    calls = []
+
+    @stale.cached
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def scenario():
+        running = asyncio.ensure_future(load())
+        await asyncio.sleep(0)
+        dispatch({"topic": TOPIC_ADDRESS})
+        return await running, await load()
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+class FakeRedis:
+    """Минимальный сервер RESP: GET, SET с PX, SCAN с MATCH, UNLINK."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def handle(self, reader, writer):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            args = []
+            for _ in range(int(line[1:])):
+                length = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(length + 2))[:-2])
+            writer.write(self.execute(args[0].upper().decode(), args[1:]))
+            await writer.drain()
+        writer.close()
+
+    def execute(self, command, args):
+        now = time.monotonic()
+        self.data = {key: item for key, item in self.data.items() if item[1] > now}
+        if command == "GET":
+            item = self.data.get(args[0])
+            return b"$-1\r\n" if item is None else b"$%d\r\n%s\r\n" % (len(item[0]), item[0])
+        if command == "SET":
+            self.data[args[0]] = (args[1], now + int(args[3]) / 1000)
+            return b"+OK\r\n"
+        if command == "SCAN":
+            pattern = args[2].decode().replace("\\", "")
+            keys = [key for key in self.data if fnmatch.fnmatchcase(key.decode(), pattern)]
+            reply = b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys)
+            return reply + b"".join(b"$%d\r\n%s\r\n" % (len(key), key) for key in keys)
+        if command == "UNLINK":
+            removed = sum(self.data.pop(key, None) is not None for key in args)
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command\r\n"
+
+
+def test_redis_backend_shares_values_and_invalidates_prefix():
+    fake = FakeRedis()
+
+    async def scenario():
+        server = await asyncio.start_server(fake.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = RedisClient(f"redis://127.0.0.1:{port}/0", pool_size=2, timeout=1)
+        first = RedisBackend("hints", client, "test")
+        second = RedisBackend("hints", client, "test")
+        await first.set("1|streets", {"mo": 1}, ttl=60)
+        await first.set("2|streets", {"mo": 2}, ttl=60)
+        shared = await second.get("1|streets")
+        second.invalidate("1|")
+        await asyncio.gather(*first._pending, *second._pending)
+        after = [await first.get("1|streets"), await first.get("2|streets")]
+        await client.close()
+        server.close()
+        await server.wait_closed()
+        # Недоступный сервер - промах, а не ошибка запроса
+        unavailable = RedisBackend("hints", RedisClient(f"redis://127.0.0.1:{port}", 1, 0.2), "test")
+        return shared, after, await unavailable.get("1|streets")
+
+    shared, after, unavailable = asyncio.run(scenario())
+    assert shared == {"mo": 1}
+    assert after == [MISSING, {"mo": 2}]
+    assert unavailable is MISSING
+
+
+def test_cached_values_are_loaded_from_primary(monkeypatch):
+    monkeypatch.setattr(cache_module.settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(db, "is_replica_configured", lambda: True)
+    monkeypatch.setattr(db._replica_state, "usable", True)
+    monkeypatch.setattr(db._replica_state, "checked_at", time.monotonic() + 3600)
+    monkeypatch.setattr(db.Tortoise, "get_connection", lambda name: name)
+    hints = Cache("test.primary", ttl=60, topics=(TOPIC_ADDRESS,))
+
+    @hints.cached
+    async def load():
+        return await db.get_read_connection()
+
+    async def scenario():
+        return await load(), await db.get_read_connection()
+
+    # Реплика может еще не видеть запись, после которой кэш сброшен
+    assert asyncio.run(scenario()) == ("default", db.READ_CONNECTION)
@@ -0,0 +1,81 @@
+"""Архив выгрузок по муниципалитетам: строится и отправляется одновременно."""
+
+import asyncio
+import io
+import zipfile
+
+from app.core import export_bundle
+from app.core.export_bundle import stream_bundle
+from app.core.export_engine import Column, RowSource, load_sink
+
+
+def make_source(name: str, rows: int, events: list) -> RowSource:
+    async def batches():
+        try:
+            for start in range(0, rows, 100):
+                events.append(f"{name}:{start}")
+                yield [(f"{name}-{index}" * 20,) for index in range(start, min(rows, start + 100))]
+                await asyncio.sleep(0)
+        finally:
+            events.append(f"{name}:closed")
+
+    return RowSource(name, name, name, [Column("value", "Значение")], batches)
+
+
+async def entries(names, rows, events):
+    for name in names:
+        events.append(f"{name}:created")
+        yield name, make_source(name, rows, events)
+
+
+def test_bundle_is_streamed_while_it_is_built(monkeypatch):
+    monkeypatch.setattr(export_bundle, "BUNDLE_CHUNK_SIZE", 1024)
+    events = []
+
+    async def scenario():
+        chunks = []
+        async for chunk in stream_bundle(
+            "test", entries(["Первый", "Второй/МО"], 1000, events), await load_sink("csv")
+        ):
+            chunks.append(chunk)
+            events.append("sent")
+        return b"".join(chunks)
+
+    archive = zipfile.ZipFile(io.BytesIO(asyncio.run(scenario())))
+    assert archive.testzip() is None
+    assert archive.namelist() == ["Первый.csv", "Второй_МО.csv"]
+    lines = archive.read("Второй_МО.csv").decode("utf-8").splitlines()
+    assert len(lines) == 1001 and lines[1].startswith('"Второй/МО-0')
+    # Первые байты ушли клиенту до того, как был создан второй файл
+    assert events.index("sent") < events.index("Второй/МО:created")
+
+
+def test_disconnect_stops_building(monkeypatch):
+    monkeypatch.setattr(export_bundle, "BUNDLE_CHUNK_SIZE", 1024)
+    events = []
+
+    async def scenario():
+        bundle = stream_bundle("test", entries(["A", "B"], 100000, events), await load_sink("csv"))
+        await bundle.__anext__()
+        await bundle.aclose()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert "A:closed" in events
+    assert "B:created" not in events
+
+
+def test_bundle_entries_match_single_exports(app_client):
+    mo_id = app_client.sample["id_mo"]
+    response, _, _ = app_client.request(
+        "GET", "/v1/export-bundle", params={"format": "csv", "mo_ids": [mo_id]}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    [name] = archive.namelist()
+    assert name.endswith(f"_{mo_id}.csv")
+
+    single, _, _ = app_client.request("GET", "/v1/export", params={"format": "csv", "mo_id": mo_id})
+    assert single.status_code == 200, single.text
+    assert archive.read(name) == single.content
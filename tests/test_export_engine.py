@@ -0,0 +1,94 @@
+"""Движок выгрузок: форматы получают одинаковые типизированные строки пачками."""
+
+import asyncio
+import io
+import json
+import zipfile
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import artifacts
+from app.core.artifacts import ArtifactStore
+from app.core.exceptions import ValidationError
+from app.core.export_engine import (
+    BOOLEAN,
+    DATETIME,
+    INTEGER,
+    Column,
+    RowSource,
+    export_to_artifact,
+    load_sink,
+    write_export,
+)
+
+COLUMNS = [
+    Column("created", "Дата", DATETIME),
+    Column("name", "Имя"),
+    Column("count", "Количество", INTEGER),
+    Column("mobile", "Мобильное", BOOLEAN),
+]
+BATCHES = [
+    [(datetime(2025, 7, 10, 9, 30), "=1+1", 3, True)],
+    [(None, "Иванов; И.", 0, False), (None, None, None, None)],
+]
+
+
+def make_source(batches=BATCHES) -> RowSource:
+    async def rows():
+        for batch in batches:
+            yield batch
+
+    return RowSource("test", "test_export", "Лист", COLUMNS, rows)
+
+
+def render(format: str) -> bytes:
+    async def scenario():
+        file = io.BytesIO()
+        rows = await write_export(make_source(), await load_sink(format), file)
+        assert rows == 3
+        return file.getvalue()
+
+    return asyncio.run(scenario())
+
+
+def test_csv_and_ndjson():
+    assert render("csv").decode("utf-8").splitlines() == [
+        '"Дата";"Имя";"Количество";"Мобильное"',
+        '"10.07.2025 09:30";"=1+1";"3";"Да"',
+        '"";"Иванов; И.";"0";"Нет"',
+        '"";"";"";""',
+    ]
+    lines = [json.loads(line) for line in render("ndjson").decode("utf-8").splitlines()]
+    assert lines[0] == {"created": "2025-07-10T09:30:00", "name": "=1+1", "count": 3, "mobile": True}
+    assert lines[2] == {"created": None, "name": None, "count": None, "mobile": None}
+
+
+def test_xlsx_writes_text_as_strings():
+    with zipfile.ZipFile(io.BytesIO(render("xlsx"))) as workbook:
+        sheet = workbook.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert "<f>" not in sheet
+    assert "=1+1" in sheet and "Иванов; И." in sheet
+
+
+def test_parquet_roundtrip():
+    parquet = pytest.importorskip("pyarrow.parquet")
+    table = parquet.read_table(io.BytesIO(render("parquet")))
+    assert table.column("count").to_pylist() == [3, 0, None]
+
+
+def test_unknown_format_and_empty_export(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path), quota_bytes=1024, retention=60, delete_after_send=True)
+    monkeypatch.setattr(artifacts, "_store", store)
+
+    with pytest.raises(ValidationError):
+        asyncio.run(load_sink("docx"))
+
+    async def scenario():
+        await export_to_artifact(make_source([]), await load_sink("csv"))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(scenario())
+    assert error.value.status_code == 404
+    assert list(tmp_path.iterdir()) == []
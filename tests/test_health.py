@@ -0,0 +1,33 @@
+"""Проверки живости и готовности воркера, прогрев при запуске."""
+
+
+def test_ready_after_warmup(app_client):
+    from app.core.config import settings
+    from app.core.db import get_pool_stats
+
+    response, _, _ = app_client.request("GET", "/readyz")
+    assert response.status_code == 200, response.text
+    warmup = response.json()["data"]["warmup"]
+    assert warmup["status"] == "done"
+    assert {"pool.default", "hints.municipalities", "type_values"} <= set(warmup["steps"])
+    assert all(step["ok"] for step in warmup["steps"].values())
+    assert get_pool_stats("default")["size"] >= min(settings.WARMUP_DB_CONNECTIONS, settings.DB_POOL_MAX_SIZE)
+
+
+def test_liveness_and_readiness_checks(app_client, monkeypatch):
+    from app.core import health
+
+    response, stats, _ = app_client.request("GET", "/healthz")
+    assert response.status_code == 200
+    assert stats.count == 0
+
+    response, _, _ = app_client.request("GET", "/readyz")
+    checks = response.json()["data"]
+    assert {"database", "pool", "event_loop", "warmup"} <= {
+        name for name, check in checks.items() if check.get("ok")
+    }
+
+    monkeypatch.setattr(health, "get_event_loop_lag", lambda: 2.0)
+    response, _, _ = app_client.request("GET", "/readyz")
+    assert response.status_code == 503
+    assert response.json()["data"]["event_loop"] == {"ok": False, "lag_ms": 2000.0}
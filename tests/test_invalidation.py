@@ -0,0 +1,55 @@
+"""Сброс кэшей между воркерами через LISTEN/NOTIFY."""
+
+import asyncio
+import json
+
+from tortoise import Tortoise
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "событие не получено"
+        await asyncio.sleep(0.02)
+
+
+def test_remote_events_reach_handlers_and_reconnect_flushes(app_client):
+    from app.core import invalidation
+
+    events = []
+    invalidation.subscribe(events.append)
+    connection = Tortoise.get_connection("default")
+
+    async def scenario():
+        await wait_for(invalidation.is_listener_connected)
+        # Событие другого воркера доставляется, свое эхо пропускается
+        for origin in ("other-worker", invalidation.ORIGIN):
+            payload = json.dumps({"topic": "address", "mo_id": 1, "origin": origin})
+            await connection.execute_query("SELECT pg_notify($1, $2)", [invalidation.CHANNEL, payload])
+        # Правка анкеты напрямую в БД отправляет событие триггером
+        await connection.execute_query(
+            "UPDATE s_gazifikacia.t_type_value SET description = description WHERE id = 1"
+        )
+        await wait_for(lambda: len(events) >= 2)
+        await asyncio.sleep(0.1)
+        received = list(events)
+
+        events.clear()
+        await connection.execute_query(
+            "SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE query LIKE 'LISTEN%'"
+        )
+        await wait_for(lambda: not invalidation.is_listener_connected())
+        assert invalidation.effective_ttl(3600) == invalidation.settings.INVALIDATION_FALLBACK_TTL
+        await wait_for(invalidation.is_listener_connected)
+        return received
+
+    try:
+        received = app_client.run(scenario())
+    finally:
+        invalidation._handlers.remove(events.append)
+    assert received == [
+        {"topic": "address", "mo_id": 1},
+        {"topic": "questionnaire", "table": "t_type_value"},
+    ]
+    assert {"topic": "all"} in events
+    assert invalidation.effective_ttl(3600) == 3600
@@ -0,0 +1,45 @@
+"""
+Бюджеты времени ответа на наборе данных фиксированного размера.
+
+Берется медиана нескольких запросов после прогревочного. Бюджеты заданы с
+запасом для медленных машин; PERF_BUDGET_FACTOR умножает их все.
+"""
+
+import os
+import statistics
+
+import pytest
+
+from tests.conftest import format_statements
+
+BUDGET_FACTOR = float(os.environ.get("PERF_BUDGET_FACTOR", "1"))
+RUNS = 5
+
+LATENCY_BUDGETS_MS = {
+    "mo": 250,
+    "district": 250,
+    "street": 250,
+    "house": 250,
+    "flat": 250,
+    "type_values": 100,
+    "export_csv_mo": 1500,
+    "export_excel_mo": 5000,
+    "upload": 250,
+}
+
+
+@pytest.mark.parametrize("name", list(LATENCY_BUDGETS_MS))
+def test_latency_budget(app_client, name):
+    budget_ms = LATENCY_BUDGETS_MS[name] * BUDGET_FACTOR
+    app_client.scenario(name)
+    timings = []
+    for _ in range(RUNS):
+        response, stats, elapsed = app_client.scenario(name)
+        assert response.status_code == 200, response.text
+        timings.append(elapsed * 1000)
+    median_ms = statistics.median(timings)
+    assert median_ms <= budget_ms, (
+        f"медиана {median_ms:.1f} ms при бюджете {budget_ms:.0f} ms, "
+        f"{stats.count} SQL-запросов за {stats.seconds * 1000:.1f} ms:\n"
+        f"{format_statements(stats.statements)}"
+    )
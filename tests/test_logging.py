@@ -0,0 +1,38 @@
+"""Ограниченная очередь логов: переполнение без слушателя."""
+
+import logging
+import queue
+import time
+
+import pytest
+
+from app.core.logging import BoundedQueueHandler
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+BLOCK_TIMEOUT = 0.05
+
+
+def make_record(index: int) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 0, "record %s", (index,), None)
+
+
+@pytest.mark.parametrize("policy", ["drop", "block"])
+def test_full_queue_drops_records(policy):
+    log_queue = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(log_queue, policy, BLOCK_TIMEOUT)
+    dropped_before = LOG_RECORDS_DROPPED.get()
+    start_time = time.monotonic()
+    for index in range(3):
+        handler.emit(make_record(index))
+    elapsed = time.monotonic() - start_time
+
+    assert handler.dropped == 2
+    assert LOG_RECORDS_DROPPED.get() == dropped_before + 2
+    assert log_queue.qsize() == 1
+    record = log_queue.get_nowait()
+    assert record.msg == "record 0" and record.args is None
+    if policy == "block":
+        # Каждая отброшенная запись сначала ждет место в очереди
+        assert elapsed >= 2 * BLOCK_TIMEOUT
+    else:
+        assert elapsed < BLOCK_TIMEOUT
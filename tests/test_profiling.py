@@ -0,0 +1,79 @@
+"""Профилировщик запроса: дочерние задачи и рабочие потоки запроса попадают в его стеки."""
+
+import asyncio
+import time
+
+from app.core.profiling import OTHER_TASK_STACK, WORKER_THREAD_FRAME, RequestProfiler, run_in_thread
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def busy_child_task() -> None:
+    spin(0.1)
+
+
+async def busy_other_request() -> None:
+    await asyncio.sleep(0.01)
+    spin(0.1)
+
+
+def busy_worker_thread() -> None:
+    spin(0.1)
+
+
+def test_samples_child_tasks_and_worker_threads():
+    async def request():
+        other = asyncio.ensure_future(busy_other_request())
+        profiler = RequestProfiler(0.002)
+        profiler.start()
+        try:
+            await asyncio.ensure_future(busy_child_task())
+            await run_in_thread(busy_worker_thread)
+            await other
+        finally:
+            profiler.stop()
+        return profiler.samples
+
+    samples = asyncio.run(request())
+    stacks = list(samples)
+    assert any("busy_child_task" in stack for stack in stacks)
+    assert any(
+        stack.startswith(WORKER_THREAD_FRAME) and "busy_worker_thread" in stack for stack in stacks
+    )
+    assert not any("busy_other_request" in stack for stack in stacks)
+    assert samples[OTHER_TASK_STACK] > 0
+
+
+
+def test_task_factory_removed_after_last_profiler():
+    async def profiled_request(started: asyncio.Event, finish: asyncio.Event) -> bool:
+        profiler = RequestProfiler(0.01)
+        profiler.start()
+        started.set()
+        await finish.wait()
+        child = asyncio.ensure_future(asyncio.sleep(0))
+        await child
+        profiler.stop()
+        return child in profiler.tasks
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        first_started, second_started = asyncio.Event(), asyncio.Event()
+        first_finish, second_finish = asyncio.Event(), asyncio.Event()
+        first = asyncio.ensure_future(profiled_request(first_started, first_finish))
+        second = asyncio.ensure_future(profiled_request(second_started, second_finish))
+        await first_started.wait()
+        await second_started.wait()
+        first_finish.set()
+        assert await first
+        # Второй запрос еще профилируется: его задачи по-прежнему отмечаются
+        assert loop.get_task_factory() is not None
+        second_finish.set()
+        assert await second
+        return loop.get_task_factory()
+
+    assert asyncio.run(main()) is None
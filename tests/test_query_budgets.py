@@ -0,0 +1,63 @@
+"""Максимальное количество SQL-запросов на один запрос к эндпоинту."""
+
+import pytest
+
+from benchmarks import dataset
+from tests.conftest import format_statements
+
+QUERY_BUDGETS = {
+    "mo": 3,
+    "district": 3,
+    "street": 3,
+    "house": 3,
+    "flat": 3,
+    "type_values": 4,
+    # Выгрузки читают курсором: запрос плюс BEGIN/COMMIT его транзакции
+    "export_csv_mo": 3,
+    "export_csv_all": 3,
+    "export_excel_mo": 5,
+    "upload": 10,
+}
+
+
+def assert_query_budget(stats, budget: int) -> None:
+    assert stats.count <= budget, (
+        f"{stats.count} SQL-запросов при бюджете {budget}:\n"
+        f"{format_statements(stats.statements)}"
+    )
+
+
+@pytest.mark.parametrize("name", list(QUERY_BUDGETS))
+def test_query_budget(app_client, name):
+    response, stats, _ = app_client.scenario(name)
+    assert response.status_code == 200, response.text
+    assert_query_budget(stats, QUERY_BUDGETS[name])
+
+
+def test_upload_query_count_does_not_depend_on_field_count(app_client):
+    payload = app_client.scenarios["upload"]["json"]
+    counts = []
+    for fields in (payload["fields"][:1], payload["fields"]):
+        response, stats, _ = app_client.scenario("upload", json={**payload, "fields": fields})
+        assert response.status_code == 200, response.text
+        counts.append(stats.count)
+    assert counts[0] == counts[1], (
+        f"1 поле: {counts[0]} запросов, {len(dataset.QUESTIONS)} полей: {counts[1]}:\n"
+        f"{format_statements(stats.statements)}"
+    )
+
+
+def test_update_gas_status_query_budget(app_client):
+    address = app_client.scenarios["upload"]["json"]["address"]
+    response, stats, _ = app_client.request(
+        "POST",
+        "/v1/update-gas-status",
+        json={
+            **address,
+            "has_gas": "not_at_home",
+            "from_login": "test@example.com",
+            "session_id": "test-session",
+        },
+    )
+    assert response.status_code == 200, response.text
+    assert_query_budget(stats, 8)
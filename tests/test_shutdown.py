@@ -0,0 +1,67 @@
+"""Плавная остановка: отказ в новых выгрузках и ожидание запущенных."""
+
+import asyncio
+
+import httpx
+
+from app.core import admission, shutdown
+from app.core.admission import AdmissionControlMiddleware
+
+
+def test_draining_rejects_new_exports_and_waits_for_running(monkeypatch):
+    monkeypatch.setattr(shutdown, "_state", shutdown.DrainState())
+    monkeypatch.setattr(shutdown.settings, "SHUTDOWN_EXPORT_TIMEOUT", 1)
+    monkeypatch.setattr(admission, "_limiters", {})
+
+    async def scenario():
+        release_export = asyncio.Event()
+
+        async def endpoint(scope, receive, send):
+            if scope["path"].startswith("/v1/export"):
+                await release_export.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        transport = httpx.ASGITransport(app=AdmissionControlMiddleware(endpoint))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            running_export = asyncio.ensure_future(client.get("/v1/export"))
+            await asyncio.sleep(0.01)
+            assert shutdown.get_exports_in_flight() == 1
+            drain = asyncio.ensure_future(shutdown.drain_exports())
+            await asyncio.sleep(0.01)
+            rejected = await client.get("/v1/export-csv")
+            hint = await client.get("/v1/mo")
+            assert not drain.done()
+            release_export.set()
+            return (await running_export), rejected, hint, (await drain)
+
+    running_export, rejected, hint, drained = asyncio.run(scenario())
+    assert running_export.status_code == 200
+    assert hint.status_code == 200
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == str(admission.SHUTTING_DOWN_RETRY_AFTER)
+    assert drained == {"in_flight": 1, "finished": True}
+    assert shutdown.is_draining()
+
+
+def test_drain_gives_up_after_deadline(monkeypatch):
+    monkeypatch.setattr(shutdown, "_state", shutdown.DrainState())
+    monkeypatch.setattr(shutdown.settings, "SHUTDOWN_EXPORT_TIMEOUT", 0.05)
+
+    async def scenario():
+        hanging = asyncio.Event()
+
+        async def export():
+            async with shutdown.track_export():
+                await hanging.wait()
+
+        task = asyncio.ensure_future(export())
+        await asyncio.sleep(0)
+        report = shutdown.ShutdownReport()
+        result = await report.phase("exports", shutdown.drain_exports())
+        task.cancel()
+        return result, report.summary()
+
+    result, summary = asyncio.run(scenario())
+    assert result == {"in_flight": 1, "finished": False}
+    assert summary["phases"]["exports"]["duration_ms"] >= 50
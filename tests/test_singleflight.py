@@ -0,0 +1,55 @@
+"""Объединение одновременных одинаковых вызовов."""
+
+import asyncio
+import inspect
+
+from app.core.singleflight import single_flight
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    calls = []
+
+    @single_flight
+    async def compute(mo_id: int, district: str = "Центральный"):
+        calls.append((mo_id, district))
+        await asyncio.sleep(0.01)
+        return [mo_id, district]
+
+    async def scenario():
+        return await asyncio.gather(
+            compute(1),
+            compute(1, "Центральный"),
+            compute(mo_id=1),
+            compute(2),
+        )
+
+    results = asyncio.run(scenario())
+    assert results == [[1, "Центральный"]] * 3 + [[2, "Центральный"]]
+    assert sorted(calls) == [(1, "Центральный"), (2, "Центральный")]
+    assert list(inspect.signature(compute).parameters) == ["mo_id", "district"]
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    started = []
+
+    @single_flight
+    async def compute(key: str):
+        started.append(key)
+        await asyncio.sleep(0.05)
+        return key
+
+    async def scenario():
+        first = asyncio.ensure_future(compute("a"))
+        second = asyncio.ensure_future(compute("a"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        # Когда ждать некому, вычисление отменяется
+        abandoned = asyncio.ensure_future(compute("b"))
+        await asyncio.sleep(0.01)
+        abandoned.cancel()
+        await asyncio.sleep(0.01)
+        return first.cancelled(), result, compute.single_flight.in_flight()
+
+    assert asyncio.run(scenario()) == (True, "a", 0)
+    assert started == ["a", "b"]
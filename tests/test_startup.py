@@ -0,0 +1,9 @@
+"""Тяжелые зависимости выгрузок и Telegram-логов не загружаются при запуске."""
+
+from benchmarks.startup_trace import run_import_trace
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    entries, loaded = run_import_trace("main")
+    assert any(entry["module"] == "main" for entry in entries)
+    assert loaded == []
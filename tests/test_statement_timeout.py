@@ -0,0 +1,27 @@
+"""Таймаут оператора БД отдается как 504, остальные таймауты - нет."""
+
+import asyncio
+
+from tortoise import Tortoise
+
+
+def test_statement_timeout_is_504_other_timeouts_are_not(app_client, monkeypatch):
+    from app.api.v1.endpoints.gazification import district
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_HINTS", 0.05)
+
+    async def slow_statement():
+        await Tortoise.get_connection("default").execute_query("SELECT pg_sleep(1)")
+
+    monkeypatch.setattr(district, "get_read_connection", slow_statement)
+    response, _, elapsed = app_client.request("GET", "/v1/mo/1/district")
+    assert response.status_code == 504, response.text
+    assert elapsed < 1
+
+    async def other_timeout():
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(district, "get_read_connection", other_timeout)
+    response, _, _ = app_client.request("GET", "/v1/mo/1/district")
+    assert response.status_code == 500, response.text
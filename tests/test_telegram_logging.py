@@ -0,0 +1,100 @@
+"""Отправка логов в Telegram через локальную заглушку Bot API."""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from app.core.telegram_logging import MAX_MESSAGE_LENGTH, TelegramLogHandler
+
+
+class FakeBotApi(BaseHTTPRequestHandler):
+    """sendMessage: первый запрос получает 429 с retry_after, остальные принимаются."""
+
+    messages = []
+    attempts = []
+    retry_after = 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            text = json.loads(body)["text"]
+        else:
+            text = parse_qs(body)["text"][0]
+        self.attempts.append(time.monotonic())
+        if len(self.attempts) == 1:
+            status, payload = 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        else:
+            self.messages.append(text)
+            status, payload = 200, {
+                "ok": True,
+                "result": {
+                    "message_id": len(self.messages),
+                    "date": int(time.time()),
+                    "chat": {"id": 1, "type": "private"},
+                    "text": text,
+                },
+            }
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def record(message: str, level: int = logging.ERROR) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def test_handler_against_local_bot_api():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBotApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    handler = TelegramLogHandler(
+        "123:token",
+        "1",
+        queue_size=9,
+        min_send_interval=0.01,
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/bot",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    async def scenario():
+        handler.start()
+        # Все записи попадают в очередь до первой отправки: одна пачка
+        for _ in range(3):
+            handler.emit(record("повторяющаяся ошибка"))
+        for index in range(6):
+            handler.emit(record(f"{index}:" + "x" * 1500))
+        for index in range(5):
+            handler.emit(record(f"сверх очереди {index}"))
+        await handler.aclose(timeout=10)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        server.shutdown()
+
+    messages = FakeBotApi.messages
+    attempts = FakeBotApi.attempts
+    assert handler.dropped == 5
+    assert attempts[1] - attempts[0] >= FakeBotApi.retry_after
+    assert all(len(message) <= MAX_MESSAGE_LENGTH for message in messages)
+    text = "\n\n".join(messages)
+    assert "повторяющаяся ошибка\n(повторов: 3)" in text
+    assert all(f"{index}:" in text for index in range(6))
+    # Повтор и 6 записей по 1500 символов: не больше двух длинных записей в сообщении
+    assert len(messages) == 3
+    assert "Очередь логов переполнена, пропущено записей: 5" in messages[-1]
+    assert handler.sent_messages == len(messages)